@@ -0,0 +1,62 @@
+"""
+قياس سرعة حفظ محاولات الإجابة (attempts/second)
+
+يقارن الطريقة القديمة (اتصال جديد + rollback journal لكل محاولة)
+مع DatabaseManager (اتصال دائم + WAL + synchronous=NORMAL)
+
+التشغيل:
+    python -m benchmarks.db_attempts [عدد المحاولات]
+"""
+
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from src.database.db_manager import DatabaseManager
+from src.database.repositories import QuizRepository
+
+def save_attempt_per_connection(db_path: Path, session_id: int):
+    """الطريقة القديمة: connect + INSERT + commit + close"""
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    cursor.execute('''
+        INSERT INTO question_attempts
+        (session_id, question_id, user_answer, correct_answer, is_correct)
+        VALUES (?, ?, ?, ?, ?)
+    ''', (session_id, 1, 1, 1, True))
+    conn.commit()
+    conn.close()
+
+def run(attempts: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        # قبل: قاعدة بيانات بإعدادات SQLite الافتراضية (journal_mode=DELETE)
+        old_path = Path(tmp) / 'before.db'
+        DatabaseManager(old_path).close()
+        conn = sqlite3.connect(old_path)
+        conn.execute('PRAGMA journal_mode = DELETE')
+        conn.close()
+
+        start = time.perf_counter()
+        for _ in range(attempts):
+            save_attempt_per_connection(old_path, 1)
+        before = attempts / (time.perf_counter() - start)
+
+        # بعد: اتصال دائم مع WAL
+        db_manager = DatabaseManager(Path(tmp) / 'after.db')
+        quiz_repo = QuizRepository(db_manager)
+
+        start = time.perf_counter()
+        for _ in range(attempts):
+            quiz_repo.save_attempt(1, 'What is the time complexity of Binary Search?', 1, 1, True)
+        after = attempts / (time.perf_counter() - start)
+        db_manager.close()
+
+    print(f"attempts:  {attempts}")
+    print(f"before:    {before:,.0f} attempts/s")
+    print(f"after:     {after:,.0f} attempts/s")
+    print(f"speedup:   x{after / before:.1f}")
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
@@ -0,0 +1,110 @@
+"""
+قياس سرعة حساب المستوى من XP
+
+يقارن الطريقة القديمة (حلقة 1..100 تستدعي calculate_xp_for_level + بحث خطي في LEVEL_NAMES)
+مع جدول XP المحسوب مسبقاً (bisect) والنسخة الدفعية get_levels_from_xp
+ويتحقق أولاً أن النتائج متطابقة تماماً
+
+التشغيل:
+    python -m benchmarks.levels [عدد القيم]
+"""
+
+import random
+import sys
+import time
+
+import config
+
+def legacy_level_info(level: int) -> dict:
+    """get_level_info_from_number القديمة (بحث خطي)"""
+    for (min_level, max_level), info in config.LEVEL_NAMES.items():
+        if min_level <= level <= max_level:
+            return info
+    return {"name": "ما وراء الأسطورة", "emoji": "✨", "tier": "beyond"}
+
+def legacy_level_number(xp: int) -> int:
+    """حلقة get_level_from_xp القديمة"""
+    current_level = 1
+    for level in range(1, 101):
+        if xp >= config.calculate_xp_for_level(level):
+            current_level = level
+        else:
+            break
+    return current_level
+
+def legacy_get_level_from_xp(xp: int) -> dict:
+    """get_level_from_xp القديمة كاملة (للمقارنة)"""
+    current_level = legacy_level_number(xp)
+    level_info = legacy_level_info(current_level)
+    xp_current_level = config.calculate_xp_for_level(current_level) if current_level > 1 else 0
+
+    if current_level >= 100:
+        return {
+            "level": current_level,
+            "name": level_info["name"],
+            "emoji": level_info["emoji"],
+            "tier": level_info["tier"],
+            "xp_current": xp,
+            "xp_next": None,
+            "progress_percent": 100,
+            "max_level": True
+        }
+
+    xp_next_level = config.calculate_xp_for_level(current_level + 1)
+    xp_in_current_level = xp - xp_current_level
+    xp_needed_for_next = xp_next_level - xp_current_level
+    progress = (xp_in_current_level / xp_needed_for_next * 100)
+    next_level_info = legacy_level_info(current_level + 1)
+
+    return {
+        "level": current_level,
+        "name": level_info["name"],
+        "emoji": level_info["emoji"],
+        "tier": level_info["tier"],
+        "xp_current": xp,
+        "xp_next": xp_next_level,
+        "xp_in_level": xp_in_current_level,
+        "xp_needed": xp_needed_for_next,
+        "progress_percent": round(progress, 1),
+        "next_level": current_level + 1,
+        "next_level_name": next_level_info["name"],
+        "next_level_emoji": next_level_info["emoji"]
+    }
+
+def timed(func, values) -> float:
+    start = time.perf_counter()
+    func(values)
+    return time.perf_counter() - start
+
+def run(count: int):
+    max_xp = config.LEVEL_XP_THRESHOLDS[-1] + 10_000
+
+    # التحقق: كل الحدود (±1) + قيم عشوائية
+    edges = [t + d for t in config.LEVEL_XP_THRESHOLDS for d in (-1, 0, 1)]
+    sample = [0, 1, 99] + edges + [random.randint(0, max_xp) for _ in range(10_000)]
+    for xp in sample:
+        assert config.get_level_from_xp(xp) == legacy_get_level_from_xp(xp), xp
+    assert config.get_levels_from_xp(sample) == [legacy_level_number(xp) for xp in sample]
+    print(f"verified:  {len(sample)} values identical")
+
+    values = [random.randint(0, max_xp) for _ in range(count)]
+
+    before = timed(lambda v: [legacy_get_level_from_xp(xp) for xp in v], values)
+    after = timed(lambda v: [config.get_level_from_xp(xp) for xp in v], values)
+    legacy_numbers = timed(lambda v: [legacy_level_number(xp) for xp in v], values)
+    batch = timed(config.get_levels_from_xp, values)
+
+    try:
+        import numpy  # noqa: F401
+        backend = "numpy"
+    except ImportError:
+        backend = "bisect"
+
+    print(f"values:    {count}")
+    print(f"get_level_from_xp  before: {count / before:,.0f}/s  after: {count / after:,.0f}/s  "
+          f"speedup: x{before / after:.1f}")
+    print(f"level numbers      loop:   {count / legacy_numbers:,.0f}/s  batch ({backend}): "
+          f"{count / batch:,.0f}/s  speedup: x{legacy_numbers / batch:.1f}")
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
@@ -1,4 +1,9 @@
 import logging
+import time
+
+# بداية قياس زمن الاستيراد (تقرير بدء التشغيل)
+_import_started = time.perf_counter()
+
 from telegram import Update
 from telegram.ext import (
     Application, 
@@ -8,9 +13,14 @@ from telegram.ext import (
 )
 import config
 from src.handlers.start_handler import start_command, help_command
-from src.handlers.quiz_handler import handle_poll_answer
+from src.handlers.quiz_handler import handle_poll_answer, restore_timers
 from src.handlers.stats_handler import stats_command, progress_command
 from src.handlers.callback_handler import handle_callback
+from src.handlers.jobs import refresh_question_cache_job, flush_attempts_job, quiz_timers_job
+from src.container import container
+from src.utils.update_processor import PerUserUpdateProcessor
+
+_import_seconds = time.perf_counter() - _import_started
 
 # إعداد Logging
 logging.basicConfig(
@@ -19,6 +29,26 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+async def on_startup(application: Application):
+    """
+    تجهيز الخدمات المشتركة قبل استقبال التحديثات
+    (بدلاً من إنشائها مع أول ضغطة زر) + تقرير زمن بدء التشغيل
+    """
+    container.question_service
+    container.user_repo
+    container.quiz_repo
+    container.stats_repo
+    
+    # استعادة الاختبارات الجارية ومؤقتاتها
+    await container.user_sessions.load()
+    restore_timers(application)
+    
+    container.log_startup_report(import_seconds=_import_seconds)
+
+async def on_shutdown(application: Application):
+    """تنظيف الموارد عند إيقاف البوت"""
+    await container.aclose()
+
 def main():
     """الدالة الرئيسية لتشغيل البوت"""
     
@@ -27,7 +57,15 @@ def main():
         return
     
     # إنشاء التطبيق
-    application = Application.builder().token(config.BOT_TOKEN).build()
+    application = (
+        Application.builder()
+        .token(config.BOT_TOKEN)
+        .concurrent_updates(PerUserUpdateProcessor(config.CONCURRENT_UPDATES))
+        .rate_limiter(container.outbound)
+        .post_init(on_startup)
+        .post_shutdown(on_shutdown)
+        .build()
+    )
     
     # تسجيل المعالجات (Handlers)
     application.add_handler(CommandHandler("start", start_command))
@@ -41,6 +79,29 @@ def main():
     # معالج إجابات الاختبار
     application.add_handler(PollAnswerHandler(handle_poll_answer))
     
+    # كتابة محاولات الإجابة المعلقة دورياً
+    application.job_queue.run_repeating(
+        flush_attempts_job,
+        interval=config.ATTEMPT_FLUSH_INTERVAL_SECONDS,
+        first=config.ATTEMPT_FLUSH_INTERVAL_SECONDS
+    )
+    
+    # مهل الاختبار بوقت محدد (عجلة مؤقتات واحدة لكل الجلسات)
+    if config.QUESTION_TIME_LIMIT_SECONDS or config.QUIZ_TIME_LIMIT_MINUTES:
+        application.job_queue.run_repeating(
+            quiz_timers_job,
+            interval=config.TIMER_TICK_SECONDS,
+            first=config.TIMER_TICK_SECONDS
+        )
+    
+    # تحديث Cache الأسئلة في الخلفية
+    if config.CACHE_QUESTIONS and config.CACHE_STALE_WHILE_REVALIDATE:
+        application.job_queue.run_repeating(
+            refresh_question_cache_job,
+            interval=config.CACHE_REFRESH_INTERVAL_SECONDS,
+            first=config.CACHE_REFRESH_INTERVAL_SECONDS
+        )
+    
     # بدء البوت
     logger.info("🤖 البوت يعمل الآن... اضغط Ctrl+C للإيقاف")
     logger.info("📱 الأوامر المتاحة: /start /stats /progress /help")
@@ -1,4 +1,5 @@
 import os
+from bisect import bisect_right
 from dotenv import load_dotenv
 
 # تحميل المتغيرات من .env
@@ -11,13 +12,50 @@ BOT_TOKEN = os.getenv('BOT_TOKEN')
 USE_ALL_QUESTIONS = True  # استخدام جميع أسئلة الفصل
 QUESTIONS_PER_QUIZ = 5  # يُستخدم فقط إذا كان USE_ALL_QUESTIONS = False
 PASSING_SCORE = 3  # 60%
+FIRST_QUESTION_DELAY_SECONDS = 1  # مهلة قبل السؤال الأول (بعد رسالة البداية)
+NEXT_QUESTION_DELAY_SECONDS = 1.5  # مهلة قبل السؤال التالي (بعد رسالة صحيح/خطأ)
+
+# الاختبار بوقت محدد (0 = بدون حد)
+QUESTION_TIME_LIMIT_SECONDS = 60  # مهلة السؤال الواحد (بين 5 و 600 - حدود open_period في تيليجرام)
+QUIZ_TIME_LIMIT_MINUTES = 0  # مهلة الاختبار كاملاً
+TIMER_TICK_SECONDS = 1  # دقة مؤقتات الاختبار (نبضة عجلة المؤقتات)
+TIMER_WHEEL_SLOTS = 512  # عدد خانات العجلة (دورة كاملة = TICK × SLOTS)
+TIMER_EXPIRY_CONCURRENCY = 32  # أقصى عدد جلسات تُعالج مهلتها المنتهية بالتوازي في النبضة الواحدة
 
 # مسارات الملفات
 QUESTIONS_DIR = "data/questions"
 DATABASE_PATH = "data/database/quiz_bot.db"
+QUESTION_BANK_PATH = "data/questions/bank.qbank"  # يُجمّع بـ: python -m src.services.question_bank
+
+# معالجة التحديثات بالتوازي بين المستخدمين (تحديثات المستخدم الواحد بالترتيب)
+CONCURRENT_UPDATES = 32  # أقصى عدد تحديثات تُعالج في نفس الوقت
+
+# حدود إرسال الرسائل إلى تيليجرام (تجنب أخطاء 429)
+OUTBOUND_GLOBAL_RATE = 30  # رسالة/ثانية لكل البوت
+OUTBOUND_PER_CHAT_RATE = 1  # رسالة/ثانية للمحادثة الواحدة
+OUTBOUND_PER_CHAT_BURST = 3  # رسائل متتالية مسموحة في المحادثة قبل التقييد
+OUTBOUND_MAX_RETRIES = 3  # إعادة المحاولة بعد RetryAfter
+
+# عدد threads تنفيذ استعلامات قاعدة البيانات (حتى لا يتوقف الـ event loop)
+DB_EXECUTOR_WORKERS = 2
+
+# تجميع محاولات الإجابة وكتابتها دفعة واحدة (write-behind)
+ATTEMPT_BATCH_SIZE = 50  # الكتابة عند الوصول لهذا العدد
+ATTEMPT_FLUSH_INTERVAL_SECONDS = 5  # أو بعد مرور هذا الوقت على أقدم محاولة
+
+# بنك الأسئلة المُجمّع (له الأولوية على ملفات JSON و GitHub إذا كان موجوداً)
+USE_QUESTION_BANK = True
 
 # إعدادات تحميل الأسئلة من GitHub
 GITHUB_RAW_URL = "https://raw.githubusercontent.com/AboALhasanx/json-files/refs/heads/main"
+GITHUB_API_URL = "https://api.github.com/repos/AboALhasanx/json-files/contents"
+
+# إعدادات اتصال HTTP (connection pool مشترك)
+HTTP_TIMEOUT_SECONDS = 10  # مهلة القراءة
+HTTP_CONNECT_TIMEOUT_SECONDS = 5  # مهلة إنشاء الاتصال
+HTTP_MAX_CONNECTIONS = 20  # الحد الأقصى للاتصالات المفتوحة
+HTTP_MAX_CONNECTIONS_PER_HOST = 6  # الحد الأقصى للطلبات المتزامنة لكل host
+PARTS_DISCOVERY_CONCURRENCY = 8  # عدد ملفات الأجزاء التي تُحمّل بالتوازي عند عرض الفصول
 
 # تفعيل/تعطيل التحميل من الإنترنت
 USE_ONLINE_QUESTIONS = True  # True = تحميل من GitHub, False = تحميل من الملفات المحلية
@@ -25,6 +63,14 @@ USE_ONLINE_QUESTIONS = True  # True = تحميل من GitHub, False = تحميل
 # Cache للأسئلة (لتجنب التحميل المتكرر)
 CACHE_QUESTIONS = True
 CACHE_DURATION_MINUTES = 60  # مدة صلاحية الـ Cache
+QUESTIONS_CACHE_DIR = "data/cache/questions"  # Cache دائم على القرص (يبقى بعد إعادة التشغيل)
+CACHE_STALE_WHILE_REVALIDATE = True  # تقديم النسخة المنتهية فوراً وتحديثها في الخلفية
+CACHE_REFRESH_AHEAD_MINUTES = 10  # تحديث الملفات النشطة قبل انتهاء صلاحيتها
+CACHE_HOT_THRESHOLD = 3  # عدد مرات الاستخدام التي تجعل الملف "نشطاً"
+CACHE_REFRESH_INTERVAL_SECONDS = 60  # الفاصل بين دورات التحديث في الخلفية
+CACHE_MAX_ENTRIES = 64  # أقصى عدد ملفات في Cache الذاكرة (الأقدم استخداماً يُحذف)
+CACHE_MAX_BYTES = 32 * 1024 * 1024  # أقصى حجم تقديري لـ Cache الذاكرة (32MB)
+CACHE_MAX_STALE_MINUTES = 24 * 60  # مدة الاحتفاظ بالملف المنتهي لتقديمه أثناء تحديثه
 
 # مطابقة أسماء المواد مع مجلدات GitHub
 SUBJECT_TO_FOLDER = {
@@ -124,6 +170,26 @@ XP_PER_WRONG_ANSWER = 2          # سؤال خطأ = 2 XP
 XP_BONUS_PERFECT_QUIZ = 25       # إذا 100% = 25 XP إضافية
 XP_BONUS_STREAK = 5              # كل يوم متواصل = 5 XP
 
+def calculate_quiz_xp(score: int, total: int, unanswered: int = 0) -> int:
+    """
+    حساب XP المكتسب من اختبار واحد
+    (يُستخدم عند إنهاء الاختبار وعند إعادة حساب XP من سجل الجلسات)
+    
+    Args:
+        unanswered: الأسئلة التي انتهى وقتها بدون إجابة (بدون XP)
+    """
+    xp = 0
+    # XP من الإجابات الصحيحة
+    xp += score * XP_PER_CORRECT_ANSWER
+    # XP من الإجابات الخاطئة (جائزة ترضية)
+    xp += (total - unanswered - score) * XP_PER_WRONG_ANSWER
+    
+    # مكافأة إضافية إذا 100%
+    if score == total:
+        xp += XP_BONUS_PERFECT_QUIZ
+    
+    return xp
+
 # صيغة حساب XP المطلوب لكل مستوى
 def calculate_xp_for_level(level: int) -> int:
     """
@@ -196,6 +262,19 @@ def get_tier_badge(tier: str) -> str:
     """الحصول على شارة المرتبة"""
     return TIER_BADGES.get(tier, "📊")
 
+# أعلى مستوى
+MAX_LEVEL = 100
+
+# XP المطلوب لكل مستوى (العنصر i = المستوى i+1) - يُحسب مرة واحدة
+LEVEL_XP_THRESHOLDS = tuple(calculate_xp_for_level(level) for level in range(1, MAX_LEVEL + 1))
+
+# معلومات كل مستوى مباشرة بالرقم (العنصر 0 غير مستخدم)
+_LEVEL_INFO_TABLE = [None] * (MAX_LEVEL + 1)
+for (_min_level, _max_level), _info in LEVEL_NAMES.items():
+    for _level in range(_min_level, _max_level + 1):
+        _LEVEL_INFO_TABLE[_level] = _info
+del _min_level, _max_level, _info, _level
+
 def get_level_info_from_number(level: int) -> dict:
     """
     الحصول على معلومات المستوى من رقمه
@@ -203,13 +282,33 @@ def get_level_info_from_number(level: int) -> dict:
     Returns:
         dict: {name, emoji, tier}
     """
-    for (min_level, max_level), info in LEVEL_NAMES.items():
-        if min_level <= level <= max_level:
-            return info
+    if 1 <= level <= MAX_LEVEL:
+        return _LEVEL_INFO_TABLE[level]
     
     # إذا تجاوز 100
     return {"name": "ما وراء الأسطورة", "emoji": "✨", "tier": "beyond"}
 
+def get_level_number_from_xp(xp: int) -> int:
+    """رقم المستوى فقط (بحث ثنائي في جدول XP)"""
+    return max(1, bisect_right(LEVEL_XP_THRESHOLDS, xp))
+
+def get_levels_from_xp(xp_values) -> list:
+    """
+    أرقام المستويات لعدة قيم XP دفعة واحدة (لوحات الصدارة والمهام الدورية)
+    يستخدم numpy إذا كان مثبتاً، وإلا bisect لكل قيمة
+    
+    Returns:
+        list: رقم المستوى لكل قيمة بنفس الترتيب
+    """
+    try:
+        import numpy as np
+    except ImportError:
+        thresholds = LEVEL_XP_THRESHOLDS
+        return [max(1, bisect_right(thresholds, xp)) for xp in xp_values]
+    
+    levels = np.searchsorted(LEVEL_XP_THRESHOLDS, np.asarray(xp_values), side='right')
+    return np.maximum(levels, 1).tolist()
+
 def get_level_from_xp(xp: int) -> dict:
     """
     حساب المستوى بناءً على XP
@@ -218,21 +317,16 @@ def get_level_from_xp(xp: int) -> dict:
         dict: معلومات المستوى الكاملة
     """
     # حساب المستوى الحالي
-    current_level = 1
-    for level in range(1, 101):  # حتى المستوى 100
-        if xp >= calculate_xp_for_level(level):
-            current_level = level
-        else:
-            break
+    current_level = get_level_number_from_xp(xp)
     
     # معلومات المستوى
     level_info = get_level_info_from_number(current_level)
     
     # XP المطلوب للمستويات
-    xp_current_level = calculate_xp_for_level(current_level) if current_level > 1 else 0
+    xp_current_level = LEVEL_XP_THRESHOLDS[current_level - 1] if current_level > 1 else 0
     
     # إذا وصل للمستوى 100
-    if current_level >= 100:
+    if current_level >= MAX_LEVEL:
         return {
             "level": current_level,
             "name": level_info["name"],
@@ -245,7 +339,7 @@ def get_level_from_xp(xp: int) -> dict:
         }
     
     # حساب XP في المستوى الحالي
-    xp_next_level = calculate_xp_for_level(current_level + 1)
+    xp_next_level = LEVEL_XP_THRESHOLDS[current_level]
     xp_in_current_level = xp - xp_current_level
     xp_needed_for_next = xp_next_level - xp_current_level
     progress = (xp_in_current_level / xp_needed_for_next * 100)
@@ -0,0 +1,209 @@
+"""
+حاوية التطبيق (Application Container)
+مكان واحد لإنشاء الخدمات والمستودعات المشتركة - كل مكوّن يُنشأ مرة واحدة عند أول استخدام
+بدلاً من إنشائه عند استيراد كل handler
+"""
+
+import functools
+import logging
+import time
+
+import config
+
+logger = logging.getLogger(__name__)
+
+def component(factory):
+    """خاصية تُنشأ مرة واحدة عند أول استخدام مع قياس زمن إنشائها"""
+    name = factory.__name__
+
+    @property
+    @functools.wraps(factory)
+    def getter(self):
+        if name in self._instances:
+            return self._instances[name]
+
+        # زمن المكوّن نفسه فقط (بدون المكوّنات التي أنشأها)
+        self._building.append(0.0)
+        start = time.perf_counter()
+        try:
+            instance = factory(self)
+        finally:
+            elapsed = time.perf_counter() - start
+            nested = self._building.pop()
+            if self._building:
+                self._building[-1] += elapsed
+
+        self._instances[name] = instance
+        self._timings[name] = elapsed - nested
+        return instance
+
+    return getter
+
+class AppContainer:
+    """الخدمات والمستودعات المشتركة للبوت"""
+
+    def __init__(self, settings=config):
+        """
+        Args:
+            settings: وحدة الإعدادات (config افتراضياً)
+        """
+        self.settings = settings
+        self._instances = {}
+        self._timings = {}
+        self._building = []
+
+    # ===============================
+    # الأسئلة
+    # ===============================
+
+    @component
+    def http_client(self):
+        from src.services.http_client import HttpClient
+        return HttpClient(
+            timeout=self.settings.HTTP_TIMEOUT_SECONDS,
+            connect_timeout=self.settings.HTTP_CONNECT_TIMEOUT_SECONDS,
+            max_connections=self.settings.HTTP_MAX_CONNECTIONS,
+            max_connections_per_host=self.settings.HTTP_MAX_CONNECTIONS_PER_HOST
+        )
+
+    @component
+    def disk_cache(self):
+        from src.services.disk_cache import DiskCache
+        return DiskCache(self.settings.QUESTIONS_CACHE_DIR)
+
+    @component
+    def question_bank(self):
+        from src.services.question_bank import QuestionBank
+        if not self.settings.USE_QUESTION_BANK:
+            return None
+        return QuestionBank.open(self.settings.QUESTION_BANK_PATH)
+
+    @component
+    def question_service(self):
+        from src.services.question_service import QuestionService
+        return QuestionService(
+            questions_dir=self.settings.QUESTIONS_DIR,
+            github_url=self.settings.GITHUB_RAW_URL,
+            use_online=self.settings.USE_ONLINE_QUESTIONS,
+            cache_enabled=self.settings.CACHE_QUESTIONS,
+            cache_duration=self.settings.CACHE_DURATION_MINUTES,
+            github_api_url=self.settings.GITHUB_API_URL,
+            http_client=self.http_client,
+            discovery_concurrency=self.settings.PARTS_DISCOVERY_CONCURRENCY,
+            disk_cache=self.disk_cache,
+            stale_while_revalidate=self.settings.CACHE_STALE_WHILE_REVALIDATE,
+            refresh_ahead=self.settings.CACHE_REFRESH_AHEAD_MINUTES,
+            hot_threshold=self.settings.CACHE_HOT_THRESHOLD,
+            question_bank=self.question_bank,
+            cache_max_entries=self.settings.CACHE_MAX_ENTRIES,
+            cache_max_bytes=self.settings.CACHE_MAX_BYTES,
+            cache_max_stale=self.settings.CACHE_MAX_STALE_MINUTES
+        )
+
+    @component
+    def quiz_timers(self):
+        from src.services.timer_wheel import TimerWheel
+        return TimerWheel(
+            tick=self.settings.TIMER_TICK_SECONDS,
+            slots=self.settings.TIMER_WHEEL_SLOTS
+        )
+
+    # ===============================
+    # الإرسال
+    # ===============================
+
+    @component
+    def outbound(self):
+        from src.services.outbound import OutboundScheduler
+        return OutboundScheduler(
+            global_rate=self.settings.OUTBOUND_GLOBAL_RATE,
+            per_chat_rate=self.settings.OUTBOUND_PER_CHAT_RATE,
+            per_chat_burst=self.settings.OUTBOUND_PER_CHAT_BURST,
+            max_retries=self.settings.OUTBOUND_MAX_RETRIES
+        )
+
+    # ===============================
+    # قاعدة البيانات
+    # ===============================
+
+    @component
+    def db_manager(self):
+        from src.database.db_manager import DatabaseManager
+        return DatabaseManager(
+            self.settings.DATABASE_PATH,
+            executor_workers=self.settings.DB_EXECUTOR_WORKERS
+        )
+
+    @component
+    def attempt_writer(self):
+        from src.database.attempt_writer import AttemptWriter
+        return AttemptWriter(
+            self.db_manager,
+            max_batch=self.settings.ATTEMPT_BATCH_SIZE,
+            flush_interval=self.settings.ATTEMPT_FLUSH_INTERVAL_SECONDS
+        )
+
+    @component
+    def user_repo(self):
+        from src.database.async_repositories import AsyncUserRepository
+        return AsyncUserRepository(self.db_manager)
+
+    @component
+    def quiz_repo(self):
+        from src.database.async_repositories import AsyncQuizRepository
+        return AsyncQuizRepository(self.db_manager, attempt_writer=self.attempt_writer)
+
+    @component
+    def stats_repo(self):
+        from src.database.async_repositories import AsyncStatsRepository
+        return AsyncStatsRepository(self.db_manager)
+
+    @component
+    def user_sessions(self):
+        from src.database.async_repositories import AsyncActiveSessionRepository
+        from src.services.session_store import SessionStore
+        return SessionStore(AsyncActiveSessionRepository(self.db_manager))
+
+    # ===============================
+    # دورة حياة التطبيق
+    # ===============================
+
+    def is_created(self, name: str) -> bool:
+        """هل تم إنشاء المكوّن؟"""
+        return name in self._instances
+
+    def timings(self) -> dict:
+        """زمن إنشاء كل مكوّن بالميلي ثانية (بترتيب الإنشاء)"""
+        return {name: round(seconds * 1000, 1) for name, seconds in self._timings.items()}
+
+    def log_startup_report(self, import_seconds: float = None):
+        """طباعة تقرير زمن بدء التشغيل (الاستيراد + إنشاء كل مكوّن)"""
+        timings = self.timings()
+        lines = []
+        if import_seconds is not None:
+            lines.append(f"   • استيراد الوحدات: {import_seconds * 1000:.1f}ms")
+        for name, ms in timings.items():
+            lines.append(f"   • {name}: {ms}ms")
+
+        total = sum(timings.values()) + (import_seconds or 0) * 1000
+        logger.info("⏱️ زمن بدء التشغيل:\n" + "\n".join(lines) + f"\n   = المجموع: {total:.1f}ms")
+
+    async def aclose(self):
+        """إغلاق الموارد التي تم إنشاؤها فقط (عند إيقاف البوت)"""
+        if self.is_created('question_service'):
+            await self.question_service.aclose()
+        elif self.is_created('http_client'):
+            await self.http_client.aclose()
+
+        # كتابة المحاولات المعلقة قبل إغلاق قاعدة البيانات
+        if self.is_created('quiz_repo'):
+            await self.quiz_repo.flush_attempts()
+
+        if self.is_created('question_bank') and self.question_bank:
+            self.question_bank.close()
+
+        if self.is_created('db_manager'):
+            self.db_manager.close()
+
+# الحاوية المشتركة للبوت
+container = AppContainer()
@@ -0,0 +1,69 @@
+"""
+مستودعات قاعدة البيانات غير المتزامنة (Async Repositories)
+نفس دوال المستودعات ونفس النتائج، لكن التنفيذ يتم في executor قاعدة البيانات
+حتى لا يتوقف الـ event loop أثناء قراءة/كتابة القرص
+"""
+
+import asyncio
+import functools
+from src.database.repositories import (
+    UserRepository, QuizRepository, StatsRepository, ActiveSessionRepository
+)
+
+class AsyncRepository:
+    """غلاف غير متزامن حول مستودع متزامن"""
+
+    def __init__(self, repository, executor):
+        """
+        Args:
+            repository: المستودع المتزامن الأصلي
+            executor: الـ executor الذي تُنفذ فيه الاستعلامات
+        """
+        self._repository = repository
+        self._executor = executor
+
+    def __getattr__(self, name: str):
+        """تحويل كل دالة في المستودع الأصلي إلى coroutine بنفس الاسم"""
+        attr = getattr(self._repository, name)
+        if not callable(attr):
+            return attr
+
+        @functools.wraps(attr)
+        async def call(*args, **kwargs):
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self._executor, functools.partial(attr, *args, **kwargs)
+            )
+
+        # حفظ الدالة حتى لا تُنشأ مرة أخرى
+        setattr(self, name, call)
+        return call
+
+    @property
+    def sync(self):
+        """المستودع المتزامن الأصلي (للسكربتات والـ jobs المتزامنة)"""
+        return self._repository
+
+class AsyncUserRepository(AsyncRepository):
+    """مستودع المستخدمين (غير متزامن)"""
+
+    def __init__(self, db_manager):
+        super().__init__(UserRepository(db_manager), db_manager.executor)
+
+class AsyncQuizRepository(AsyncRepository):
+    """مستودع الاختبارات (غير متزامن)"""
+
+    def __init__(self, db_manager, attempt_writer=None):
+        super().__init__(QuizRepository(db_manager, attempt_writer), db_manager.executor)
+
+class AsyncStatsRepository(AsyncRepository):
+    """مستودع الإحصائيات (غير متزامن)"""
+
+    def __init__(self, db_manager):
+        super().__init__(StatsRepository(db_manager), db_manager.executor)
+
+class AsyncActiveSessionRepository(AsyncRepository):
+    """مستودع الجلسات النشطة (غير متزامن)"""
+
+    def __init__(self, db_manager):
+        super().__init__(ActiveSessionRepository(db_manager), db_manager.executor)
@@ -0,0 +1,152 @@
+"""
+كاتب محاولات الإجابة (Write-behind)
+يجمع المحاولات في الذاكرة ويكتبها دفعة واحدة (executemany + commit واحد)
+"""
+
+import logging
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# user_answer للسؤال الذي انتهى وقته بدون إجابة (لا يُحسب في الأسئلة المُجابة)
+UNANSWERED = -1
+
+INSERT_ATTEMPT_SQL = '''
+    INSERT INTO question_attempts
+    (session_id, question_id, user_answer, correct_answer, is_correct, timestamp)
+    VALUES (?, ?, ?, ?, ?, ?)
+'''
+
+# نشاط اليوم (المعاملات: day, questions, correct, session_id) - اليوم من timestamp المحاولة (UTC)
+UPSERT_DAILY_ACTIVITY_SQL = '''
+    INSERT INTO user_daily_activity (user_id, day, questions, correct, quizzes)
+    SELECT user_id, ?, ?, ?, 0
+    FROM quiz_sessions WHERE session_id = ?
+    ON CONFLICT (user_id, day) DO UPDATE SET
+        questions = questions + excluded.questions,
+        correct = correct + excluded.correct
+'''
+
+def attempt_timestamp() -> str:
+    """وقت المحاولة (UTC) بنفس صيغة CURRENT_TIMESTAMP في SQLite"""
+    return time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime())
+
+def write_attempts(conn: sqlite3.Connection, rows: list):
+    """
+    كتابة المحاولات وتحديث نشاط اليوم (بدون commit)
+
+    Args:
+        rows: [(session_id, question_id, user_answer, correct_answer, is_correct, timestamp)]
+    """
+    if not rows:
+        return
+
+    conn.executemany(INSERT_ATTEMPT_SQL, rows)
+
+    # تحديث واحد لكل جلسة ويوم بدلاً من تحديث لكل محاولة
+    # (اليوم من وقت الإجابة وليس وقت الكتابة: الدفعة قد تُكتب بعد منتصف الليل)
+    per_day = {}
+    for session_id, _, user_answer, _, is_correct, timestamp in rows:
+        totals = per_day.setdefault((session_id, timestamp[:10]), [0, 0])
+        totals[0] += 0 if user_answer == UNANSWERED else 1
+        totals[1] += 1 if is_correct else 0
+
+    conn.executemany(UPSERT_DAILY_ACTIVITY_SQL, [
+        (day, questions, correct, session_id)
+        for (session_id, day), (questions, correct) in per_day.items()
+    ])
+
+class AttemptWriter:
+    """مخزن مؤقت لمحاولات الإجابة مع كتابة دفعية"""
+
+    def __init__(self, db_manager, max_batch: int = 50, flush_interval: float = 5):
+        """
+        Args:
+            db_manager: مدير قاعدة البيانات
+            max_batch: الكتابة عند وصول عدد المحاولات لهذا الحد
+            flush_interval: الكتابة إذا مرّ هذا العدد من الثواني على أقدم محاولة
+        """
+        self.db = db_manager
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+
+        self._buffer = []
+        self._oldest_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def pending_count(self) -> int:
+        """عدد المحاولات التي لم تُكتب بعد"""
+        return len(self._buffer)
+
+    def add(self, session_id: int, question_id: int, user_answer: int,
+            correct_answer: int, is_correct: bool):
+        """إضافة محاولة للمخزن (تُكتب تلقائياً عند الوصول للحد) مع وقت الإجابة الفعلي"""
+        timestamp = attempt_timestamp()
+        with self._lock:
+            if not self._buffer:
+                self._oldest_at = time.monotonic()
+            self._buffer.append((session_id, question_id, user_answer, correct_answer, is_correct, timestamp))
+            due = (len(self._buffer) >= self.max_batch or
+                   time.monotonic() - self._oldest_at >= self.flush_interval)
+
+        if due:
+            self.flush()
+
+    def take(self, session_id: int = None) -> list:
+        """
+        سحب المحاولات من المخزن (لكتابتها ضمن transaction أخرى)
+
+        Args:
+            session_id: سحب محاولات جلسة واحدة فقط (None = الكل)
+        """
+        with self._lock:
+            if session_id is None:
+                rows, self._buffer = self._buffer, []
+            else:
+                rows = [row for row in self._buffer if row[0] == session_id]
+                self._buffer = [row for row in self._buffer if row[0] != session_id]
+            if not self._buffer:
+                self._oldest_at = None
+        return rows
+
+    def requeue(self, rows: list):
+        """إعادة محاولات لم تنجح كتابتها إلى بداية المخزن"""
+        if not rows:
+            return
+        with self._lock:
+            self._buffer[:0] = rows
+            self._oldest_at = self._oldest_at or time.monotonic()
+
+    def write(self, conn: sqlite3.Connection, rows: list):
+        """كتابة المحاولات باستخدام اتصال/transaction قائم (بدون commit)"""
+        write_attempts(conn, rows)
+
+    def flush(self) -> int:
+        """
+        كتابة كل المحاولات المعلقة في transaction واحدة
+
+        Returns:
+            int: عدد المحاولات المكتوبة
+        """
+        rows = self.take()
+        if not rows:
+            return 0
+
+        conn = self.db.get_connection()
+        try:
+            with conn:
+                self.write(conn, rows)
+        except sqlite3.Error as e:
+            logger.error(f"❌ فشل حفظ {len(rows)} محاولة: {e}")
+            self.requeue(rows)
+            raise
+
+        logger.info(f"💾 تم حفظ {len(rows)} محاولة دفعة واحدة")
+        return len(rows)
+
+    def discard(self, session_id: int) -> int:
+        """حذف محاولات جلسة ملغاة من المخزن قبل كتابتها"""
+        return len(self.take(session_id))
@@ -5,21 +5,40 @@
 
 import sqlite3
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from src.database.migrations import run_migrations, get_schema_version
 
 logger = logging.getLogger(__name__)
 
 class DatabaseManager:
-    """مدير قاعدة البيانات"""
+    """مدير قاعدة البيانات (اتصال دائم واحد لكل thread)"""
     
-    def __init__(self, db_path: str):
+    def __init__(self, db_path: str, cache_size_kb: int = 8192,
+                 mmap_size_mb: int = 64, statement_cache_size: int = 256,
+                 executor_workers: int = 2):
         """
         تهيئة مدير قاعدة البيانات
         
         Args:
             db_path: مسار ملف قاعدة البيانات
+            cache_size_kb: حجم page cache لكل اتصال (KB)
+            mmap_size_mb: حجم الـ memory-mapped I/O (MB)
+            statement_cache_size: عدد الـ prepared statements المحفوظة لكل اتصال
+            executor_workers: عدد threads تنفيذ الاستعلامات للمستودعات غير المتزامنة
         """
         self.db_path = Path(db_path)
+        self.cache_size_kb = cache_size_kb
+        self.mmap_size_mb = mmap_size_mb
+        self.statement_cache_size = statement_cache_size
+        self.executor_workers = executor_workers
+        self._executor = None
+        
+        # اتصال لكل thread + قائمة بكل الاتصالات لإغلاقها عند الإيقاف
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
         
         # إنشاء مجلد database إذا لم يكن موجود
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
@@ -30,67 +49,68 @@ class DatabaseManager:
         logger.info(f"✅ قاعدة البيانات جاهزة: {self.db_path}")
     
     def get_connection(self) -> sqlite3.Connection:
-        """إنشاء اتصال جديد بقاعدة البيانات"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row  # للحصول على النتائج كـ dict
+        """
+        الحصول على اتصال الـ thread الحالي
+        يُنشأ مرة واحدة ويُعاد استخدامه (لا تغلقه بعد الاستخدام)
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._connect()
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
         return conn
     
-    def _create_tables(self):
-        """إنشاء جداول قاعدة البيانات إذا لم تكن موجودة"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        # جدول المستخدمين
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                user_id INTEGER PRIMARY KEY,
-                username TEXT,
-                first_name TEXT NOT NULL,
-                join_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                total_questions INTEGER DEFAULT 0,
-                correct_answers INTEGER DEFAULT 0,
-                xp INTEGER DEFAULT 0
-            )
-        ''')
-        
-        # إضافة عمود XP للمستخدمين القدامى (إذا لم يكن موجود)
-        try:
-            cursor.execute('ALTER TABLE users ADD COLUMN xp INTEGER DEFAULT 0')
-            logger.info("✅ تم إضافة عمود XP لجدول users")
-        except sqlite3.OperationalError:
-            # العمود موجود مسبقاً
-            pass
-        
-        # جدول جلسات الاختبارات
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS quiz_sessions (
-                session_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL,
-                subject TEXT NOT NULL,
-                chapter TEXT NOT NULL,
-                start_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                end_time TIMESTAMP,
-                score INTEGER DEFAULT 0,
-                total_questions INTEGER NOT NULL,
-                FOREIGN KEY (user_id) REFERENCES users (user_id)
-            )
-        ''')
+    def _connect(self) -> sqlite3.Connection:
+        """إنشاء اتصال جديد مع إعدادات الأداء"""
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=5,
+            cached_statements=self.statement_cache_size,
+            check_same_thread=False  # كل اتصال يُستخدم من thread واحد، والإغلاق فقط من thread آخر
+        )
+        conn.row_factory = sqlite3.Row  # للحصول على النتائج كـ dict
         
-        # جدول محاولات الأسئلة
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS question_attempts (
-                attempt_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                session_id INTEGER NOT NULL,
-                question_text TEXT NOT NULL,
-                user_answer INTEGER NOT NULL,
-                correct_answer INTEGER NOT NULL,
-                is_correct BOOLEAN NOT NULL,
-                timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (session_id) REFERENCES quiz_sessions (session_id)
+        # WAL: القراءة لا تنتظر الكتابة، و synchronous=NORMAL يكفي معه (fsync عند checkpoint فقط)
+        conn.execute('PRAGMA journal_mode = WAL')
+        conn.execute('PRAGMA synchronous = NORMAL')
+        conn.execute(f'PRAGMA cache_size = -{self.cache_size_kb}')
+        conn.execute(f'PRAGMA mmap_size = {self.mmap_size_mb * 1024 * 1024}')
+        conn.execute('PRAGMA temp_store = MEMORY')
+        return conn
+    
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        """الـ executor الخاص بقاعدة البيانات (يُنشأ عند أول استخدام)"""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.executor_workers,
+                thread_name_prefix='db'
             )
-        ''')
+        return self._executor
+    
+    def close(self):
+        """إغلاق الـ executor وجميع الاتصالات (عند إيقاف البوت)"""
+        if self._executor is not None:
+            # انتظار انتهاء الاستعلامات الجارية قبل إغلاق الاتصالات
+            self._executor.shutdown(wait=True)
+            self._executor = None
         
-        conn.commit()
-        conn.close()
+        with self._connections_lock:
+            for conn in self._connections:
+                try:
+                    conn.close()
+                except sqlite3.ProgrammingError:
+                    # اتصال من thread آخر انتهى بالفعل
+                    pass
+            self._connections.clear()
+        self._local = threading.local()
+        logger.info("🔌 تم إغلاق اتصالات قاعدة البيانات")
+    
+    def _create_tables(self):
+        """إنشاء/ترحيل جداول قاعدة البيانات إلى آخر إصدار"""
+        conn = self.get_connection()
+        applied = run_migrations(conn)
         
-        logger.info("✅ تم إنشاء جداول قاعدة البيانات بنجاح")
+        if applied:
+            logger.info(f"✅ تم تحديث مخطط قاعدة البيانات (الإصدار {get_schema_version(conn)})")
@@ -0,0 +1,122 @@
+"""
+أوامر صيانة قاعدة البيانات
+إعادة بناء الجداول المُجمّعة من البيانات الأصلية (المحاولات والجلسات)
+
+الاستخدام:
+    python -m src.database.maintenance backfill-daily-activity [--db PATH]
+    python -m src.database.maintenance repair-xp [--dry-run] [--db PATH]
+"""
+
+import argparse
+import logging
+import sqlite3
+import sys
+
+from src.database.attempt_writer import UNANSWERED
+
+logger = logging.getLogger(__name__)
+
+def backfill_daily_activity(conn: sqlite3.Connection) -> int:
+    """
+    إعادة بناء user_daily_activity بالكامل (بدون commit)
+
+    Returns:
+        int: عدد صفوف (مستخدم، يوم) بعد البناء
+    """
+    conn.execute('DELETE FROM user_daily_activity')
+
+    # الأسئلة والإجابات الصحيحة حسب يوم المحاولة
+    conn.execute('''
+        INSERT INTO user_daily_activity (user_id, day, questions, correct, quizzes)
+        SELECT qs.user_id,
+               DATE(qa.timestamp),
+               COUNT(*),
+               SUM(CASE WHEN qa.is_correct = 1 THEN 1 ELSE 0 END),
+               0
+        FROM question_attempts qa
+        JOIN quiz_sessions qs ON qs.session_id = qa.session_id
+        WHERE qa.user_answer != ?
+        GROUP BY qs.user_id, DATE(qa.timestamp)
+    ''', (UNANSWERED,))
+
+    # الاختبارات المكتملة حسب يوم الإنهاء
+    conn.execute('''
+        INSERT INTO user_daily_activity (user_id, day, questions, correct, quizzes)
+        SELECT user_id, DATE(end_time), 0, 0, COUNT(*)
+        FROM quiz_sessions
+        WHERE end_time IS NOT NULL
+        GROUP BY user_id, DATE(end_time)
+        ON CONFLICT (user_id, day) DO UPDATE SET
+            quizzes = excluded.quizzes
+    ''')
+
+    return conn.execute('SELECT COUNT(*) FROM user_daily_activity').fetchone()[0]
+
+def repair_xp(conn: sqlite3.Connection, dry_run: bool = False) -> list:
+    """
+    إعادة حساب XP كل مستخدم من سجل الجلسات المكتملة (بدون commit)
+    يصلح XP المضاعف الذي كانت تضيفه update_stats مع add_xp
+    و XP الأسئلة التي انتهى وقتها بدون إجابة
+
+    Returns:
+        list: [(user_id, old_xp, new_xp)] للمستخدمين الذين تغيّر XP لهم
+    """
+    from config import calculate_quiz_xp
+
+    conn.create_function('quiz_xp', 3, calculate_quiz_xp, deterministic=True)
+
+    rows = conn.execute('''
+        SELECT u.user_id,
+               COALESCE(u.xp, 0) as old_xp,
+               COALESCE((
+                   SELECT SUM(quiz_xp(s.score, s.total_questions, s.unanswered))
+                   FROM quiz_sessions s
+                   WHERE s.user_id = u.user_id AND s.end_time IS NOT NULL
+               ), 0) as new_xp
+        FROM users u
+    ''').fetchall()
+
+    changes = [(row['user_id'], row['old_xp'], row['new_xp'])
+               for row in rows if row['old_xp'] != row['new_xp']]
+
+    if not dry_run:
+        conn.executemany('UPDATE users SET xp = ? WHERE user_id = ?',
+                         [(new_xp, user_id) for user_id, _, new_xp in changes])
+
+    return changes
+
+def main(argv=None):
+    """واجهة سطر الأوامر"""
+    import config
+    from src.database.db_manager import DatabaseManager
+
+    parser = argparse.ArgumentParser(description="صيانة قاعدة بيانات البوت")
+    parser.add_argument('command', choices=['backfill-daily-activity', 'repair-xp'])
+    parser.add_argument('--db', default=config.DATABASE_PATH, help="مسار قاعدة البيانات")
+    parser.add_argument('--dry-run', action='store_true', help="عرض التغييرات بدون حفظها")
+    args = parser.parse_args(argv)
+
+    db = DatabaseManager(args.db)
+    conn = db.get_connection()
+
+    try:
+        if args.command == 'backfill-daily-activity':
+            with conn:
+                rows = backfill_daily_activity(conn)
+            logger.info(f"✅ تم بناء نشاط الأيام: {rows} صف")
+
+        elif args.command == 'repair-xp':
+            with conn:
+                changes = repair_xp(conn, dry_run=args.dry_run)
+            for user_id, old_xp, new_xp in changes:
+                logger.info(f"👤 {user_id}: {old_xp} → {new_xp} XP")
+            action = "سيتم تعديل" if args.dry_run else "تم تعديل"
+            logger.info(f"✅ {action} XP لـ {len(changes)} مستخدم")
+    finally:
+        db.close()
+
+    return 0
+
+if __name__ == '__main__':
+    logging.basicConfig(format='%(levelname)s - %(message)s', level=logging.INFO)
+    sys.exit(main())
@@ -0,0 +1,320 @@
+"""
+ترحيل مخطط قاعدة البيانات (Schema Migrations)
+كل ترحيل له رقم إصدار، والإصدار الحالي محفوظ في PRAGMA user_version
+"""
+
+import sqlite3
+import logging
+from src.database.repositories import question_content_hash, SCORE_PCT_SQL
+from src.database.maintenance import backfill_daily_activity
+from src.database.attempt_writer import UNANSWERED
+
+logger = logging.getLogger(__name__)
+
+def _column_exists(conn: sqlite3.Connection, table: str, column: str) -> bool:
+    """التحقق من وجود عمود في جدول"""
+    return any(row[1] == column for row in conn.execute(f'PRAGMA table_info({table})'))
+
+def _create_base_tables(conn: sqlite3.Connection):
+    """الجداول الأساسية (users, quiz_sessions, question_attempts)"""
+    # جدول المستخدمين
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS users (
+            user_id INTEGER PRIMARY KEY,
+            username TEXT,
+            first_name TEXT NOT NULL,
+            join_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            total_questions INTEGER DEFAULT 0,
+            correct_answers INTEGER DEFAULT 0,
+            xp INTEGER DEFAULT 0
+        )
+    ''')
+
+    # عمود XP لقواعد البيانات القديمة
+    if not _column_exists(conn, 'users', 'xp'):
+        conn.execute('ALTER TABLE users ADD COLUMN xp INTEGER DEFAULT 0')
+
+    # جدول جلسات الاختبارات
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS quiz_sessions (
+            session_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            subject TEXT NOT NULL,
+            chapter TEXT NOT NULL,
+            start_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            end_time TIMESTAMP,
+            score INTEGER DEFAULT 0,
+            total_questions INTEGER NOT NULL,
+            FOREIGN KEY (user_id) REFERENCES users (user_id)
+        )
+    ''')
+
+    # جدول محاولات الأسئلة
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS question_attempts (
+            attempt_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            session_id INTEGER NOT NULL,
+            question_text TEXT NOT NULL,
+            user_answer INTEGER NOT NULL,
+            correct_answer INTEGER NOT NULL,
+            is_correct BOOLEAN NOT NULL,
+            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (session_id) REFERENCES quiz_sessions (session_id)
+        )
+    ''')
+
+def _add_stats_indexes(conn: sqlite3.Connection):
+    """فهارس استعلامات الإحصائيات (بدون مسح كامل للجداول)"""
+    # get_user_stats / get_subject_progress: user_id + end_time IS NOT NULL
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_quiz_sessions_user_end
+        ON quiz_sessions (user_id, end_time)
+    ''')
+
+    # get_user_sessions (ORDER BY start_time) + get_weekly_stats (start_time >= ...)
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_quiz_sessions_user_start
+        ON quiz_sessions (user_id, start_time)
+    ''')
+
+    # get_weekly_stats: محاولات كل جلسة حسب الوقت + حذف محاولات جلسة
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_question_attempts_session_time
+        ON question_attempts (session_id, timestamp)
+    ''')
+
+def _intern_question_texts(conn: sqlite3.Connection):
+    """
+    جدول questions: كل سؤال يُخزن مرة واحدة، والمحاولات تشير إليه برقم
+    المحاولات القديمة تُرحّل بحساب hash النص مع مادة وفصل الجلسة
+    """
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS questions (
+            question_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            content_hash TEXT NOT NULL UNIQUE,
+            subject TEXT NOT NULL,
+            chapter TEXT NOT NULL,
+            version INTEGER NOT NULL DEFAULT 1,
+            question_text TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    
+    conn.create_function('question_content_hash', 3, question_content_hash, deterministic=True)
+    
+    # الأسئلة الموجودة في المحاولات القديمة
+    conn.execute('''
+        INSERT OR IGNORE INTO questions (content_hash, subject, chapter, question_text)
+        SELECT DISTINCT
+            question_content_hash(COALESCE(qs.subject, ''), COALESCE(qs.chapter, ''), qa.question_text),
+            COALESCE(qs.subject, ''),
+            COALESCE(qs.chapter, ''),
+            qa.question_text
+        FROM question_attempts qa
+        LEFT JOIN quiz_sessions qs ON qa.session_id = qs.session_id
+    ''')
+    
+    # إعادة بناء جدول المحاولات بعمود question_id بدلاً من النص الكامل
+    conn.execute('''
+        CREATE TABLE question_attempts_new (
+            attempt_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            session_id INTEGER NOT NULL,
+            question_id INTEGER NOT NULL,
+            user_answer INTEGER NOT NULL,
+            correct_answer INTEGER NOT NULL,
+            is_correct BOOLEAN NOT NULL,
+            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (session_id) REFERENCES quiz_sessions (session_id),
+            FOREIGN KEY (question_id) REFERENCES questions (question_id)
+        )
+    ''')
+    conn.execute('''
+        INSERT INTO question_attempts_new
+            (attempt_id, session_id, question_id, user_answer, correct_answer, is_correct, timestamp)
+        SELECT qa.attempt_id, qa.session_id, q.question_id,
+               qa.user_answer, qa.correct_answer, qa.is_correct, qa.timestamp
+        FROM question_attempts qa
+        LEFT JOIN quiz_sessions qs ON qa.session_id = qs.session_id
+        JOIN questions q ON q.content_hash = question_content_hash(
+            COALESCE(qs.subject, ''), COALESCE(qs.chapter, ''), qa.question_text
+        )
+    ''')
+    conn.execute('DROP TABLE question_attempts')
+    conn.execute('ALTER TABLE question_attempts_new RENAME TO question_attempts')
+    
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_question_attempts_session_time
+        ON question_attempts (session_id, timestamp)
+    ''')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_question_attempts_question
+        ON question_attempts (question_id)
+    ''')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_questions_subject_chapter
+        ON questions (subject, chapter)
+    ''')
+
+def _create_stats_aggregates(conn: sqlite3.Connection):
+    """
+    جداول إحصائيات مُجمّعة مسبقاً (تُحدّث مع كل finish_session)
+    عرض الإحصائيات يصبح قراءة بالمفتاح بدلاً من تجميع كل الجلسات
+    """
+    # إجمالي اختبارات المستخدم
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS user_quiz_totals (
+            user_id INTEGER PRIMARY KEY,
+            quiz_count INTEGER NOT NULL DEFAULT 0,
+            score_pct_sum REAL NOT NULL DEFAULT 0,
+            best_score_pct REAL NOT NULL DEFAULT 0,
+            last_attempt TIMESTAMP
+        )
+    ''')
+
+    # حسب المادة
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS user_subject_stats (
+            user_id INTEGER NOT NULL,
+            subject TEXT NOT NULL,
+            quiz_count INTEGER NOT NULL DEFAULT 0,
+            score_pct_sum REAL NOT NULL DEFAULT 0,
+            best_score_pct REAL NOT NULL DEFAULT 0,
+            last_attempt TIMESTAMP,
+            PRIMARY KEY (user_id, subject)
+        ) WITHOUT ROWID
+    ''')
+
+    # حسب المادة والفصل
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS user_chapter_stats (
+            user_id INTEGER NOT NULL,
+            subject TEXT NOT NULL,
+            chapter TEXT NOT NULL,
+            quiz_count INTEGER NOT NULL DEFAULT 0,
+            score_pct_sum REAL NOT NULL DEFAULT 0,
+            best_score INTEGER NOT NULL DEFAULT 0,
+            total_questions INTEGER NOT NULL DEFAULT 0,
+            last_attempt TIMESTAMP,
+            PRIMARY KEY (user_id, subject, chapter)
+        ) WITHOUT ROWID
+    ''')
+
+    # تعبئة الجداول من الجلسات المكتملة الموجودة
+    conn.execute(f'''
+        INSERT OR REPLACE INTO user_quiz_totals
+            (user_id, quiz_count, score_pct_sum, best_score_pct, last_attempt)
+        SELECT user_id, COUNT(*), SUM({SCORE_PCT_SQL}), MAX({SCORE_PCT_SQL}), MAX(end_time)
+        FROM quiz_sessions
+        WHERE end_time IS NOT NULL
+        GROUP BY user_id
+    ''')
+    conn.execute(f'''
+        INSERT OR REPLACE INTO user_subject_stats
+            (user_id, subject, quiz_count, score_pct_sum, best_score_pct, last_attempt)
+        SELECT user_id, subject, COUNT(*), SUM({SCORE_PCT_SQL}), MAX({SCORE_PCT_SQL}), MAX(end_time)
+        FROM quiz_sessions
+        WHERE end_time IS NOT NULL
+        GROUP BY user_id, subject
+    ''')
+    conn.execute(f'''
+        INSERT OR REPLACE INTO user_chapter_stats
+            (user_id, subject, chapter, quiz_count, score_pct_sum,
+             best_score, total_questions, last_attempt)
+        SELECT user_id, subject, chapter, COUNT(*), SUM({SCORE_PCT_SQL}),
+               MAX(score), MAX(total_questions), MAX(end_time)
+        FROM quiz_sessions
+        WHERE end_time IS NOT NULL
+        GROUP BY user_id, subject, chapter
+    ''')
+
+def _create_daily_activity(conn: sqlite3.Connection):
+    """نشاط كل مستخدم في كل يوم (إحصائيات الأسبوع تقرأ 7 صفوف على الأكثر)"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS user_daily_activity (
+            user_id INTEGER NOT NULL,
+            day TEXT NOT NULL,
+            questions INTEGER NOT NULL DEFAULT 0,
+            correct INTEGER NOT NULL DEFAULT 0,
+            quizzes INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, day)
+        ) WITHOUT ROWID
+    ''')
+
+    backfill_daily_activity(conn)
+
+def _create_active_sessions(conn: sqlite3.Connection):
+    """حالة الاختبارات الجارية (تُستعاد بعد إعادة تشغيل البوت)"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS active_sessions (
+            user_id INTEGER PRIMARY KEY,
+            session_id INTEGER NOT NULL,
+            payload TEXT NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    # finish_session / delete_session تحذف بالـ session_id
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_active_sessions_session
+        ON active_sessions (session_id)
+    ''')
+
+def _add_unanswered_column(conn: sqlite3.Connection):
+    """عدد أسئلة الجلسة التي انتهى وقتها بدون إجابة (لا تُحسب في XP والأسئلة المُجابة)"""
+    if not _column_exists(conn, 'quiz_sessions', 'unanswered'):
+        conn.execute('ALTER TABLE quiz_sessions ADD COLUMN unanswered INTEGER NOT NULL DEFAULT 0')
+
+    # الجلسات السابقة: من المحاولات المسجلة بدون إجابة
+    conn.execute('''
+        UPDATE quiz_sessions
+        SET unanswered = (
+            SELECT COUNT(*) FROM question_attempts qa
+            WHERE qa.session_id = quiz_sessions.session_id AND qa.user_answer = ?
+        )
+        WHERE session_id IN (SELECT session_id FROM question_attempts WHERE user_answer = ?)
+    ''', (UNANSWERED, UNANSWERED))
+
+# (الإصدار, الوصف, دالة الترحيل) - أضف الترحيلات الجديدة في النهاية فقط
+MIGRATIONS = [
+    (1, "الجداول الأساسية", _create_base_tables),
+    (2, "فهارس استعلامات الإحصائيات", _add_stats_indexes),
+    (3, "جدول الأسئلة وربط المحاولات برقم السؤال", _intern_question_texts),
+    (4, "جداول الإحصائيات المُجمّعة", _create_stats_aggregates),
+    (5, "جدول نشاط المستخدم اليومي", _create_daily_activity),
+    (6, "جدول الجلسات النشطة", _create_active_sessions),
+    (7, "عدد الأسئلة بدون إجابة في الجلسة", _add_unanswered_column),
+]
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    """إصدار المخطط الحالي"""
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+def run_migrations(conn: sqlite3.Connection) -> int:
+    """
+    تطبيق الترحيلات غير المطبقة بالترتيب
+    كل ترحيل يُطبق في transaction مستقلة مع تحديث user_version
+
+    Returns:
+        int: عدد الترحيلات المطبقة
+    """
+    current = get_schema_version(conn)
+    applied = 0
+
+    for version, description, migrate in MIGRATIONS:
+        if version <= current:
+            continue
+
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            migrate(conn)
+            conn.execute(f'PRAGMA user_version = {version}')
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            logger.error(f"❌ فشل الترحيل {version}: {description}")
+            raise
+
+        applied += 1
+        logger.info(f"✅ ترحيل قاعدة البيانات {version}: {description}")
+
+    return applied
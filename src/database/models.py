@@ -62,8 +62,18 @@ class QuestionAttempt:
     """نموذج محاولة الإجابة على سؤال"""
     attempt_id: Optional[int]
     session_id: int
-    question_text: str
+    question_id: int
     user_answer: int
     correct_answer: int
     is_correct: bool
     timestamp: datetime
+
+@dataclass
+class Question:
+    """نموذج السؤال المخزن (نص السؤال يُخزن مرة واحدة فقط)"""
+    question_id: int
+    content_hash: str
+    subject: str
+    chapter: str
+    version: int
+    question_text: str
@@ -3,14 +3,129 @@
 عمليات CRUD على قاعدة البيانات
 """
 
+import hashlib
 import sqlite3
+import threading
 from datetime import datetime
 from typing import Optional, List
 import logging
 from src.database.models import User, QuizSession, QuestionAttempt
+from src.database.attempt_writer import write_attempts, attempt_timestamp, UNANSWERED
 
 logger = logging.getLogger(__name__)
 
+# نسبة نتيجة الجلسة (0 إذا لم تحتوي أسئلة)
+SCORE_PCT_SQL = 'CASE WHEN total_questions > 0 THEN CAST(score AS FLOAT) / total_questions * 100 ELSE 0 END'
+
+# تحديث الجداول المُجمّعة بجلسة مكتملة واحدة (المعامل: session_id)
+UPDATE_STATS_AGGREGATES_SQL = (
+    f'''
+    INSERT INTO user_quiz_totals
+        (user_id, quiz_count, score_pct_sum, best_score_pct, last_attempt)
+    SELECT user_id, 1, {SCORE_PCT_SQL}, {SCORE_PCT_SQL}, end_time
+    FROM quiz_sessions WHERE session_id = ?
+    ON CONFLICT (user_id) DO UPDATE SET
+        quiz_count = quiz_count + 1,
+        score_pct_sum = score_pct_sum + excluded.score_pct_sum,
+        best_score_pct = MAX(best_score_pct, excluded.best_score_pct),
+        last_attempt = excluded.last_attempt
+    ''',
+    f'''
+    INSERT INTO user_subject_stats
+        (user_id, subject, quiz_count, score_pct_sum, best_score_pct, last_attempt)
+    SELECT user_id, subject, 1, {SCORE_PCT_SQL}, {SCORE_PCT_SQL}, end_time
+    FROM quiz_sessions WHERE session_id = ?
+    ON CONFLICT (user_id, subject) DO UPDATE SET
+        quiz_count = quiz_count + 1,
+        score_pct_sum = score_pct_sum + excluded.score_pct_sum,
+        best_score_pct = MAX(best_score_pct, excluded.best_score_pct),
+        last_attempt = excluded.last_attempt
+    ''',
+    f'''
+    INSERT INTO user_chapter_stats
+        (user_id, subject, chapter, quiz_count, score_pct_sum,
+         best_score, total_questions, last_attempt)
+    SELECT user_id, subject, chapter, 1, {SCORE_PCT_SQL}, score, total_questions, end_time
+    FROM quiz_sessions WHERE session_id = ?
+    ON CONFLICT (user_id, subject, chapter) DO UPDATE SET
+        quiz_count = quiz_count + 1,
+        score_pct_sum = score_pct_sum + excluded.score_pct_sum,
+        best_score = MAX(best_score, excluded.best_score),
+        total_questions = MAX(total_questions, excluded.total_questions),
+        last_attempt = excluded.last_attempt
+    ''',
+    '''
+    INSERT INTO user_daily_activity (user_id, day, questions, correct, quizzes)
+    SELECT user_id, DATE(end_time), 0, 0, 1
+    FROM quiz_sessions WHERE session_id = ?
+    ON CONFLICT (user_id, day) DO UPDATE SET
+        quizzes = quizzes + 1
+    ''',
+)
+
+def level_change(old_xp: int, new_xp: int) -> dict:
+    """
+    مقارنة المستوى قبل وبعد إضافة XP
+    
+    Returns:
+        dict: {old_level, new_level, leveled_up, xp_gained, total_xp}
+    """
+    from config import get_level_number_from_xp
+    old_level = get_level_number_from_xp(old_xp)
+    new_level = get_level_number_from_xp(new_xp)
+    
+    return {
+        'old_level': old_level,
+        'new_level': new_level,
+        'leveled_up': new_level > old_level,
+        'xp_gained': new_xp - old_xp,
+        'total_xp': new_xp
+    }
+
+def question_content_hash(subject: str, chapter: str, question_text: str) -> str:
+    """hash ثابت لمحتوى السؤال (يُستخدم كمفتاح في جدول questions)"""
+    content = f"{subject}\0{chapter}\0{question_text.strip()}"
+    return hashlib.sha1(content.encode('utf-8')).hexdigest()
+
+class QuestionRepository:
+    """مستودع الأسئلة (تخزين نص كل سؤال مرة واحدة)"""
+    
+    def __init__(self, db_manager):
+        self.db = db_manager
+        
+        # content_hash -> question_id (الأسئلة ثابتة فلا حاجة لانتهاء الصلاحية)
+        self._ids = {}
+        self._lock = threading.Lock()
+    
+    def get_or_create_id(self, subject: str, chapter: str, question_text: str,
+                         version: int = 1) -> int:
+        """
+        الحصول على رقم السؤال (وإضافته إذا لم يكن موجوداً)
+        
+        Returns:
+            int: question_id
+        """
+        content_hash = question_content_hash(subject, chapter, question_text)
+        
+        question_id = self._ids.get(content_hash)
+        if question_id is not None:
+            return question_id
+        
+        conn = self.db.get_connection()
+        with conn:
+            conn.execute('''
+                INSERT OR IGNORE INTO questions (content_hash, subject, chapter, version, question_text)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (content_hash, subject, chapter, version, question_text))
+        
+        row = conn.execute(
+            'SELECT question_id FROM questions WHERE content_hash = ?', (content_hash,)
+        ).fetchone()
+        
+        with self._lock:
+            self._ids[content_hash] = row['question_id']
+        return row['question_id']
+
 class UserRepository:
     """مستودع المستخدمين"""
     
@@ -20,15 +135,14 @@ class UserRepository:
     def create_user(self, user_id: int, username: Optional[str], first_name: str) -> User:
         """إنشاء مستخدم جديد"""
         conn = self.db.get_connection()
-        cursor = conn.cursor()
         
         try:
-            cursor.execute('''
-                INSERT INTO users (user_id, username, first_name)
-                VALUES (?, ?, ?)
-            ''', (user_id, username, first_name))
+            with conn:
+                conn.execute('''
+                    INSERT INTO users (user_id, username, first_name)
+                    VALUES (?, ?, ?)
+                ''', (user_id, username, first_name))
             
-            conn.commit()
             logger.info(f"✅ تم إنشاء مستخدم جديد: {user_id} - {first_name}")
             
             return User(
@@ -43,8 +157,6 @@ class UserRepository:
             # المستخدم موجود مسبقاً
             logger.info(f"المستخدم {user_id} موجود مسبقاً")
             return self.get_user(user_id)
-        finally:
-            conn.close()
     
     def get_user(self, user_id: int) -> Optional[User]:
         """الحصول على بيانات مستخدم"""
@@ -53,7 +165,6 @@ class UserRepository:
         
         cursor.execute('SELECT * FROM users WHERE user_id = ?', (user_id,))
         row = cursor.fetchone()
-        conn.close()
         
         if row:
             return User(
@@ -62,29 +173,26 @@ class UserRepository:
                 first_name=row['first_name'],
                 join_date=datetime.fromisoformat(row['join_date']),
                 total_questions=row['total_questions'],
-                correct_answers=row['correct_answers']
+                correct_answers=row['correct_answers'],
+                xp=row['xp'] or 0
             )
         return None
     
-    def update_stats(self, user_id: int, questions_count: int, correct_count: int, xp_earned: int = 0):
+    def update_stats(self, user_id: int, questions_count: int, correct_count: int):
         """
-        تحديث إحصائيات المستخدم + XP
+        تحديث إحصائيات المستخدم (بدون XP - يُضاف عبر add_xp أو finalize_session)
         """
         conn = self.db.get_connection()
-        cursor = conn.cursor()
         
-        cursor.execute('''
-            UPDATE users 
-            SET total_questions = total_questions + ?,
-                correct_answers = correct_answers + ?,
-                xp = xp + ?
-            WHERE user_id = ?
-        ''', (questions_count, correct_count, xp_earned, user_id))
-        
-        conn.commit()
-        conn.close()
+        with conn:
+            conn.execute('''
+                UPDATE users 
+                SET total_questions = total_questions + ?,
+                    correct_answers = correct_answers + ?
+                WHERE user_id = ?
+            ''', (questions_count, correct_count, user_id))
         
-        logger.info(f"✅ تم تحديث إحصائيات المستخدم {user_id} (+{xp_earned} XP)")
+        logger.info(f"✅ تم تحديث إحصائيات المستخدم {user_id}")
 
     def add_xp(self, user_id: int, xp_amount: int) -> dict:
         """
@@ -94,87 +202,195 @@ class UserRepository:
             dict: {old_level, new_level, leveled_up, xp_gained}
         """
         conn = self.db.get_connection()
-        cursor = conn.cursor()
         
-        # الحصول على XP الحالي
-        cursor.execute('SELECT xp FROM users WHERE user_id = ?', (user_id,))
-        result = cursor.fetchone()
-        old_xp = result['xp'] if result else 0
+        with conn:
+            # الإضافة والقراءة في أمر واحد (بدون قراءة ثم كتابة)
+            result = conn.execute(
+                'UPDATE users SET xp = COALESCE(xp, 0) + ? WHERE user_id = ? RETURNING xp',
+                (xp_amount, user_id)
+            ).fetchone()
         
-        # إضافة XP
-        new_xp = old_xp + xp_amount
-        cursor.execute('UPDATE users SET xp = ? WHERE user_id = ?', (new_xp, user_id))
-        conn.commit()
-        conn.close()
-        
-        # التحقق من الترقية
-        from config import get_level_from_xp
-        old_level = get_level_from_xp(old_xp)['level']
-        new_level = get_level_from_xp(new_xp)['level']
-        
-        return {
-            'old_level': old_level,
-            'new_level': new_level,
-            'leveled_up': new_level > old_level,
-            'xp_gained': xp_amount,
-            'total_xp': new_xp
-        }
+        new_xp = result['xp'] if result else xp_amount
+        return level_change(new_xp - xp_amount, new_xp)
 
 
 class QuizRepository:
     """مستودع الاختبارات"""
     
-    def __init__(self, db_manager):
+    def __init__(self, db_manager, attempt_writer=None):
+        """
+        Args:
+            db_manager: مدير قاعدة البيانات
+            attempt_writer: AttemptWriter لتجميع المحاولات (None = كتابة فورية)
+        """
         self.db = db_manager
+        self.attempt_writer = attempt_writer
+        self.questions = QuestionRepository(db_manager)
     
     def create_session(self, user_id: int, subject: str, chapter: str, 
                       total_questions: int) -> int:
         """إنشاء جلسة اختبار جديدة"""
         conn = self.db.get_connection()
-        cursor = conn.cursor()
         
-        cursor.execute('''
-            INSERT INTO quiz_sessions (user_id, subject, chapter, total_questions)
-            VALUES (?, ?, ?, ?)
-        ''', (user_id, subject, chapter, total_questions))
+        with conn:
+            cursor = conn.execute('''
+                INSERT INTO quiz_sessions (user_id, subject, chapter, total_questions)
+                VALUES (?, ?, ?, ?)
+            ''', (user_id, subject, chapter, total_questions))
         
         session_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
         
         logger.info(f"✅ تم إنشاء جلسة اختبار: {session_id}")
         return session_id
     
-    def finish_session(self, session_id: int, score: int):
-        """إنهاء جلسة الاختبار"""
+    def finish_session(self, session_id: int, score: int, unanswered: int = 0):
+        """إنهاء جلسة الاختبار (مع كتابة المحاولات المعلقة في نفس الـ transaction)"""
         conn = self.db.get_connection()
-        cursor = conn.cursor()
+        pending = self.attempt_writer.take() if self.attempt_writer else []
         
-        cursor.execute('''
+        try:
+            with conn:
+                if pending:
+                    self.attempt_writer.write(conn, pending)
+                self._close_session(conn, session_id, score, unanswered)
+        except sqlite3.Error:
+            # إعادة المحاولات للمخزن حتى لا تضيع
+            if pending:
+                self.attempt_writer.requeue(pending)
+            raise
+        
+        logger.info(f"✅ تم إنهاء جلسة الاختبار: {session_id}")
+    
+    def _close_session(self, conn: sqlite3.Connection, session_id: int, score: int,
+                       unanswered: int = 0) -> bool:
+        """
+        إغلاق الجلسة + تحديث الإحصائيات المُجمّعة (داخل transaction قائمة)
+        
+        Returns:
+            bool: False إذا كانت الجلسة منتهية مسبقاً
+        """
+        cursor = conn.execute('''
             UPDATE quiz_sessions 
-            SET end_time = CURRENT_TIMESTAMP, score = ?
-            WHERE session_id = ?
-        ''', (score, session_id))
+            SET end_time = CURRENT_TIMESTAMP, score = ?, unanswered = ?
+            WHERE session_id = ? AND end_time IS NULL
+        ''', (score, unanswered, session_id))
+        
+        # الإحصائيات المُجمّعة تُحدّث مرة واحدة فقط لكل جلسة
+        if cursor.rowcount:
+            for sql in UPDATE_STATS_AGGREGATES_SQL:
+                conn.execute(sql, (session_id,))
+        
+        # الجلسة لم تعد نشطة (لا تُستعاد بعد إعادة التشغيل)
+        conn.execute('DELETE FROM active_sessions WHERE session_id = ?', (session_id,))
+        return cursor.rowcount > 0
+    
+    def finalize_session(self, session_id: int, user_id: int, score: int, total: int,
+                         unanswered: int = 0) -> dict:
+        """
+        إنهاء الاختبار بالكامل في transaction واحدة:
+        المحاولات المعلقة + إغلاق الجلسة + إحصائيات المستخدم + XP
+        الأسئلة التي انتهى وقتها (unanswered) لا تُحسب في XP ولا في الأسئلة المُجابة
         
-        conn.commit()
-        conn.close()
+        BEGIN IMMEDIATE يحجز الكتابة قبل قراءة XP، فلا تضيع إضافة بسبب تحديث متزامن
+        وإنهاء نفس الجلسة مرتين لا يضيف XP مرتين
         
-        logger.info(f"✅ تم إنهاء جلسة الاختبار: {session_id}")
+        Returns:
+            dict: {old_level, new_level, leveled_up, xp_gained, total_xp}
+        """
+        from config import calculate_quiz_xp
+        
+        conn = self.db.get_connection()
+        pending = []
+        
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            
+            # سحب المحاولات المعلقة بعد حجز الكتابة فقط (فشل BEGIN لا يُفقدها)
+            pending = self.attempt_writer.take() if self.attempt_writer else []
+            if pending:
+                self.attempt_writer.write(conn, pending)
+            
+            row = conn.execute('SELECT xp FROM users WHERE user_id = ?', (user_id,)).fetchone()
+            old_xp = (row['xp'] or 0) if row else 0
+            new_xp = old_xp
+            
+            if self._close_session(conn, session_id, score, unanswered):
+                new_xp = old_xp + calculate_quiz_xp(score, total, unanswered)
+                conn.execute('''
+                    UPDATE users 
+                    SET total_questions = total_questions + ?,
+                        correct_answers = correct_answers + ?,
+                        xp = ?
+                    WHERE user_id = ?
+                ''', (total - unanswered, score, new_xp, user_id))
+            
+            conn.commit()
+        except sqlite3.Error:
+            conn.rollback()
+            # إعادة المحاولات للمخزن حتى لا تضيع
+            if pending:
+                self.attempt_writer.requeue(pending)
+            raise
+        
+        logger.info(f"✅ تم إنهاء جلسة الاختبار: {session_id} (+{new_xp - old_xp} XP)")
+        return level_change(old_xp, new_xp)
     
     def save_attempt(self, session_id: int, question_text: str, 
-                    user_answer: int, correct_answer: int, is_correct: bool):
-        """حفظ محاولة الإجابة"""
+                    user_answer: int, correct_answer: int, is_correct: bool,
+                    subject: str = '', chapter: str = '', version: int = 1):
+        """
+        حفظ محاولة الإجابة (تُجمّع في الذاكرة إذا كان AttemptWriter مفعلاً)
+        نص السؤال لا يُكرر في كل محاولة - يُحفظ رقمه من جدول questions
+        """
+        question_id = self.questions.get_or_create_id(subject, chapter, question_text, version)
+        
+        if self.attempt_writer:
+            self.attempt_writer.add(session_id, question_id, user_answer, correct_answer, is_correct)
+            return
+        
         conn = self.db.get_connection()
-        cursor = conn.cursor()
         
-        cursor.execute('''
-            INSERT INTO question_attempts 
-            (session_id, question_text, user_answer, correct_answer, is_correct)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (session_id, question_text, user_answer, correct_answer, is_correct))
+        with conn:
+            write_attempts(conn, [(session_id, question_id, user_answer, correct_answer, is_correct,
+                                   attempt_timestamp())])
+    
+    def flush_attempts(self) -> int:
+        """كتابة المحاولات المعلقة في قاعدة البيانات"""
+        if not self.attempt_writer:
+            return 0
+        return self.attempt_writer.flush()
+    
+    def delete_session(self, session_id: int):
+        """حذف جلسة ومحاولاتها (إلغاء الاختبار بدون حفظ النتيجة)"""
+        if self.attempt_writer:
+            self.attempt_writer.discard(session_id)
+        
+        conn = self.db.get_connection()
         
-        conn.commit()
-        conn.close()
+        with conn:
+            # طرح محاولات الجلسة المكتوبة مسبقاً من نشاط الأيام
+            conn.execute('''
+                UPDATE user_daily_activity
+                SET questions = user_daily_activity.questions - a.questions,
+                    correct = user_daily_activity.correct - a.correct
+                FROM (
+                    SELECT qs.user_id,
+                           DATE(qa.timestamp) as day,
+                           COUNT(*) as questions,
+                           SUM(CASE WHEN qa.is_correct = 1 THEN 1 ELSE 0 END) as correct
+                    FROM question_attempts qa
+                    JOIN quiz_sessions qs ON qs.session_id = qa.session_id
+                    WHERE qa.session_id = ? AND qa.user_answer != ?
+                    GROUP BY day
+                ) a
+                WHERE user_daily_activity.user_id = a.user_id
+                AND user_daily_activity.day = a.day
+            ''', (session_id, UNANSWERED))
+            conn.execute('DELETE FROM quiz_sessions WHERE session_id = ?', (session_id,))
+            conn.execute('DELETE FROM active_sessions WHERE session_id = ?', (session_id,))
+            conn.execute('DELETE FROM question_attempts WHERE session_id = ?', (session_id,))
+        
+        logger.info(f"🗑️ تم حذف جلسة الاختبار: {session_id}")
     
     def get_user_sessions(self, user_id: int, limit: int = 10) -> List[QuizSession]:
         """الحصول على آخر جلسات المستخدم"""
@@ -189,7 +405,6 @@ class QuizRepository:
         ''', (user_id, limit))
         
         rows = cursor.fetchall()
-        conn.close()
         
         sessions = []
         for row in rows:
@@ -206,6 +421,40 @@ class QuizRepository:
         
         return sessions
 
+class ActiveSessionRepository:
+    """مستودع الجلسات النشطة (حالة الاختبارات الجارية لاستعادتها بعد إعادة التشغيل)"""
+    
+    def __init__(self, db_manager):
+        self.db = db_manager
+    
+    def save(self, user_id: int, session_id: int, payload: str):
+        """حفظ/استبدال حالة جلسة المستخدم النشطة"""
+        conn = self.db.get_connection()
+        
+        with conn:
+            conn.execute('''
+                INSERT OR REPLACE INTO active_sessions (user_id, session_id, payload, updated_at)
+                VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+            ''', (user_id, session_id, payload))
+    
+    def delete(self, user_id: int):
+        """حذف الجلسة النشطة للمستخدم"""
+        conn = self.db.get_connection()
+        
+        with conn:
+            conn.execute('DELETE FROM active_sessions WHERE user_id = ?', (user_id,))
+    
+    def load_all(self) -> list:
+        """
+        كل الجلسات النشطة
+        
+        Returns:
+            list: [(user_id, payload)]
+        """
+        conn = self.db.get_connection()
+        rows = conn.execute('SELECT user_id, payload FROM active_sessions').fetchall()
+        return [(row['user_id'], row['payload']) for row in rows]
+
 class StatsRepository:
     """مستودع الإحصائيات"""
     
@@ -214,7 +463,8 @@ class StatsRepository:
     
     def get_weekly_stats(self, user_id: int) -> dict:
         """
-        الحصول على إحصائيات آخر 7 أيام
+        الحصول على إحصائيات آخر 7 أيام (اليوم + 6 أيام سابقة)
+        تُقرأ من user_daily_activity (7 صفوف على الأكثر)
         
         Returns:
             dict: {total_questions, correct_answers, accuracy, active_days}
@@ -222,32 +472,18 @@ class StatsRepository:
         conn = self.db.get_connection()
         cursor = conn.cursor()
         
-        # عدد الأسئلة والإجابات الصحيحة هذا الأسبوع
         cursor.execute('''
             SELECT 
-                COUNT(*) as total_attempts,
-                SUM(CASE WHEN is_correct = 1 THEN 1 ELSE 0 END) as correct,
-                COUNT(DISTINCT DATE(timestamp)) as active_days
-            FROM question_attempts qa
-            JOIN quiz_sessions qs ON qa.session_id = qs.session_id
-            WHERE qs.user_id = ? 
-            AND qa.timestamp >= datetime('now', '-7 days')
-        ''', (user_id,))
-        
-        result = cursor.fetchone()
-        
-        # عدد الاختبارات المكتملة هذا الأسبوع
-        cursor.execute('''
-            SELECT COUNT(*) as quiz_count
-            FROM quiz_sessions
+                SUM(questions) as total_attempts,
+                SUM(correct) as correct,
+                SUM(CASE WHEN questions > 0 THEN 1 ELSE 0 END) as active_days,
+                SUM(quizzes) as quiz_count
+            FROM user_daily_activity
             WHERE user_id = ? 
-            AND end_time IS NOT NULL
-            AND start_time >= datetime('now', '-7 days')
+            AND day >= DATE('now', '-6 days')
         ''', (user_id,))
         
-        quiz_result = cursor.fetchone()
-        
-        conn.close()
+        result = cursor.fetchone()
         
         total = result['total_attempts'] or 0
         correct = result['correct'] or 0
@@ -258,65 +494,45 @@ class StatsRepository:
             'correct_answers': correct,
             'accuracy': accuracy,
             'active_days': result['active_days'] or 0,
-            'quiz_count': quiz_result['quiz_count'] or 0
+            'quiz_count': result['quiz_count'] or 0
         }
 
-
     def get_user_stats(self, user_id: int) -> dict:
-        """الحصول على إحصائيات المستخدم الكاملة"""
+        """الحصول على إحصائيات المستخدم الكاملة (من الجداول المُجمّعة)"""
         conn = self.db.get_connection()
         cursor = conn.cursor()
         
         # إحصائيات عامة
         cursor.execute('''
             SELECT 
-                total_questions,
-                correct_answers,
-                join_date
-            FROM users 
-            WHERE user_id = ?
+                u.total_questions,
+                u.correct_answers,
+                u.join_date,
+                t.quiz_count,
+                t.best_score_pct
+            FROM users u
+            LEFT JOIN user_quiz_totals t ON t.user_id = u.user_id
+            WHERE u.user_id = ?
         ''', (user_id,))
         
         user_row = cursor.fetchone()
         
         if not user_row:
-            conn.close()
             return None
         
-        # عدد الاختبارات
-        cursor.execute('''
-            SELECT COUNT(*) as quiz_count
-            FROM quiz_sessions 
-            WHERE user_id = ? AND end_time IS NOT NULL
-        ''', (user_id,))
-        
-        quiz_count = cursor.fetchone()['quiz_count']
-        
-        # أفضل نتيجة
-        cursor.execute('''
-            SELECT 
-                MAX(CAST(score AS FLOAT) / total_questions * 100) as best_score
-            FROM quiz_sessions 
-            WHERE user_id = ? AND end_time IS NOT NULL
-        ''', (user_id,))
-        
-        best_score = cursor.fetchone()['best_score'] or 0
-        
         # إحصائيات حسب المادة
         cursor.execute('''
             SELECT 
                 subject,
-                COUNT(*) as count,
-                AVG(CAST(score AS FLOAT) / total_questions * 100) as avg_score
-            FROM quiz_sessions 
-            WHERE user_id = ? AND end_time IS NOT NULL
-            GROUP BY subject
+                quiz_count as count,
+                score_pct_sum / quiz_count as avg_score
+            FROM user_subject_stats 
+            WHERE user_id = ?
+            ORDER BY subject
         ''', (user_id,))
         
         subject_stats = cursor.fetchall()
         
-        conn.close()
-        
         # حساب نسبة الدقة
         total_q = user_row['total_questions']
         correct_a = user_row['correct_answers']
@@ -326,14 +542,14 @@ class StatsRepository:
             'total_questions': total_q,
             'correct_answers': correct_a,
             'accuracy': accuracy,
-            'quiz_count': quiz_count,
-            'best_score': best_score,
+            'quiz_count': user_row['quiz_count'] or 0,
+            'best_score': user_row['best_score_pct'] or 0,
             'join_date': user_row['join_date'],
             'subject_stats': [dict(row) for row in subject_stats]
         }
     
     def get_subject_progress(self, user_id: int) -> dict:
-        """الحصول على التقدم في كل مادة"""
+        """الحصول على التقدم في كل مادة (من الجداول المُجمّعة)"""
         conn = self.db.get_connection()
         cursor = conn.cursor()
         
@@ -341,18 +557,16 @@ class StatsRepository:
             SELECT 
                 subject,
                 chapter,
-                COUNT(*) as attempts,
-                AVG(CAST(score AS FLOAT) / total_questions * 100) as avg_score,
-                MAX(score) as best_score,
-                MAX(total_questions) as total_questions
-            FROM quiz_sessions 
-            WHERE user_id = ? AND end_time IS NOT NULL
-            GROUP BY subject, chapter
+                quiz_count as attempts,
+                score_pct_sum / quiz_count as avg_score,
+                best_score,
+                total_questions
+            FROM user_chapter_stats 
+            WHERE user_id = ?
             ORDER BY subject, chapter
         ''', (user_id,))
         
         rows = cursor.fetchall()
-        conn.close()
         
         # تنظيم البيانات حسب المادة
         progress = {}
@@ -370,3 +584,43 @@ class StatsRepository:
             })
         
         return progress
+    
+    def get_question_stats(self, subject: str, chapter: str = None, limit: int = 20) -> list:
+        """
+        إحصائيات كل سؤال (الأصعب أولاً) - تجميع على رقم السؤال وليس النص
+        
+        Returns:
+            list: [{question_id, question_text, attempts, correct, accuracy}]
+        """
+        conn = self.db.get_connection()
+        
+        query = '''
+            SELECT 
+                q.question_id,
+                q.question_text,
+                COUNT(*) as attempts,
+                SUM(CASE WHEN qa.is_correct = 1 THEN 1 ELSE 0 END) as correct
+            FROM questions q
+            JOIN question_attempts qa ON qa.question_id = q.question_id
+            WHERE q.subject = ?
+        '''
+        params = [subject]
+        if chapter is not None:
+            query += ' AND q.chapter = ?'
+            params.append(chapter)
+        query += '''
+            GROUP BY q.question_id
+            ORDER BY CAST(correct AS FLOAT) / attempts ASC
+            LIMIT ?
+        '''
+        params.append(limit)
+        
+        rows = conn.execute(query, params).fetchall()
+        
+        return [{
+            'question_id': row['question_id'],
+            'question_text': row['question_text'],
+            'attempts': row['attempts'],
+            'correct': row['correct'],
+            'accuracy': round(row['correct'] / row['attempts'] * 100, 1)
+        } for row in rows]
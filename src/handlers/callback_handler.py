@@ -6,19 +6,12 @@ from telegram import Update
 from telegram.ext import ContextTypes
 from src.utils.keyboards import main_menu_keyboard, parts_keyboard
 from src.constants.subjects import SUBJECTS, get_subject_full_name
-from src.handlers.quiz_handler import start_quiz_for_part, question_service, user_sessions, quiz_repo, user_repo
+from src.handlers.quiz_handler import start_quiz_for_part, cancel_timers
+from src.container import container
 import config
 import logging
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup
 
-
-from src.database.db_manager import DatabaseManager
-import config
-
-# إنشاء اتصال قاعدة البيانات للحذف
-db_manager = DatabaseManager(config.DATABASE_PATH)
-
-
 logger = logging.getLogger(__name__)
 
 async def handle_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -121,7 +114,7 @@ async def show_parts(query, context: ContextTypes.DEFAULT_TYPE, subject_key: str
         return
     
     # اكتشاف الأجزاء المتاحة
-    parts = question_service.get_available_parts_from_github(subject_key, folder_name)
+    parts = await container.question_service.get_available_parts_from_github_async(subject_key, folder_name)
     
     if not parts:
         await query.edit_message_text(
@@ -151,31 +144,27 @@ async def handle_exit_quiz(query, context: ContextTypes.DEFAULT_TYPE, user_id: i
     لا يحفظ النتيجة - فقط يلغي الاختبار
     """
     # التحقق من وجود جلسة نشطة
-    if user_id not in user_sessions:
+    if user_id not in container.user_sessions:
         await query.edit_message_text(
             "❌ <b>لا يوجد اختبار نشط حالياً.</b>",
             parse_mode='HTML'
         )
         return
     
-    session = user_sessions[user_id]
+    session = container.user_sessions[user_id]
     
     # حذف الجلسة من قاعدة البيانات (إلغاء تام)
     try:
         # حذف الجلسة من database بدون حفظ النتيجة
-        conn = db_manager.get_connection()
-        cursor = conn.cursor()
-        cursor.execute('DELETE FROM quiz_sessions WHERE session_id = ?', (session['session_id'],))
-        cursor.execute('DELETE FROM question_attempts WHERE session_id = ?', (session['session_id'],))
-        conn.commit()
-        conn.close()
+        await container.quiz_repo.delete_session(session['session_id'])
         
         logger.info(f"✅ تم إلغاء الجلسة {session['session_id']} للمستخدم {user_id}")
     except Exception as e:
         logger.error(f"خطأ في حذف الجلسة: {e}")
     
-    # حذف الجلسة من الذاكرة
-    del user_sessions[user_id]
+    # حذف الجلسة من الذاكرة والجلسات المحفوظة (مع مؤقتاتها)
+    cancel_timers(user_id)
+    await container.user_sessions.delete(user_id)
     
     # رسالة التأكيد
     message = f"""
@@ -203,15 +192,8 @@ async def show_level_callback(query, user_id: int):
     """
     عرض معلومات المستوى عند الضغط على زر "⭐ المستوى"
     """
-    from src.database.repositories import UserRepository
-    from src.database.db_manager import DatabaseManager
-    import config
-    
-    db_manager = DatabaseManager(config.DATABASE_PATH)
-    user_repo = UserRepository(db_manager)
-    
     # الحصول على المستخدم
-    user = user_repo.get_user(user_id)
+    user = await container.user_repo.get_user(user_id)
     if not user:
         await query.edit_message_text(
             "❌ <b>لم تبدأ أي اختبار بعد!</b>\n"
@@ -273,17 +255,10 @@ async def show_stats_callback(query, user_id: int):
     """
     عرض الإحصائيات عند الضغط على زر "📊 الإحصائيات"
     """
-    from src.database.repositories import UserRepository, StatsRepository
-    from src.database.db_manager import DatabaseManager
-    import config
     from datetime import datetime
     
-    db_manager = DatabaseManager(config.DATABASE_PATH)
-    user_repo = UserRepository(db_manager)
-    stats_repo = StatsRepository(db_manager)
-    
     # الحصول على المستخدم
-    user = user_repo.get_user(user_id)
+    user = await container.user_repo.get_user(user_id)
     if not user:
         await query.edit_message_text(
             "❌ <b>لم تبدأ أي اختبار بعد!</b>",
@@ -295,7 +270,7 @@ async def show_stats_callback(query, user_id: int):
         return
     
     # الحصول على الإحصائيات
-    stats = stats_repo.get_user_stats(user_id)
+    stats = await container.stats_repo.get_user_stats(user_id)
     
     # حساب عدد الأيام منذ الانضمام
     join_date = datetime.fromisoformat(stats['join_date'])
@@ -340,16 +315,8 @@ async def show_progress_callback(query, user_id: int):
     """
     عرض التقدم عند الضغط على زر "📈 التقدم"
     """
-    from src.database.repositories import UserRepository, StatsRepository
-    from src.database.db_manager import DatabaseManager
-    import config
-    
-    db_manager = DatabaseManager(config.DATABASE_PATH)
-    user_repo = UserRepository(db_manager)
-    stats_repo = StatsRepository(db_manager)
-    
     # الحصول على المستخدم
-    user = user_repo.get_user(user_id)
+    user = await container.user_repo.get_user(user_id)
     if not user:
         await query.edit_message_text(
             "❌ <b>لم تبدأ أي اختبار بعد!</b>",
@@ -361,7 +328,7 @@ async def show_progress_callback(query, user_id: int):
         return
     
     # الحصول على التقدم
-    progress = stats_repo.get_subject_progress(user_id)
+    progress = await container.stats_repo.get_subject_progress(user_id)
     
     if not progress:
         await query.edit_message_text(
@@ -398,15 +365,8 @@ async def show_achievements_callback(query, user_id: int):
     """
     عرض الإنجازات عند الضغط على زر "🏆 الإنجازات"
     """
-    from src.database.repositories import UserRepository
-    from src.database.db_manager import DatabaseManager
-    import config
-    
-    db_manager = DatabaseManager(config.DATABASE_PATH)
-    user_repo = UserRepository(db_manager)
-    
     # الحصول على المستخدم
-    user = user_repo.get_user(user_id)
+    user = await container.user_repo.get_user(user_id)
     if not user:
         await query.edit_message_text(
             "❌ <b>لم تبدأ أي اختبار بعد!</b>",
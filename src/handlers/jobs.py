@@ -0,0 +1,53 @@
+"""
+المهام الدورية (JobQueue)
+"""
+
+import asyncio
+import logging
+import time
+from collections import defaultdict
+
+from telegram.ext import ContextTypes
+import config
+from src.container import container
+from src.handlers.quiz_handler import handle_quiz_timeout
+from src.utils.update_processor import run_in_user_lane
+
+logger = logging.getLogger(__name__)
+
+async def refresh_question_cache_job(context: ContextTypes.DEFAULT_TYPE):
+    """تحديث Cache الأسئلة في الخلفية (stale-while-revalidate + refresh-ahead)"""
+    await container.question_service.refresh_stale_entries()
+
+async def flush_attempts_job(context: ContextTypes.DEFAULT_TYPE):
+    """كتابة محاولات الإجابة المعلقة (حد الوقت للـ write-behind)"""
+    await container.quiz_repo.flush_attempts()
+
+async def quiz_timers_job(context: ContextTypes.DEFAULT_TYPE):
+    """
+    نبضة عجلة مؤقتات الاختبارات (مهمة واحدة لكل الجلسات)
+    المؤقتات المنتهية تُعالج بالتوازي بين المستخدمين (بحد أقصى)
+    وداخل مسار المستخدم حتى لا تتسابق مع إجابته أو مع مؤقت آخر على نفس الجلسة
+    """
+    by_user = defaultdict(list)
+    for key, payload in container.quiz_timers.advance(time.time()):
+        by_user[key[1]].append((key, payload))
+
+    if not by_user:
+        return
+
+    semaphore = asyncio.Semaphore(config.TIMER_EXPIRY_CONCURRENCY)
+
+    async def expire(timers: list):
+        async with semaphore:
+            for key, payload in timers:
+                try:
+                    await handle_quiz_timeout(context, key, payload)
+                except Exception as e:
+                    # خطأ جلسة واحدة لا يوقف بقية المؤقتات المنتهية
+                    logger.error(f"❌ خطأ في مؤقت {key}: {e}")
+
+    await asyncio.gather(*(
+        run_in_user_lane(context, user_id, expire(timers))
+        for user_id, timers in by_user.items()
+    ))
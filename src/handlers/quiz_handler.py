@@ -5,32 +5,19 @@
 from telegram import Update, Poll
 from telegram.ext import ContextTypes
 import config
-from src.services.question_service import QuestionService
-from src.database.db_manager import DatabaseManager
-from src.database.repositories import UserRepository, QuizRepository
+from src.container import container
+from src.database.attempt_writer import UNANSWERED
 from src.constants.subjects import get_subject_name, get_subject_emoji
 from src.utils.keyboards import quiz_exit_keyboard
+from src.utils.update_processor import run_in_user_lane
 import logging
-import asyncio
+import time
 
 logger = logging.getLogger(__name__)
 
-# خدمة الأسئلة
-question_service = QuestionService(
-    questions_dir=config.QUESTIONS_DIR,
-    github_url=config.GITHUB_RAW_URL,
-    use_online=config.USE_ONLINE_QUESTIONS,
-    cache_enabled=config.CACHE_QUESTIONS,
-    cache_duration=config.CACHE_DURATION_MINUTES
-)
-
-# قاعدة البيانات
-db_manager = DatabaseManager(config.DATABASE_PATH)
-user_repo = UserRepository(db_manager)
-quiz_repo = QuizRepository(db_manager)
-
-# تخزين جلسات المستخدمين (مؤقت في الذاكرة)
-user_sessions = {}
+# مفاتيح عجلة المؤقتات: (النوع، user_id)
+QUESTION_TIMER = 'question'
+QUIZ_TIMER = 'quiz'
 
 async def start_quiz_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
@@ -43,13 +30,13 @@ async def start_quiz_command(update: Update, context: ContextTypes.DEFAULT_TYPE)
     
     try:
         # التأكد من وجود المستخدم
-        user = user_repo.get_user(user_id)
+        user = await container.user_repo.get_user(user_id)
         if not user:
-            user = user_repo.create_user(user_id, username, first_name)
+            user = await container.user_repo.create_user(user_id, username, first_name)
         
         # تحميل الأسئلة التجريبية
         try:
-            questions_data = question_service.load_questions_for_part('test', 'test_quiz.json')
+            questions_data = container.question_service.load_questions_for_part('test', 'test_quiz.json')
             # استخراج الأسئلة من البيانات
             if isinstance(questions_data, dict) and 'questions' in questions_data:
                 questions = questions_data['questions']
@@ -63,37 +50,28 @@ async def start_quiz_command(update: Update, context: ContextTypes.DEFAULT_TYPE)
             )
             return
 
-        # اختيار الأسئلة
+        # اختيار الأسئلة (أرقام فقط - الأسئلة نفسها مشتركة)
         if config.USE_ALL_QUESTIONS:
-            selected_questions = question_service.shuffle_all_questions(questions)
+            question_ids = container.question_service.create_quiz_order(questions)
         else:
-            selected_questions = question_service.get_random_questions(
-                questions, 
-                config.QUESTIONS_PER_QUIZ
-            )
-            for i in range(len(selected_questions)):
-                selected_questions[i] = question_service.shuffle_question_options(selected_questions[i])
+            question_ids = container.question_service.create_quiz_order(questions, config.QUESTIONS_PER_QUIZ)
         
         # إنشاء جلسة في قاعدة البيانات
-        session_id = quiz_repo.create_session(
+        session_id = await container.quiz_repo.create_session(
             user_id=user_id,
             subject='test',
             chapter='general',
-            total_questions=len(selected_questions)
+            total_questions=len(question_ids)
         )
         
-        # حفظ الجلسة في الذاكرة
-        user_sessions[user_id] = {
-            'session_id': session_id,
-            'questions': selected_questions,
-            'current_question': 0,
-            'score': 0,
-            'total': len(selected_questions),
-            'subject': 'test',
-            'chapter': 'general'
-        }
+        # حفظ الجلسة
+        session = new_session(
+            session_id, 'test', 'general', 'test_quiz.json', questions, question_ids
+        )
+        await container.user_sessions.put(user_id, session)
+        arm_timers(user_id, session)
         
-        start_msg = config.QUIZ_START_MESSAGE.format(total=len(selected_questions))
+        start_msg = config.QUIZ_START_MESSAGE.format(total=len(question_ids))
         await update.message.reply_html(start_msg)
         
         await send_question(update, context, user_id)
@@ -118,12 +96,12 @@ async def start_quiz_for_part(query, context: ContextTypes.DEFAULT_TYPE,
     
     try:
         # التأكد من وجود المستخدم
-        user = user_repo.get_user(user_id)
+        user = await container.user_repo.get_user(user_id)
         if not user:
-            user = user_repo.create_user(user_id, username, first_name)
+            user = await container.user_repo.create_user(user_id, username, first_name)
         
         # تحميل الأسئلة من GitHub
-        questions_data = question_service.load_questions_for_part(subject_key, filepath)
+        questions_data = await container.question_service.load_questions_for_part_async(subject_key, filepath)
         
         # استخراج metadata والأسئلة
         if isinstance(questions_data, dict):
@@ -134,40 +112,30 @@ async def start_quiz_for_part(query, context: ContextTypes.DEFAULT_TYPE,
             metadata = {'title_ar': part_name.upper().replace('PT', 'الجزء ')}
             questions_list = questions_data
         
-        # اختيار الأسئلة (كلها أو عدد محدد)
+        # اختيار الأسئلة (كلها أو عدد محدد) - أرقام فقط، الأسئلة نفسها مشتركة
         if config.USE_ALL_QUESTIONS:
             # استخدام جميع الأسئلة
-            selected_questions = question_service.shuffle_all_questions(questions_list)
-            logger.info(f"✅ سيتم استخدام جميع الأسئلة: {len(selected_questions)}")
+            question_ids = container.question_service.create_quiz_order(questions_list)
+            logger.info(f"✅ سيتم استخدام جميع الأسئلة: {len(question_ids)}")
         else:
             # اختيار عدد محدد
-            selected_questions = question_service.get_random_questions(
-                questions_list, 
-                config.QUESTIONS_PER_QUIZ
-            )
-            # خلط خيارات الأسئلة المختارة
-            for i in range(len(selected_questions)):
-                selected_questions[i] = question_service.shuffle_question_options(selected_questions[i])
+            question_ids = container.question_service.create_quiz_order(questions_list, config.QUESTIONS_PER_QUIZ)
         
         # إنشاء جلسة
-        session_id = quiz_repo.create_session(
+        session_id = await container.quiz_repo.create_session(
             user_id=user_id,
             subject=subject_key,
             chapter=part_name,
-            total_questions=len(selected_questions)
+            total_questions=len(question_ids)
         )
         
         # حفظ الجلسة
-        user_sessions[user_id] = {
-            'session_id': session_id,
-            'questions': selected_questions,
-            'current_question': 0,
-            'score': 0,
-            'total': len(selected_questions),
-            'subject': subject_key,
-            'chapter': part_name,
-            'metadata': metadata
-        }
+        session = new_session(
+            session_id, subject_key, part_name, filepath, questions_list, question_ids
+        )
+        session['metadata'] = metadata
+        await container.user_sessions.put(user_id, session)
+        arm_timers(user_id, session)
         
         # رسالة البداية
         subject_name = get_subject_name(subject_key)
@@ -179,35 +147,15 @@ async def start_quiz_for_part(query, context: ContextTypes.DEFAULT_TYPE,
 
 {subject_emoji} <b>المادة:</b> {subject_name}
 📖 <b>الفصل:</b> {chapter_title}
-🔢 <b>عدد الأسئلة:</b> {len(selected_questions)}
+🔢 <b>عدد الأسئلة:</b> {len(question_ids)}
 
 <i>جاهز؟ السؤال الأول قادم...</i>
 """
         
         await query.edit_message_text(start_msg, parse_mode='HTML')
         
-        # الانتظار قليلاً
-        await asyncio.sleep(1)
-        
-        # إرسال السؤال الأول
-        first_q = selected_questions[0]
-        await context.bot.send_poll(
-            chat_id=user_id,
-            question=f"Q1/{len(selected_questions)}: {first_q['question'][:250]}",
-            options=first_q['options'],
-            type=Poll.QUIZ,
-            correct_option_id=first_q['correct_option_id'],
-            explanation=first_q.get('explanation', ''),
-            is_anonymous=False
-        )
-        
-        # إرسال زر الخروج
-        await context.bot.send_message(
-            chat_id=user_id,
-            text="<i>💡 لإنهاء الاختبار في أي وقت، اضغط الزر أدناه:</i>",
-            reply_markup=quiz_exit_keyboard(user_id),
-            parse_mode='HTML'
-        )
+        # إرسال السؤال الأول بعد مهلة قصيرة (بدون إيقاف المعالج)
+        schedule_question(context, user_id, session, config.FIRST_QUESTION_DELAY_SECONDS)
         
     except (ConnectionError, ValueError) as e:
         logger.error(f"❌ فشل تحميل الأسئلة: {e}")
@@ -223,35 +171,89 @@ async def start_quiz_for_part(query, context: ContextTypes.DEFAULT_TYPE,
             parse_mode='HTML'
         )
 
+def new_session(session_id: int, subject: str, chapter: str, source: str,
+                questions: list, question_ids: list) -> dict:
+    """
+    جلسة اختبار جديدة: أرقام الأسئلة + بذرة خلط الخيارات فقط
+    
+    Args:
+        source: مسار ملف الفصل (لإعادة تحميله بعد إعادة التشغيل)
+        questions: أسئلة الفصل المشتركة (مرجع في الذاكرة فقط، لا يُحفظ)
+        question_ids: أرقام أسئلة الاختبار بالترتيب
+    """
+    session = {
+        'session_id': session_id,
+        'subject': subject,
+        'chapter': chapter,
+        'source': source,
+        'question_ids': question_ids,
+        'seed': container.question_service.new_quiz_seed(),
+        'chapter_size': len(questions),
+        'current_question': 0,
+        'score': 0,
+        'total': len(question_ids),
+        'polls': {},
+        '_questions': questions
+    }
+    
+    # مهلة الاختبار كاملاً (الاختبار بوقت محدد)
+    if config.QUIZ_TIME_LIMIT_MINUTES:
+        session['quiz_deadline'] = time.time() + config.QUIZ_TIME_LIMIT_MINUTES * 60
+    
+    return session
+
+async def get_session_question(session: dict, position: int) -> dict:
+    """
+    السؤال رقم position في الجلسة (ShuffledQuestion) مع خياراته المخلوطة
+    بعد إعادة التشغيل يُعاد تحميل الفصل مرة واحدة ويُربط بالجلسة
+    
+    Raises:
+        ValueError: إذا تغيّر عدد أسئلة الفصل منذ بداية الاختبار أو كانت الجلسة بصيغة قديمة
+    """
+    questions = session.get('_questions')
+    
+    if questions is None:
+        if 'question_ids' not in session:
+            raise ValueError("جلسة محفوظة بصيغة قديمة")
+        
+        questions_data = await container.question_service.load_questions_for_part_async(
+            session['subject'], session['source']
+        )
+        if isinstance(questions_data, dict):
+            questions = questions_data.get('questions', [])
+        else:
+            questions = questions_data  # صيغة قديمة
+        
+        if len(questions) != session['chapter_size']:
+            raise ValueError(f"تغيّر الفصل {session['source']} منذ بداية الاختبار")
+        session['_questions'] = questions
+    
+    return container.question_service.get_quiz_question(
+        questions, session['question_ids'], session['seed'], position
+    )
+
 async def send_question(update: Update, context: ContextTypes.DEFAULT_TYPE, user_id: int):
     """
     إرسال السؤال الحالي كـ Telegram Quiz
     """
-    session = user_sessions.get(user_id)
+    session = container.user_sessions.get(user_id)
     
     if not session:
         return
     
     current_index = session['current_question']
-    questions = session['questions']
     
-    if current_index >= len(questions):
+    if current_index >= session['total']:
         # انتهى الاختبار
         await finish_quiz(update, context, user_id)
         return
     
-    question_data = questions[current_index]
+    question_data = await get_session_question(session, current_index)
     
     # إرسال السؤال كـ Poll
-    await context.bot.send_poll(
-        chat_id=update.effective_chat.id,
-        question=f"Q{current_index + 1}/{len(questions)}: {question_data['question'][:250]}",
-        options=question_data['options'],
-        type=Poll.QUIZ,
-        correct_option_id=question_data['correct_option_id'],
-        explanation=question_data.get('explanation', ''),
-        is_anonymous=False,
-        open_period=60
+    await send_session_poll(
+        context, user_id, session, current_index, question_data,
+        chat_id=update.effective_chat.id
     )
     
     # إرسال زر الخروج إذا كان أول سؤال
@@ -267,19 +269,39 @@ async def handle_poll_answer(update: Update, context: ContextTypes.DEFAULT_TYPE)
     """
     معالجة إجابة المستخدم على السؤال
     """
-    user_id = update.poll_answer.user.id
-    session = user_sessions.get(user_id)
+    answer = update.poll_answer
+    user_id = answer.user.id
+    session = container.user_sessions.get(user_id)
     
     if not session:
         return
     
     # الحصول على الإجابة المختارة
-    selected_option = update.poll_answer.option_ids[0]
+    selected_option = answer.option_ids[0]
+    
+    # تحديد السؤال من رقم الاستطلاع (وليس current_question)
+    polls = container.user_sessions.polls
+    if 'polls' in session:
+        poll = polls.get(answer.poll_id)
+        if poll is None or poll.session_id != session['session_id']:
+            # استطلاع من جلسة سابقة أو سؤال انتهى وقته
+            logger.info(f"ℹ️ تجاهل إجابة المستخدم {user_id} على استطلاع غير نشط")
+            return
+        position = poll.position
+        
+        # الاستطلاع لا يُجاب مرتين (ولا يُحسب بعد انتهاء وقته)
+        polls.pop(answer.poll_id, session)
+    else:
+        # جلسة محفوظة قبل فهرس الاستطلاعات: الإجابة للسؤال الحالي
+        poll = None
+        position = session['current_question']
     
-    # الحصول على السؤال الحالي
-    current_index = session['current_question']
-    question_data = session['questions'][current_index]
-    correct_answer = question_data['correct_option_id']
+    try:
+        question_data = await get_session_question(session, position)
+    except (ConnectionError, ValueError) as e:
+        await report_session_error(context, user_id, e)
+        return
+    correct_answer = poll.correct_option_id if poll else question_data.correct_option_id
     
     # التحقق من صحة الإجابة
     is_correct = (selected_option == correct_answer)
@@ -289,16 +311,20 @@ async def handle_poll_answer(update: Update, context: ContextTypes.DEFAULT_TYPE)
         session['score'] += 1
     
     # حفظ المحاولة في قاعدة البيانات
-    quiz_repo.save_attempt(
-        session_id=session['session_id'],
-        question_text=question_data['question'],
-        user_answer=selected_option,
-        correct_answer=correct_answer,
-        is_correct=is_correct
-    )
+    await save_session_attempt(session, question_data, selected_option, correct_answer, is_correct)
+    
+    # إجابة متأخرة على سؤال سابق: تُحسب بدون تغيير السؤال الحالي
+    if position != session['current_question']:
+        await container.user_sessions.save(user_id)
+        return
     
-    # الانتقال للسؤال التالي
+    # الانتقال للسؤال التالي (وإيقاف مؤقت السؤال الحالي)
     session['current_question'] += 1
+    session.pop('deadline', None)
+    container.quiz_timers.cancel((QUESTION_TIMER, user_id))
+    
+    # حفظ التقدم (لاستكمال الاختبار إذا أُعيد تشغيل البوت)
+    await container.user_sessions.save(user_id)
     
     # إرسال رسالة تأكيد
     emoji = "✅" if is_correct else "❌"
@@ -310,31 +336,241 @@ async def handle_poll_answer(update: Update, context: ContextTypes.DEFAULT_TYPE)
         parse_mode='HTML'
     )
     
-    # الانتظار ثانية ونصف
-    await asyncio.sleep(1.5)
+    # إرسال السؤال التالي أو إنهاء الاختبار بعد مهلة (بدون إيقاف المعالج)
+    schedule_question(context, user_id, session, config.NEXT_QUESTION_DELAY_SECONDS)
+
+def schedule_question(context: ContextTypes.DEFAULT_TYPE, user_id: int, session: dict, delay: float):
+    """
+    جدولة إرسال السؤال الحالي للجلسة (أو النتيجة إذا انتهت الأسئلة) كـ job
+    حتى يعود المعالج فوراً ولا تنتظر تحديثات المستخدمين الآخرين خلف المهلة
+    """
+    context.job_queue.run_once(
+        deliver_question_job,
+        when=delay,
+        data={
+            'user_id': user_id,
+            'session_id': session['session_id'],
+            'position': session['current_question']
+        },
+        name=f"quiz_question:{user_id}"
+    )
+
+async def deliver_question_job(context: ContextTypes.DEFAULT_TYPE):
+    """
+    إرسال السؤال المجدول أو إنهاء الاختبار بعد آخر سؤال
+    (في مسار المستخدم حتى لا يتسابق مع إجابته أو مع مؤقتات الجلسة)
+    """
+    data = context.job.data
+    await run_in_user_lane(context, data['user_id'], deliver_question(context, data))
+
+async def deliver_question(context: ContextTypes.DEFAULT_TYPE, data: dict):
+    """إرسال السؤال رقم data['position'] إذا كانت الجلسة ما زالت عنده"""
+    user_id = data['user_id']
+    position = data['position']
+    session = container.user_sessions.get(user_id)
+    
+    # الجلسة انتهت أو استُبدلت باختبار جديد أو تقدّمت قبل موعد الإرسال
+    if (not session or session['session_id'] != data['session_id']
+            or session['current_question'] != position):
+        return
+    
+    if position >= session['total']:
+        await finish_quiz_after_answer(context, user_id)
+        return
+    
+    try:
+        question_data = await get_session_question(session, position)
+    except (ConnectionError, ValueError) as e:
+        await report_session_error(context, user_id, e)
+        return
+    
+    await send_session_poll(context, user_id, session, position, question_data)
     
-    # إرسال السؤال التالي أو إنهاء الاختبار
-    if session['current_question'] < len(session['questions']):
-        # السؤال التالي
-        next_q = session['questions'][session['current_question']]
-        await context.bot.send_poll(
+    # إرسال زر الخروج مع أول سؤال
+    if position == 0:
+        await context.bot.send_message(
             chat_id=user_id,
-            question=f"Q{session['current_question'] + 1}/{session['total']}: {next_q['question'][:250]}",
-            options=next_q['options'],
-            type=Poll.QUIZ,
-            correct_option_id=next_q['correct_option_id'],
-            explanation=next_q.get('explanation', ''),
-            is_anonymous=False
+            text="<i>💡 لإنهاء الاختبار في أي وقت، اضغط الزر أدناه:</i>",
+            reply_markup=quiz_exit_keyboard(user_id),
+            parse_mode='HTML'
         )
+
+async def send_session_poll(context: ContextTypes.DEFAULT_TYPE, user_id: int, session: dict,
+                            position: int, question_data, chat_id: int = None, **poll_options):
+    """
+    إرسال سؤال الجلسة كـ Telegram Quiz وتسجيله في فهرس الاستطلاعات
+    (يُحفظ مع الجلسة حتى تُحسب الإجابة صحيحاً بعد إعادة التشغيل)
+    """
+    # الاستطلاع يُغلق في تيليجرام مع انتهاء مهلة السؤال
+    if config.QUESTION_TIME_LIMIT_SECONDS:
+        poll_options.setdefault('open_period', config.QUESTION_TIME_LIMIT_SECONDS)
+    
+    message = await context.bot.send_poll(
+        chat_id=chat_id or user_id,
+        question=f"Q{position + 1}/{session['total']}: {question_data.poll_text}",
+        options=question_data.options,
+        type=Poll.QUIZ,
+        correct_option_id=question_data.correct_option_id,
+        explanation=question_data.explanation,
+        is_anonymous=False,
+        **poll_options
+    )
+    
+    container.user_sessions.polls.add(
+        message.poll.id, user_id, session, position, question_data.correct_option_id
+    )
+    
+    if config.QUESTION_TIME_LIMIT_SECONDS:
+        session['deadline'] = time.time() + config.QUESTION_TIME_LIMIT_SECONDS
+        arm_timers(user_id, session)
+    
+    await container.user_sessions.save(user_id)
+    return message
+
+async def save_session_attempt(session: dict, question_data, user_answer: int,
+                               correct_answer: int, is_correct: bool):
+    """حفظ محاولة إجابة على سؤال من الجلسة"""
+    await container.quiz_repo.save_attempt(
+        session_id=session['session_id'],
+        question_text=question_data.text,
+        user_answer=user_answer,
+        correct_answer=correct_answer,
+        is_correct=is_correct,
+        subject=session['subject'],
+        chapter=session['chapter'],
+        version=session.get('metadata', {}).get('version', 1)
+    )
+
+# ===============================
+# الاختبار بوقت محدد (عجلة المؤقتات)
+# ===============================
+
+def arm_timers(user_id: int, session: dict):
+    """جدولة مؤقتات الجلسة من المهل المحفوظة فيها (عند البدء وبعد كل سؤال وبعد إعادة التشغيل)"""
+    timers = container.quiz_timers
+    
+    if session.get('quiz_deadline'):
+        timers.schedule((QUIZ_TIMER, user_id), session['quiz_deadline'],
+                        {'session_id': session['session_id']})
+    
+    if session.get('deadline'):
+        position = session['current_question']
+        poll_id = next((poll_id for poll_id, (poll_position, _) in session.get('polls', {}).items()
+                        if poll_position == position), None)
+        if poll_id is not None:
+            timers.schedule((QUESTION_TIMER, user_id), session['deadline'],
+                            {'session_id': session['session_id'], 'position': position, 'poll_id': poll_id})
+
+def cancel_timers(user_id: int):
+    """إلغاء مؤقتات المستخدم (عند انتهاء الجلسة أو إلغائها)"""
+    container.quiz_timers.cancel((QUESTION_TIMER, user_id))
+    container.quiz_timers.cancel((QUIZ_TIMER, user_id))
+
+def has_open_poll(session: dict) -> bool:
+    """هل أُرسل السؤال الحالي للجلسة وما زال ينتظر الإجابة؟"""
+    position = session['current_question']
+    return any(poll_position == position for poll_position, _ in session.get('polls', {}).values())
+
+def restore_timers(application) -> int:
+    """
+    جدولة مؤقتات الجلسات المستعادة (بعد user_sessions.load)
+    المهل التي انتهت أثناء توقف البوت تنتهي مع النبضة الأولى
+    
+    job إرسال السؤال التالي لا يُحفظ: الجلسة التي توقف البوت في مهلة ما قبل سؤالها
+    يُعاد جدولة سؤالها الحالي (أو إنهاؤها إذا انتهت أسئلتها) حتى لا تبقى معلقة
+    """
+    context = application.context_types.context(application)
+    resumed = 0
+    for user_id, session in container.user_sessions.items():
+        arm_timers(user_id, session)
+        # جلسات ما قبل فهرس الاستطلاعات لا يُعرف منها هل أُرسل السؤال الحالي
+        if 'polls' in session and not has_open_poll(session):
+            schedule_question(context, user_id, session, config.FIRST_QUESTION_DELAY_SECONDS)
+            resumed += 1
+    
+    if resumed:
+        logger.info(f"▶️ استئناف {resumed} جلسة توقفت قبل إرسال سؤالها")
+    return len(container.quiz_timers)
+
+async def handle_quiz_timeout(context: ContextTypes.DEFAULT_TYPE, key: tuple, payload: dict):
+    """انتهاء مهلة سؤال أو اختبار (من نبضة عجلة المؤقتات)"""
+    kind, user_id = key
+    session = container.user_sessions.get(user_id)
+    
+    # الجلسة انتهت أو استُبدلت باختبار جديد
+    if not session or session['session_id'] != payload['session_id']:
+        return
+    
+    if kind == QUIZ_TIMER:
+        await expire_quiz(context, user_id, session)
     else:
-        # انتهى الاختبار
-        await finish_quiz_after_answer(context, user_id)
+        await expire_question(context, user_id, session, payload)
+
+async def expire_question(context: ContextTypes.DEFAULT_TYPE, user_id: int, session: dict, payload: dict):
+    """
+    انتهى وقت السؤال بدون إجابة: يُحسب خطأ ثم الانتقال للسؤال التالي أو إنهاء الاختبار
+    """
+    position = payload['position']
+    
+    # تمت الإجابة قبل انتهاء الوقت (الإجابة تحذف الاستطلاع من الفهرس)
+    if (position != session['current_question']
+            or container.user_sessions.polls.pop(payload['poll_id'], session) is None):
+        return
+    
+    session.pop('deadline', None)
+    
+    try:
+        question_data = await get_session_question(session, position)
+    except (ConnectionError, ValueError) as e:
+        await report_session_error(context, user_id, e)
+        return
+    
+    await save_session_attempt(session, question_data, UNANSWERED, question_data.correct_option_id, False)
+    
+    session['current_question'] += 1
+    session['unanswered'] = session.get('unanswered', 0) + 1
+    await container.user_sessions.save(user_id)
+    
+    await context.bot.send_message(
+        chat_id=user_id,
+        text="⏰ <b>انتهى الوقت!</b>\n\n<i>السؤال التالي قادم...</i>",
+        parse_mode='HTML'
+    )
+    
+    schedule_question(context, user_id, session, config.NEXT_QUESTION_DELAY_SECONDS)
+
+async def expire_quiz(context: ContextTypes.DEFAULT_TYPE, user_id: int, session: dict):
+    """
+    انتهى وقت الاختبار: الأسئلة المتبقية بدون إجابة (لا تُضاف للنتيجة) ثم إنهاء الاختبار
+    """
+    container.user_sessions.polls.discard_session(session)
+    session['polls'] = {}
+    session.pop('deadline', None)
+    session['unanswered'] = session.get('unanswered', 0) + session['total'] - session['current_question']
+    session['current_question'] = session['total']
+    
+    await context.bot.send_message(
+        chat_id=user_id,
+        text="⏰ <b>انتهى وقت الاختبار!</b>\n\n<i>الأسئلة المتبقية تُحسب بدون إجابة.</i>",
+        parse_mode='HTML'
+    )
+    
+    await finish_quiz_after_answer(context, user_id)
+
+async def report_session_error(context: ContextTypes.DEFAULT_TYPE, user_id: int, error: Exception):
+    """إبلاغ المستخدم بأن جلسته لا يمكن استكمالها"""
+    logger.error(f"❌ تعذر استكمال جلسة المستخدم {user_id}: {error}")
+    await context.bot.send_message(
+        chat_id=user_id,
+        text="<b>❌ تعذر استكمال الاختبار.</b>\n\nاستخدم زر الخروج ثم ابدأ اختباراً جديداً.",
+        parse_mode='HTML'
+    )
 
 async def finish_quiz(update: Update, context: ContextTypes.DEFAULT_TYPE, user_id: int):
     """
     إنهاء الاختبار وعرض النتيجة (يُستدعى من send_question)
     """
-    session = user_sessions.get(user_id)
+    session = container.user_sessions.get(user_id)
     
     if not session:
         return
@@ -343,16 +579,13 @@ async def finish_quiz(update: Update, context: ContextTypes.DEFAULT_TYPE, user_i
     total = session['total']
     percentage = round((score / total) * 100)
     
-    # حساب XP المكتسب
-    xp_earned = calculate_xp(score, total)
-    
-    # تحديث قاعدة البيانات
-    quiz_repo.finish_session(session['session_id'], score)
-    level_info = user_repo.add_xp(user_id, xp_earned)
-    user_repo.update_stats(user_id, total, score, xp_earned)
+    # تحديث قاعدة البيانات (الجلسة + الإحصائيات + XP في transaction واحدة)
+    level_info = await container.quiz_repo.finalize_session(
+        session['session_id'], user_id, score, total, session.get('unanswered', 0)
+    )
     
     # إنشاء رسالة النتيجة
-    result_message = create_result_message(score, total, percentage, xp_earned, level_info)
+    result_message = create_result_message(score, total, percentage, level_info['xp_gained'], level_info)
     
     await context.bot.send_message(
         chat_id=update.effective_chat.id,
@@ -360,14 +593,15 @@ async def finish_quiz(update: Update, context: ContextTypes.DEFAULT_TYPE, user_i
         parse_mode='HTML'
     )
     
-    # حذف الجلسة
-    del user_sessions[user_id]
+    # حذف الجلسة ومؤقتاتها
+    cancel_timers(user_id)
+    await container.user_sessions.delete(user_id)
 
 async def finish_quiz_after_answer(context: ContextTypes.DEFAULT_TYPE, user_id: int):
     """
     إنهاء الاختبار بعد آخر إجابة (يُستدعى من handle_poll_answer)
     """
-    session = user_sessions.get(user_id)
+    session = container.user_sessions.get(user_id)
     
     if not session:
         return
@@ -376,16 +610,13 @@ async def finish_quiz_after_answer(context: ContextTypes.DEFAULT_TYPE, user_id:
     total = session['total']
     percentage = round((score / total) * 100)
     
-    # حساب XP المكتسب
-    xp_earned = calculate_xp(score, total)
-    
-    # تحديث قاعدة البيانات
-    quiz_repo.finish_session(session['session_id'], score)
-    level_info = user_repo.add_xp(user_id, xp_earned)
-    user_repo.update_stats(user_id, total, score, xp_earned)
+    # تحديث قاعدة البيانات (الجلسة + الإحصائيات + XP في transaction واحدة)
+    level_info = await container.quiz_repo.finalize_session(
+        session['session_id'], user_id, score, total, session.get('unanswered', 0)
+    )
     
     # إنشاء رسالة النتيجة
-    result_message = create_result_message(score, total, percentage, xp_earned, level_info)
+    result_message = create_result_message(score, total, percentage, level_info['xp_gained'], level_info)
     
     await context.bot.send_message(
         chat_id=user_id,
@@ -393,24 +624,9 @@ async def finish_quiz_after_answer(context: ContextTypes.DEFAULT_TYPE, user_id:
         parse_mode='HTML'
     )
     
-    # حذف الجلسة
-    del user_sessions[user_id]
-
-def calculate_xp(score: int, total: int) -> int:
-    """
-    حساب XP المكتسب من الاختبار
-    """
-    xp = 0
-    # XP من الإجابات الصحيحة
-    xp += score * config.XP_PER_CORRECT_ANSWER
-    # XP من الإجابات الخاطئة (جائزة ترضية)
-    xp += (total - score) * config.XP_PER_WRONG_ANSWER
-    
-    # مكافأة إضافية إذا 100%
-    if score == total:
-        xp += config.XP_BONUS_PERFECT_QUIZ
-    
-    return xp
+    # حذف الجلسة ومؤقتاتها
+    cancel_timers(user_id)
+    await container.user_sessions.delete(user_id)
 
 def create_result_message(score: int, total: int, percentage: float, 
                           xp_earned: int, level_info: dict) -> str:
@@ -435,19 +651,18 @@ def create_result_message(score: int, total: int, percentage: float,
 ⭐ <b>XP المكتسب:</b> +{xp_earned} XP
 """
     
+    # المستوى الحالي (يُحسب مرة واحدة لرسالة الترقية ولشريط التقدم)
+    current_level = config.get_level_from_xp(level_info['total_xp'])
+    
     # إضافة رسالة ترقية المستوى
     if level_info['leveled_up']:
-        new_level_data = config.get_level_from_xp(level_info['total_xp'])
         message += f"""
 🎉 <b>ترقية! مستوى جديد!</b>
 
-{new_level_data['emoji']} <b>المستوى {new_level_data['level']}: {new_level_data['name']}</b>
+{current_level['emoji']} <b>المستوى {current_level['level']}: {current_level['name']}</b>
 
 """
     
-    # عرض معلومات المستوى الحالي
-    current_level = config.get_level_from_xp(level_info['total_xp'])
-    
     if 'max_level' not in current_level:
         # حساب شريط التقدم
         progress_bar_length = 10
@@ -4,15 +4,8 @@
 
 from telegram import Update
 from telegram.ext import ContextTypes
-import config
 from src.utils.keyboards import main_menu_keyboard
-from src.database.db_manager import DatabaseManager
-from src.database.repositories import UserRepository, StatsRepository
-
-# إنشاء الاتصال بقاعدة البيانات
-db_manager = DatabaseManager(config.DATABASE_PATH)
-user_repo = UserRepository(db_manager)
-stats_repo = StatsRepository(db_manager)
+from src.container import container
 
 async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
@@ -24,9 +17,9 @@ async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     first_name = update.effective_user.first_name
     
     # التأكد من وجود المستخدم
-    user = user_repo.get_user(user_id)
+    user = await container.user_repo.get_user(user_id)
     if not user:
-        user = user_repo.create_user(user_id, username, first_name)
+        user = await container.user_repo.create_user(user_id, username, first_name)
         is_new = True
     else:
         is_new = False
@@ -49,7 +42,7 @@ async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 """
     else:
         # مستخدم قديم - عرض إحصائيات الأسبوع
-        weekly_stats = stats_repo.get_weekly_stats(user_id)
+        weekly_stats = await container.stats_repo.get_weekly_stats(user_id)
         
         # اختيار emoji حسب النشاط
         if weekly_stats['active_days'] >= 5:
@@ -4,16 +4,10 @@
 
 from telegram import Update
 from telegram.ext import ContextTypes
-from src.database.db_manager import DatabaseManager
-from src.database.repositories import UserRepository, StatsRepository
+from src.container import container
 import config
 from datetime import datetime
 
-# إنشاء الاتصال بقاعدة البيانات
-db_manager = DatabaseManager(config.DATABASE_PATH)
-user_repo = UserRepository(db_manager)
-stats_repo = StatsRepository(db_manager)
-
 async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
     معالج أمر /stats
@@ -22,7 +16,7 @@ async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = update.effective_user.id
     
     # التحقق من وجود المستخدم
-    user = user_repo.get_user(user_id)
+    user = await container.user_repo.get_user(user_id)
     if not user:
         await update.message.reply_text(
             "❌ لم تبدأ أي اختبار بعد!\n"
@@ -31,7 +25,7 @@ async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
     
     # الحصول على الإحصائيات
-    stats = stats_repo.get_user_stats(user_id)
+    stats = await container.stats_repo.get_user_stats(user_id)
     
     if not stats:
         await update.message.reply_text("❌ لا توجد إحصائيات متاحة")
@@ -80,7 +74,7 @@ async def progress_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = update.effective_user.id
     
     # التحقق من وجود المستخدم
-    user = user_repo.get_user(user_id)
+    user = await container.user_repo.get_user(user_id)
     if not user:
         await update.message.reply_text(
             "❌ لم تبدأ أي اختبار بعد!\n"
@@ -89,7 +83,7 @@ async def progress_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
     
     # الحصول على التقدم
-    progress = stats_repo.get_subject_progress(user_id)
+    progress = await container.stats_repo.get_subject_progress(user_id)
     
     if not progress:
         await update.message.reply_text("❌ لا يوجد تقدم للعرض بعد")
@@ -119,7 +113,7 @@ async def level_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = update.effective_user.id
     
     # الحصول على المستخدم
-    user = user_repo.get_user(user_id)
+    user = await container.user_repo.get_user(user_id)
     if not user:
         await update.message.reply_html(
             "❌ <b>لم تبدأ أي اختبار بعد!</b>\n"
@@ -0,0 +1,91 @@
+"""
+Cache دائم على القرص لملفات الأسئلة
+يحفظ محتوى الملف مع ETag و Last-Modified للتحقق الشرطي من GitHub
+"""
+
+import hashlib
+import json
+import logging
+import os
+from datetime import datetime
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+class DiskCache:
+    """مخزن Cache على القرص (ملف JSON لكل مفتاح)"""
+
+    def __init__(self, cache_dir: str):
+        """
+        تهيئة الـ Cache
+
+        Args:
+            cache_dir: مجلد حفظ الملفات (يُنشأ إذا لم يكن موجود)
+        """
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def _path_for(self, key: str) -> Path:
+        """مسار ملف الـ Cache الخاص بالمفتاح"""
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        return self.cache_dir / f"{digest}.json"
+
+    def get(self, key: str):
+        """
+        قراءة مدخل من القرص
+
+        Returns:
+            dict: {key, body, etag, last_modified, fetched_at} أو None
+        """
+        path = self._path_for(key)
+        if not path.exists():
+            return None
+
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            entry['fetched_at'] = datetime.fromisoformat(entry['fetched_at'])
+            return entry
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"⚠️ ملف Cache تالف ({key}): {e}")
+            self.delete(key)
+            return None
+
+    def set(self, key: str, body: str, etag: str = None, last_modified: str = None,
+            fetched_at: datetime = None):
+        """حفظ مدخل على القرص (كتابة ذرية عبر ملف مؤقت)"""
+        entry = {
+            'key': key,
+            'body': body,
+            'etag': etag,
+            'last_modified': last_modified,
+            'fetched_at': (fetched_at or datetime.now()).isoformat()
+        }
+
+        path = self._path_for(key)
+        tmp_path = path.with_suffix('.tmp')
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(entry, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"⚠️ فشل الحفظ في Cache القرص ({key}): {e}")
+
+    def touch(self, key: str, fetched_at: datetime = None):
+        """تحديث وقت الجلب بعد رد 304 (بدون تغيير المحتوى)"""
+        entry = self.get(key)
+        if entry:
+            self.set(key, entry['body'], entry.get('etag'), entry.get('last_modified'),
+                     fetched_at)
+
+    def delete(self, key: str):
+        """حذف مدخل"""
+        try:
+            self._path_for(key).unlink()
+        except FileNotFoundError:
+            pass
+
+    def clear(self):
+        """حذف جميع الملفات"""
+        for path in self.cache_dir.glob('*.json'):
+            path.unlink(missing_ok=True)
@@ -0,0 +1,83 @@
+"""
+محرك HTTP غير متزامن مشترك
+Connection pool واحد مع keep-alive وحدود تزامن لكل host
+"""
+
+import asyncio
+import logging
+from urllib.parse import urlsplit
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+class HttpClient:
+    """عميل HTTP غير متزامن مع اتصالات دائمة (keep-alive)"""
+
+    def __init__(self, timeout: float = 10, connect_timeout: float = 5,
+                 max_connections: int = 20, max_keepalive_connections: int = 10,
+                 max_connections_per_host: int = 6, headers: dict = None,
+                 transport: httpx.AsyncBaseTransport = None):
+        """
+        تهيئة عميل HTTP
+
+        Args:
+            timeout: مهلة القراءة/الكتابة بالثواني
+            connect_timeout: مهلة إنشاء الاتصال بالثواني
+            max_connections: الحد الأقصى للاتصالات في الـ pool
+            max_keepalive_connections: عدد الاتصالات المحفوظة للاستخدام لاحقاً
+            max_connections_per_host: الحد الأقصى للطلبات المتزامنة لكل host
+            headers: headers افتراضية لكل الطلبات
+            transport: طبقة نقل بديلة (مثل httpx.MockTransport في الاختبارات)
+        """
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections
+        )
+        self.max_connections_per_host = max_connections_per_host
+        self.headers = headers or {}
+        self.transport = transport
+
+        # يُنشأ الـ client عند أول طلب (داخل الـ event loop)
+        self._client = None
+        self._host_semaphores = {}
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """الحصول على الـ client المشترك (إنشاؤه عند الحاجة)"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=self.limits,
+                headers=self.headers,
+                follow_redirects=True,
+                transport=self.transport
+            )
+        return self._client
+
+    def _get_host_semaphore(self, url: str) -> asyncio.Semaphore:
+        """Semaphore خاص بكل host لتحديد عدد الطلبات المتزامنة"""
+        host = urlsplit(url).netloc
+        semaphore = self._host_semaphores.get(host)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.max_connections_per_host)
+            self._host_semaphores[host] = semaphore
+        return semaphore
+
+    async def get(self, url: str, headers: dict = None) -> httpx.Response:
+        """
+        إرسال طلب GET عبر الـ pool المشترك
+
+        Raises:
+            httpx.HTTPError: عند فشل الاتصال أو انتهاء المهلة
+        """
+        async with self._get_host_semaphore(url):
+            return await self._get_client().get(url, headers=headers)
+
+    async def aclose(self):
+        """إغلاق جميع الاتصالات المفتوحة"""
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+            logger.info("🔌 تم إغلاق اتصالات HTTP")
+        self._client = None
+        self._host_semaphores.clear()
@@ -0,0 +1,211 @@
+"""
+Cache في الذاكرة بحد أقصى للحجم (LRU + TTL)
+يحذف الأقدم استخداماً عند تجاوز عدد المدخلات أو الحجم، ويحذف المنتهي بعد TTL
+"""
+
+import sys
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+def estimate_size(value, _seen: set = None) -> int:
+    """
+    تقدير حجم الكائن في الذاكرة (بالبايت) مع محتوياته
+    الكائنات المشتركة تُحسب مرة واحدة
+    """
+    if _seen is None:
+        _seen = set()
+
+    if id(value) in _seen:
+        return 0
+    _seen.add(id(value))
+
+    size = sys.getsizeof(value)
+
+    if isinstance(value, dict):
+        for key, item in value.items():
+            size += estimate_size(key, _seen) + estimate_size(item, _seen)
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        for item in value:
+            size += estimate_size(item, _seen)
+    elif hasattr(value, '__slots__'):
+        for name in value.__slots__:
+            if hasattr(value, name):
+                size += estimate_size(getattr(value, name), _seen)
+    elif hasattr(value, '__dict__'):
+        size += estimate_size(vars(value), _seen)
+
+    return size
+
+class LRUCache:
+    """
+    Cache بترتيب الاستخدام مع حد للمدخلات/البايتات وصلاحية قصوى
+    (للاستخدام من الـ event loop فقط - بدون أقفال)
+    """
+
+    def __init__(self, max_entries: int = None, max_bytes: int = None,
+                 ttl: timedelta = None, on_evict=None):
+        """
+        Args:
+            max_entries: أقصى عدد مدخلات (None = بدون حد)
+            max_bytes: أقصى حجم تقديري بالبايت (None = بدون حد)
+            ttl: حذف المدخل نهائياً بعد هذه المدة من تخزينه (None = بدون حد)
+            on_evict: دالة تُستدعى بالمفتاح عند حذف مدخل (تجاوز الحد أو انتهاء TTL)
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.on_evict = on_evict
+
+        # key -> [value, size, stored_at]
+        self._entries = OrderedDict()
+        self._bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __contains__(self, key) -> bool:
+        return self._live_entry(key) is not None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def resident_bytes(self) -> int:
+        """الحجم التقديري لكل المدخلات"""
+        return self._bytes
+
+    def _live_entry(self, key):
+        """المدخل إذا لم تنتهِ صلاحيته القصوى (المنتهي يُحذف)"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        if self.ttl is not None and datetime.now() - entry[2] >= self.ttl:
+            self._remove(key)
+            self.expirations += 1
+            if self.on_evict:
+                self.on_evict(key)
+            return None
+
+        return entry
+
+    def get(self, key, default=None, max_age: timedelta = None):
+        """
+        قراءة مدخل (تُحسب كـ hit أو miss)
+
+        Args:
+            max_age: اعتبار المدخل الأقدم من هذه المدة miss (بدون حذفه)
+        """
+        entry = self._live_entry(key)
+
+        if entry is None or (max_age is not None and datetime.now() - entry[2] >= max_age):
+            self.misses += 1
+            return default
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def get_stale(self, key, default=None):
+        """
+        قراءة مدخل انتهت صلاحيته (max_age) لتقديمه أثناء تحديثه في الخلفية
+        يُحسب stale hit (ليس hit ولا miss)
+        """
+        entry = self._live_entry(key)
+        if entry is None:
+            self.misses += 1
+            return default
+
+        self._entries.move_to_end(key)
+        self.stale_hits += 1
+        return entry[0]
+
+    def peek(self, key, default=None):
+        """قراءة مدخل بدون تحديث الترتيب أو العدادات"""
+        entry = self._live_entry(key)
+        return default if entry is None else entry[0]
+
+    def timestamp(self, key):
+        """وقت تخزين المدخل (أو None)"""
+        entry = self._live_entry(key)
+        return None if entry is None else entry[2]
+
+    def timestamps(self) -> list:
+        """[(key, stored_at)] لكل المدخلات الحالية"""
+        return [(key, entry[2]) for key, entry in list(self._entries.items())
+                if self._live_entry(key) is not None]
+
+    def set(self, key, value, size: int = None, timestamp: datetime = None):
+        """
+        تخزين مدخل ثم حذف الأقدم استخداماً حتى يعود الحجم ضمن الحدود
+
+        Args:
+            size: الحجم بالبايت (None = تقدير تلقائي)
+            timestamp: وقت التخزين (لاستعادة وقت الجلب الأصلي من القرص)
+        """
+        if key in self._entries:
+            self._remove(key)
+
+        if size is None:
+            size = estimate_size(value)
+
+        self._entries[key] = [value, size, timestamp or datetime.now()]
+        self._bytes += size
+        self._enforce_limits(keep=key)
+
+    def touch(self, key, timestamp: datetime = None):
+        """تجديد وقت تخزين المدخل (بعد التحقق أنه لم يتغير)"""
+        entry = self._entries.get(key)
+        if entry is not None:
+            entry[2] = timestamp or datetime.now()
+            self._entries.move_to_end(key)
+
+    def pop(self, key, default=None):
+        """حذف مدخل وإرجاع قيمته"""
+        if key not in self._entries:
+            return default
+        return self._remove(key)[0]
+
+    def clear(self):
+        """حذف كل المدخلات (العدادات تبقى)"""
+        self._entries.clear()
+        self._bytes = 0
+
+    def stats(self) -> dict:
+        """عدادات الـ Cache"""
+        lookups = self.hits + self.misses + self.stale_hits
+        return {
+            'entries': len(self._entries),
+            'resident_bytes': self._bytes,
+            'hits': self.hits,
+            'stale_hits': self.stale_hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups * 100, 1) if lookups else 0,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+        }
+
+    def _remove(self, key) -> list:
+        entry = self._entries.pop(key)
+        self._bytes -= entry[1]
+        return entry
+
+    def _enforce_limits(self, keep=None):
+        """حذف الأقدم استخداماً (المدخل الجديد لا يُحذف حتى لو تجاوز الحد وحده)"""
+        while self._entries:
+            over_entries = self.max_entries is not None and len(self._entries) > self.max_entries
+            over_bytes = self.max_bytes is not None and self._bytes > self.max_bytes
+            if not (over_entries or over_bytes):
+                break
+
+            oldest = next(iter(self._entries))
+            if oldest == keep:
+                break
+
+            self._remove(oldest)
+            self.evictions += 1
+            if self.on_evict:
+                self.on_evict(oldest)
@@ -0,0 +1,348 @@
+"""
+جدولة الرسائل الصادرة إلى تيليجرام (Outbound Scheduler)
+حد عام (~30 رسالة/ثانية) + حد لكل محادثة (~1 رسالة/ثانية) + أولوية + إعادة المحاولة بعد 429
+يعمل كـ rate limiter للـ Bot فتمر عبره كل الاستدعاءات (send_poll و send_message و edit...)
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from collections import deque
+
+from telegram.error import RetryAfter
+from telegram.ext import BaseRateLimiter
+
+logger = logging.getLogger(__name__)
+
+# الأولوية (الأصغر يُرسل أولاً)
+PRIORITY_QUIZ = 0     # أسئلة الاختبار
+PRIORITY_NORMAL = 1   # رسائل صحيح/خطأ والنتيجة
+PRIORITY_LOW = 2      # تعديل الرسائل: القوائم وعرض الإحصائيات والتقدم
+
+# الأولوية حسب نوع الطلب (يمكن تغييرها بـ rate_limit_args={'priority': ...} من context.bot)
+ENDPOINT_PRIORITY = {
+    'sendPoll': PRIORITY_QUIZ,
+    'stopPoll': PRIORITY_QUIZ,
+    'editMessageText': PRIORITY_LOW,
+}
+
+# حذف حالة المحادثات الخاملة كل هذه المدة (بالثواني)
+IDLE_PRUNE_INTERVAL = 60
+
+def retry_after_seconds(error: RetryAfter) -> float:
+    """مدة الانتظار المطلوبة من تيليجرام بالثواني (int أو timedelta حسب الإعدادات)"""
+    delay = error.retry_after
+    return delay.total_seconds() if hasattr(delay, 'total_seconds') else float(delay)
+
+class TokenBucket:
+    """دلو رموز: rate رمز في الثانية بحد أقصى capacity"""
+
+    __slots__ = ('rate', 'capacity', 'tokens', 'updated')
+
+    def __init__(self, rate: float, capacity: float, now: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = now
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now: float) -> float:
+        """الثواني المتبقية حتى يتوفر رمز (0 = متوفر الآن)"""
+        self._refill(now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def consume(self, now: float):
+        self._refill(now)
+        self.tokens -= 1
+
+    def is_full(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.capacity
+
+class _Ticket:
+    """طلب ينتظر دوره في الإرسال"""
+
+    __slots__ = ('priority', 'seq', 'future', 'enqueued_at')
+
+    def __init__(self, priority: int, seq: int, future: asyncio.Future, enqueued_at: float):
+        self.priority = priority
+        self.seq = seq
+        self.future = future
+        self.enqueued_at = enqueued_at
+
+class _ChatLane:
+    """طابور محادثة واحدة (بالترتيب) مع دلوها الخاص"""
+
+    __slots__ = ('tickets', 'bucket', 'busy', 'scheduled')
+
+    def __init__(self, bucket: TokenBucket):
+        self.tickets = deque()
+        self.bucket = bucket
+        self.busy = False        # طلب من هذه المحادثة قيد الإرسال
+        self.scheduled = False   # المحادثة موجودة في طابور الجاهز أو الانتظار
+
+class OutboundScheduler(BaseRateLimiter):
+    """
+    جدولة الطلبات الصادرة
+
+    - الطلبات التي لها chat_id تنتظر رمزاً من الدلو العام ورمزاً من دلو المحادثة
+    - طلبات المحادثة الواحدة تُرسل بالترتيب وواحداً تلو الآخر
+    - بين المحادثات الجاهزة: الأولوية الأعلى أولاً ثم الأقدم
+    - عند RetryAfter (429) يتوقف الإرسال كله للمدة المطلوبة ثم يُعاد الطلب في مقدمة طابوره
+    - الطلبات بدون chat_id (getUpdates و answerCallbackQuery...) تُرسل مباشرة
+    """
+
+    def __init__(self, global_rate: float = 30, per_chat_rate: float = 1,
+                 per_chat_burst: int = 3, max_retries: int = 3):
+        """
+        Args:
+            global_rate: أقصى عدد رسائل في الثانية لكل البوت
+            per_chat_rate: أقصى عدد رسائل في الثانية للمحادثة الواحدة
+            per_chat_burst: عدد الرسائل المسموح إرسالها متتالية في محادثة قبل التقييد
+            max_retries: أقصى عدد إعادة محاولة بعد RetryAfter
+        """
+        self.global_rate = global_rate
+        self.per_chat_rate = per_chat_rate
+        self.per_chat_burst = per_chat_burst
+        self.max_retries = max_retries
+
+        # سعة 1: توزيع منتظم بدون دفعات تتجاوز الحد في الثانية الأولى
+        self._global = TokenBucket(global_rate, 1, time.monotonic())
+        self._paused_until = 0.0
+        self._lanes = {}          # chat_id -> _ChatLane
+        self._ready = []          # heap: (priority, seq, chat_id) محادثات يمكن إرسال رأسها الآن
+        self._waiting = []        # heap: (ready_at, chat_id) محادثات تنتظر دلوها
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._dispatcher = None
+        self._last_prune = time.monotonic()
+
+        # المقاييس
+        self._queued = 0
+        self._in_flight = 0
+        self._granted = 0
+        self.sent = 0
+        self.retries = 0
+        self.failed = 0
+        self._delay_total = 0.0
+        self._delay_max = 0.0
+
+    # ===============================
+    # دورة الحياة
+    # ===============================
+
+    async def initialize(self) -> None:
+        """تشغيل مهمة التوزيع (يستدعيها الـ Bot عند initialize)"""
+        if self._dispatcher is None:
+            self._wakeup = asyncio.Event()
+            self._dispatcher = asyncio.create_task(self._dispatch())
+
+    async def shutdown(self) -> None:
+        """إيقاف مهمة التوزيع وإلغاء الطلبات المنتظرة"""
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+            try:
+                await self._dispatcher
+            except asyncio.CancelledError:
+                pass
+            self._dispatcher = None
+
+        for lane in self._lanes.values():
+            for ticket in lane.tickets:
+                ticket.future.cancel()
+            lane.tickets.clear()
+        self._lanes.clear()
+        self._ready.clear()
+        self._waiting.clear()
+        self._queued = 0
+
+        logger.info(f"📤 إحصائيات الإرسال: {self.stats()}")
+
+    # ===============================
+    # الطلبات
+    # ===============================
+
+    async def process_request(self, callback, args, kwargs, endpoint: str,
+                              data: dict, rate_limit_args):
+        """
+        إرسال الطلب عند حلول دوره
+
+        Args:
+            rate_limit_args: {'priority': ...} لتغيير الأولوية الافتراضية (اختياري)
+        """
+        chat_id = data.get('chat_id')
+        if chat_id is None:
+            return await callback(*args, **kwargs)
+
+        priority = (rate_limit_args or {}).get('priority', ENDPOINT_PRIORITY.get(endpoint, PRIORITY_NORMAL))
+
+        seq = next(self._seq)
+        for attempt in range(self.max_retries + 1):
+            # إعادة المحاولة تأخذ مقدمة طابور المحادثة وتحتفظ بترتيبها الأصلي
+            await self._acquire(chat_id, priority, seq, retry=attempt > 0)
+            try:
+                result = await callback(*args, **kwargs)
+                self.sent += 1
+                return result
+            except RetryAfter as e:
+                if attempt == self.max_retries:
+                    self.failed += 1
+                    logger.error(f"❌ تجاوز حد الإرسال بعد {self.max_retries} محاولات ({endpoint})")
+                    raise
+                self.retries += 1
+                seconds = retry_after_seconds(e)
+                self._pause(seconds)
+                logger.warning(f"⏳ حد الإرسال (429): إيقاف مؤقت {seconds} ثانية")
+            except Exception:
+                self.failed += 1
+                raise
+            finally:
+                self._release(chat_id)
+
+    async def _acquire(self, chat_id, priority: int, seq: int, retry: bool = False):
+        """انتظار دور الطلب في طابور المحادثة"""
+        now = time.monotonic()
+        lane = self._lanes.get(chat_id)
+        if lane is None:
+            lane = self._lanes[chat_id] = _ChatLane(
+                TokenBucket(self.per_chat_rate, self.per_chat_burst, now)
+            )
+
+        ticket = _Ticket(priority, seq, asyncio.get_running_loop().create_future(), now)
+        if retry:
+            lane.tickets.appendleft(ticket)
+        else:
+            lane.tickets.append(ticket)
+        self._queued += 1
+
+        self._schedule(chat_id, lane, now)
+
+        try:
+            await ticket.future
+        except asyncio.CancelledError:
+            # أُلغي الطلب وهو ينتظر: إزالته من الطابور (إن لم يُمنح دوره بعد)
+            if ticket in lane.tickets:
+                lane.tickets.remove(ticket)
+                self._queued -= 1
+            elif not ticket.future.cancelled():
+                self._release(chat_id)
+            raise
+
+    def _release(self, chat_id):
+        """انتهى طلب المحادثة: جدولة الطلب التالي فيها"""
+        self._in_flight -= 1
+        lane = self._lanes.get(chat_id)
+        if lane is None:
+            return
+        lane.busy = False
+        self._schedule(chat_id, lane, time.monotonic())
+
+    def _schedule(self, chat_id, lane: _ChatLane, now: float):
+        """وضع المحادثة في طابور الجاهز أو الانتظار (إن كان لديها طلب ولا يوجد طلب قيد الإرسال)"""
+        if lane.busy or lane.scheduled or not lane.tickets:
+            return
+
+        lane.scheduled = True
+        wait = lane.bucket.wait_time(now)
+        if wait > 0:
+            heapq.heappush(self._waiting, (now + wait, chat_id))
+        else:
+            head = lane.tickets[0]
+            heapq.heappush(self._ready, (head.priority, head.seq, chat_id))
+        self._wakeup.set()
+
+    def _pause(self, seconds: float):
+        """إيقاف كل الإرسال (بعد 429)"""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    # ===============================
+    # التوزيع
+    # ===============================
+
+    async def _dispatch(self):
+        """منح الأدوار: رمز عام + رمز المحادثة لرأس أعلى محادثة جاهزة أولوية"""
+        while True:
+            now = time.monotonic()
+
+            # المحادثات التي امتلأ دلوها تنتقل لطابور الجاهز
+            while self._waiting and self._waiting[0][0] <= now:
+                _, chat_id = heapq.heappop(self._waiting)
+                lane = self._lanes.get(chat_id)
+                if lane is not None and lane.tickets:
+                    head = lane.tickets[0]
+                    heapq.heappush(self._ready, (head.priority, head.seq, chat_id))
+                elif lane is not None:
+                    lane.scheduled = False
+
+            if now - self._last_prune >= IDLE_PRUNE_INTERVAL:
+                self._prune_idle(now)
+
+            if not self._ready:
+                timeout = self._waiting[0][0] - now if self._waiting else None
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            wait = max(self._global.wait_time(now), self._paused_until - now)
+            if wait > 0:
+                await asyncio.sleep(wait)
+                continue
+
+            _, _, chat_id = heapq.heappop(self._ready)
+            lane = self._lanes.get(chat_id)
+            lane.scheduled = False
+            if not lane.tickets:
+                continue
+
+            # رأس الطابور قد يكون تغيّر (إلغاء أو إعادة محاولة في المقدمة)
+            ticket = lane.tickets.popleft()
+            self._queued -= 1
+            if ticket.future.done():
+                self._schedule(chat_id, lane, now)
+                continue
+
+            self._global.consume(now)
+            lane.bucket.consume(now)
+            lane.busy = True
+            self._in_flight += 1
+            self._granted += 1
+
+            delay = now - ticket.enqueued_at
+            self._delay_total += delay
+            self._delay_max = max(self._delay_max, delay)
+
+            ticket.future.set_result(None)
+
+    def _prune_idle(self, now: float):
+        """حذف المحادثات الخاملة التي امتلأ دلوها (لا فرق بينها وبين محادثة جديدة)"""
+        idle = [chat_id for chat_id, lane in self._lanes.items()
+                if not lane.busy and not lane.scheduled and not lane.tickets and lane.bucket.is_full(now)]
+        for chat_id in idle:
+            del self._lanes[chat_id]
+        self._last_prune = now
+
+    # ===============================
+    # المقاييس
+    # ===============================
+
+    def stats(self) -> dict:
+        """عمق الطابور والتأخير وعدادات الإرسال"""
+        return {
+            'queue_depth': self._queued,
+            'in_flight': self._in_flight,
+            'chats': len(self._lanes),
+            'sent': self.sent,
+            'retries': self.retries,
+            'failed': self.failed,
+            'avg_delay_ms': round(self._delay_total / self._granted * 1000, 1) if self._granted else 0,
+            'max_delay_ms': round(self._delay_max * 1000, 1),
+            'paused': self._paused_until > time.monotonic(),
+        }
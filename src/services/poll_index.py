@@ -0,0 +1,57 @@
+"""
+فهرس الاستطلاعات (poll_id -> السؤال)
+يربط كل استطلاع مُرسل بجلسته ورقم السؤال والإجابة الصحيحة
+حتى تُحسب الإجابة على السؤال الذي أُرسل فعلاً (وليس current_question)
+"""
+
+from dataclasses import dataclass
+
+@dataclass(frozen=True, slots=True)
+class PollRef:
+    """استطلاع مُرسل لم تتم الإجابة عليه بعد"""
+    user_id: int
+    session_id: int
+    position: int            # رقم السؤال في الجلسة
+    correct_option_id: int   # موقع الإجابة الصحيحة بعد الخلط
+
+class PollIndex:
+    """
+    poll_id -> PollRef لكل الجلسات النشطة
+
+    نسخة مصغّرة من كل مدخل تُحفظ داخل الجلسة نفسها (session['polls'])
+    فتُحفظ معها في active_sessions وتُستعاد وتُحذف معها
+    """
+
+    def __init__(self):
+        self._polls = {}
+
+    def __contains__(self, poll_id: str) -> bool:
+        return poll_id in self._polls
+
+    def __len__(self) -> int:
+        return len(self._polls)
+
+    def get(self, poll_id: str):
+        """الاستطلاع (PollRef) أو None إذا لم يكن معروفاً أو تمت الإجابة عليه أو انتهى"""
+        return self._polls.get(poll_id)
+
+    def add(self, poll_id: str, user_id: int, session: dict, position: int, correct_option_id: int):
+        """تسجيل استطلاع مُرسل (في الفهرس وفي الجلسة)"""
+        self._polls[poll_id] = PollRef(user_id, session['session_id'], position, correct_option_id)
+        session.setdefault('polls', {})[poll_id] = [position, correct_option_id]
+
+    def pop(self, poll_id: str, session: dict = None):
+        """إزالة استطلاع (بعد الإجابة عليه أو انتهاء وقته)"""
+        if session is not None:
+            session.get('polls', {}).pop(poll_id, None)
+        return self._polls.pop(poll_id, None)
+
+    def restore(self, user_id: int, session: dict):
+        """إعادة بناء مدخلات جلسة محفوظة (عند بدء البوت)"""
+        for poll_id, (position, correct_option_id) in session.get('polls', {}).items():
+            self._polls[poll_id] = PollRef(user_id, session['session_id'], position, correct_option_id)
+
+    def discard_session(self, session: dict):
+        """حذف كل استطلاعات الجلسة (عند انتهائها أو استبدالها)"""
+        for poll_id in session.get('polls', ()):
+            self._polls.pop(poll_id, None)
@@ -0,0 +1,185 @@
+"""
+بنك الأسئلة المُجمّع (Compiled Question Bank)
+ملف ثنائي واحد مع فهرس لكل فصل، يُقرأ عبر mmap بدون تحليل JSON
+
+الصيغة:
+    header: magic (4) + إصدار الصيغة (2) + إصدار Python major.minor (1+1) + إصدار marshal (2) + طول الفهرس (4)
+    (رقم marshal.version ثابت بين إصدارات 3.x رغم أن بيانات marshal غير مضمونة بينها، لذلك يُحفظ إصدار Python)
+    index:  marshal {key: (offset, length, count)}
+    body:   marshal لكل فصل {'metadata': {...}, 'questions': [...]}
+
+التجميع:
+    python -m src.services.question_bank [source_dir] [output_path]
+"""
+
+import logging
+import marshal
+import mmap
+import os
+import struct
+import sys
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+BANK_MAGIC = b'QBNK'
+BANK_FORMAT_VERSION = 2
+HEADER = struct.Struct('<4sHBBHI')
+
+class QuestionBank:
+    """قارئ بنك الأسئلة (mmap + فهرس)"""
+
+    def __init__(self, path: str):
+        """
+        فتح البنك وقراءة الفهرس فقط
+
+        Raises:
+            ValueError: إذا كان الملف غير صالح أو مُجمّع بإصدار Python مختلف
+        """
+        self.path = Path(path)
+        self._file = open(self.path, 'rb')
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise ValueError(f"ملف البنك فارغ: {self.path}")
+
+        magic, format_version = HEADER.unpack_from(self._mm, 0)[:2]
+        if magic != BANK_MAGIC or format_version != BANK_FORMAT_VERSION:
+            self.close()
+            raise ValueError(f"ملف البنك غير صالح أو بصيغة قديمة: {self.path} - أعد التجميع")
+
+        _, _, py_major, py_minor, marshal_version, index_length = HEADER.unpack_from(self._mm, 0)
+        if (py_major, py_minor) != sys.version_info[:2] or marshal_version != marshal.version:
+            self.close()
+            raise ValueError(
+                f"البنك مُجمّع بـ Python {py_major}.{py_minor} والتشغيل بـ "
+                f"{sys.version_info[0]}.{sys.version_info[1]} - أعد التجميع"
+            )
+
+        index_start = HEADER.size
+        self._index = marshal.loads(self._mm[index_start:index_start + index_length])
+        self._body_start = index_start + index_length
+
+    @classmethod
+    def open(cls, path: str):
+        """
+        فتح البنك إذا كان موجوداً وصالحاً
+
+        Returns:
+            QuestionBank أو None
+        """
+        if not Path(path).exists():
+            logger.info(f"ℹ️ بنك الأسئلة غير موجود: {path}")
+            return None
+
+        try:
+            bank = cls(path)
+        except (OSError, ValueError, EOFError, struct.error) as e:
+            logger.warning(f"⚠️ تعذر فتح بنك الأسئلة: {e}")
+            return None
+
+        logger.info(f"✅ بنك الأسئلة جاهز: {len(bank)} فصل")
+        return bank
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._index
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def keys(self) -> list:
+        """مفاتيح الفصول المتاحة"""
+        return list(self._index)
+
+    def get(self, key: str):
+        """
+        قراءة فصل واحد فقط من البنك
+
+        Returns:
+            dict: {'metadata': {...}, 'questions': [...]} أو None
+        """
+        entry = self._index.get(key)
+        if entry is None:
+            return None
+
+        offset, length, _ = entry
+        start = self._body_start + offset
+        return marshal.loads(self._mm[start:start + length])
+
+    def close(self):
+        """إغلاق الملف"""
+        if getattr(self, '_mm', None) is not None:
+            self._mm.close()
+            self._mm = None
+        self._file.close()
+
+def compile_bank(source_dir: str, output_path: str) -> dict:
+    """
+    تجميع ملفات JSON في بنك واحد بعد توحيد الصيغة والتحقق من الأسئلة
+
+    Args:
+        source_dir: مجلد الأسئلة (data/questions أو نسخة محلية من ريبو GitHub)
+        output_path: مسار ملف البنك
+
+    Returns:
+        dict: {chapters, questions, skipped}
+    """
+    from src.services.question_service import QuestionService
+
+    source_dir = Path(source_dir)
+    output_path = Path(output_path)
+    loader = QuestionService(str(source_dir), cache_enabled=False)
+
+    index = {}
+    chunks = []
+    offset = 0
+    total_questions = 0
+    skipped = 0
+
+    for path in sorted(source_dir.rglob('*.json')):
+        key = path.relative_to(source_dir).as_posix()
+
+        try:
+            data = loader.load_questions_from_local(key)
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️ تخطي {key}: {e}")
+            continue
+
+        questions = [q for q in data['questions'] if loader.validate_question(q)]
+        skipped += len(data['questions']) - len(questions)
+
+        chunk = marshal.dumps({'metadata': data.get('metadata', {}), 'questions': questions})
+        index[key] = (offset, len(chunk), len(questions))
+        chunks.append(chunk)
+        offset += len(chunk)
+        total_questions += len(questions)
+
+    index_bytes = marshal.dumps(index)
+    header = HEADER.pack(BANK_MAGIC, BANK_FORMAT_VERSION, *sys.version_info[:2],
+                         marshal.version, len(index_bytes))
+
+    # كتابة ذرية حتى لا يقرأ البوت ملفاً ناقصاً
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = output_path.with_suffix('.tmp')
+    with open(tmp_path, 'wb') as f:
+        f.write(header)
+        f.write(index_bytes)
+        for chunk in chunks:
+            f.write(chunk)
+    os.replace(tmp_path, output_path)
+
+    logger.info(f"✅ تم تجميع {len(index)} فصل ({total_questions} سؤال) في {output_path}")
+    if skipped:
+        logger.warning(f"⚠️ تم استبعاد {skipped} سؤال غير صالح")
+
+    return {'chapters': len(index), 'questions': total_questions, 'skipped': skipped}
+
+if __name__ == '__main__':
+    import config
+
+    logging.basicConfig(format='%(levelname)s - %(message)s', level=logging.INFO)
+
+    source = sys.argv[1] if len(sys.argv) > 1 else config.QUESTIONS_DIR
+    output = sys.argv[2] if len(sys.argv) > 2 else config.QUESTION_BANK_PATH
+    compile_bank(source, output)
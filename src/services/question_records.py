@@ -0,0 +1,70 @@
+"""
+سجلات الأسئلة الثابتة (Immutable Question Records)
+تُبنى مرة واحدة عند تحميل الفصل وتُشارك بين كل الجلسات بدون نسخ
+"""
+
+from dataclasses import dataclass
+
+# حدود تيليجرام (نص الاستطلاع 300 حرف مع ترك مساحة لبادئة "Q1/10: ")
+POLL_QUESTION_LIMIT = 250
+POLL_EXPLANATION_LIMIT = 200
+
+@dataclass(frozen=True, slots=True)
+class QuizQuestion:
+    """سؤال جاهز للإرسال كـ Telegram Quiz"""
+    text: str               # النص الكامل (يُحفظ في جدول questions)
+    poll_text: str          # النص مقطوعاً لحد تيليجرام
+    options: tuple
+    correct_index: int
+    explanation: str = ''   # مقطوع لحد تيليجرام
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'QuizQuestion':
+        """
+        بناء السجل من سؤال JSON (بعد التحقق منه بـ validate_question)
+
+        Raises:
+            ValueError: إذا كان رقم الإجابة الصحيحة خارج النطاق
+        """
+        options = tuple(data['options'])
+        correct_index = int(data['correct_option_id'])
+        if not 0 <= correct_index < len(options):
+            raise ValueError("رقم الإجابة الصحيحة خارج النطاق")
+
+        text = data['question']
+        return cls(
+            text=text,
+            poll_text=text[:POLL_QUESTION_LIMIT],
+            options=options,
+            correct_index=correct_index,
+            explanation=(data.get('explanation') or '')[:POLL_EXPLANATION_LIMIT]
+        )
+
+@dataclass(frozen=True, slots=True)
+class ShuffledQuestion:
+    """سؤال بترتيب خيارات خاص بالجلسة (مرجع للسؤال + ترتيب الخيارات فقط)"""
+    question: QuizQuestion
+    order: tuple            # order[i] = رقم الخيار الأصلي المعروض في الموقع i
+
+    @property
+    def text(self) -> str:
+        return self.question.text
+
+    @property
+    def poll_text(self) -> str:
+        return self.question.poll_text
+
+    @property
+    def explanation(self) -> str:
+        return self.question.explanation
+
+    @property
+    def options(self) -> list:
+        """الخيارات بالترتيب المعروض"""
+        options = self.question.options
+        return [options[i] for i in self.order]
+
+    @property
+    def correct_option_id(self) -> int:
+        """موقع الإجابة الصحيحة بعد الخلط (بالرقم وليس بالنص)"""
+        return self.order.index(self.question.correct_index)
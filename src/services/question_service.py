@@ -3,13 +3,20 @@
 تدعم التحميل من GitHub أو الملفات المحلية + metadata
 """
 
+import asyncio
 import json
 import random
 import requests
+import httpx
 import re
 from pathlib import Path
 from datetime import datetime, timedelta
 import logging
+from src.services.http_client import HttpClient
+from src.services.disk_cache import DiskCache
+from src.services.lru_cache import LRUCache
+from src.services.question_bank import QuestionBank
+from src.services.question_records import QuizQuestion, ShuffledQuestion
 
 logger = logging.getLogger(__name__)
 
@@ -18,7 +25,12 @@ class QuestionService:
     
     def __init__(self, questions_dir: str, github_url: str = None, 
                  use_online: bool = False, cache_enabled: bool = True,
-                 cache_duration: int = 60):
+                 cache_duration: int = 60, github_api_url: str = None,
+                 http_client: HttpClient = None, discovery_concurrency: int = 8,
+                 disk_cache: DiskCache = None, stale_while_revalidate: bool = False,
+                 refresh_ahead: int = 0, hot_threshold: int = 3,
+                 question_bank: QuestionBank = None, cache_max_entries: int = None,
+                 cache_max_bytes: int = None, cache_max_stale: int = 0):
         """
         تهيئة خدمة الأسئلة
         
@@ -28,42 +40,231 @@ class QuestionService:
             use_online: استخدام GitHub أم الملفات المحلية
             cache_enabled: تفعيل الـ Cache
             cache_duration: مدة الـ Cache بالدقائق
+            github_api_url: رابط GitHub contents API لاكتشاف الملفات
+            http_client: عميل HTTP غير متزامن مشترك (للدوال الـ async)
+            discovery_concurrency: عدد ملفات الأجزاء التي تُحمّل بالتوازي عند الاكتشاف
+            disk_cache: Cache دائم على القرص (يبقى بعد إعادة التشغيل)
+            stale_while_revalidate: تقديم النسخة المنتهية فوراً وتحديثها في الخلفية
+            refresh_ahead: تحديث الملفات النشطة قبل انتهاء صلاحيتها بهذا العدد من الدقائق
+            hot_threshold: عدد مرات الاستخدام التي تجعل الملف "نشطاً"
+            question_bank: بنك الأسئلة المُجمّع (له الأولوية على JSON)
+            cache_max_entries: أقصى عدد ملفات في Cache الذاكرة (None = بدون حد)
+            cache_max_bytes: أقصى حجم تقديري لـ Cache الذاكرة بالبايت (None = بدون حد)
+            cache_max_stale: مدة بقاء الملف بعد انتهاء صلاحيته بالدقائق (مع stale-while-revalidate)
         """
         self.questions_dir = Path(questions_dir)
         self.github_url = github_url
+        self.github_api_url = github_api_url or "https://api.github.com/repos/AboALhasanx/json-files/contents"
         self.use_online = use_online
         self.cache_enabled = cache_enabled
         self.cache_duration = timedelta(minutes=cache_duration)
-        
-        # مخزن الـ Cache في الذاكرة
-        self._cache = {}
-        self._cache_timestamps = {}
+        self.http_client = http_client or HttpClient()
+        self.discovery_concurrency = max(1, discovery_concurrency)
+        self.disk_cache = disk_cache if cache_enabled else None
+        
+        self.stale_while_revalidate = stale_while_revalidate
+        self.refresh_ahead = timedelta(minutes=refresh_ahead)
+        self.hot_threshold = hot_threshold
+        self.question_bank = question_bank
+        
+        # مخزن الـ Cache في الذاكرة (LRU بحد للحجم، والملف يُحذف نهائياً بعد انتهاء صلاحيته
+        # أو بعد فترة السماح الإضافية إذا كان stale-while-revalidate مفعلاً)
+        max_age = self.cache_duration
+        if stale_while_revalidate:
+            max_age += timedelta(minutes=cache_max_stale)
+        self._cache = LRUCache(
+            max_entries=cache_max_entries,
+            max_bytes=cache_max_bytes,
+            ttl=max_age,
+            on_evict=self._on_cache_evict
+        )
+        
+        # عدد مرات الاستخدام منذ آخر تحديث + الملفات المنتظرة للتحديث
+        self._cache_hits = {}
+        self._refresh_pending = set()
+        
+        # العمليات الجارية حالياً (single-flight)
+        self._inflight = {}
+        
+        # فصول البنك المقروءة (البنك ثابت أثناء التشغيل فلا تنتهي صلاحيتها)
+        self._bank_chapters = {}
+        
+        # فصول الملفات المحلية المشتركة بين الجلسات: {path: (mtime, data)}
+        self._local_chapters = {}
     
     def _is_cache_valid(self, key: str) -> bool:
         """التحقق من صلاحية الـ Cache"""
         if not self.cache_enabled:
             return False
         
-        if key not in self._cache_timestamps:
+        timestamp = self._cache.timestamp(key)
+        if timestamp is None:
             return False
         
-        elapsed = datetime.now() - self._cache_timestamps[key]
+        elapsed = datetime.now() - timestamp
         return elapsed < self.cache_duration
     
     def _get_from_cache(self, key: str):
         """الحصول على البيانات من الـ Cache"""
-        if self._is_cache_valid(key):
+        if not self.cache_enabled:
+            return None
+        
+        data = self._cache.get(key, max_age=self.cache_duration)
+        if data is not None:
             logger.info(f"📦 تحميل من Cache: {key}")
-            return self._cache.get(key)
-        return None
+            self._record_hit(key)
+        return data
+    
+    def _can_serve_stale(self, key: str) -> bool:
+        """نسخة منتهية الصلاحية موجودة في الذاكرة ويمكن تقديمها (stale-while-revalidate)"""
+        return (self.stale_while_revalidate and key in self._cache
+                and not self._is_cache_valid(key))
+    
+    def _serve_stale(self, key: str):
+        """تقديم النسخة المنتهية فوراً (stale hit) وجدولة تحديثها في الخلفية"""
+        self._refresh_pending.add(key)
+        self._record_hit(key)
+        logger.info(f"⏳ تقديم نسخة منتهية الصلاحية وجدولة تحديثها: {key}")
+        return self._cache.get_stale(key)
+    
+    def _on_cache_evict(self, key: str):
+        """تنظيف بيانات الملف المحذوف من الـ Cache"""
+        self._cache_hits.pop(key, None)
+        self._refresh_pending.discard(key)
+        logger.info(f"♻️ حذف من Cache الذاكرة: {key}")
     
-    def _save_to_cache(self, key: str, data):
+    def cache_stats(self) -> dict:
+        """عدادات Cache الذاكرة (hits, stale_hits, misses, evictions, resident_bytes...)"""
+        return self._cache.stats()
+    
+    def _record_hit(self, key: str):
+        """تسجيل استخدام للمفتاح (لتحديد الملفات النشطة)"""
+        self._cache_hits[key] = self._cache_hits.get(key, 0) + 1
+    
+    def _save_to_cache(self, key: str, data, timestamp: datetime = None):
         """حفظ البيانات في الـ Cache"""
         if self.cache_enabled:
-            self._cache[key] = data
-            self._cache_timestamps[key] = datetime.now()
+            self._cache.set(key, data, timestamp=timestamp)
             logger.info(f"💾 حفظ في Cache: {key}")
     
+    def _load_from_disk_cache(self, key: str):
+        """
+        تحميل مدخل من Cache القرص إلى الذاكرة (عند التشغيل البارد)
+        
+        Returns:
+            dict: مدخل القرص (لإرسال طلب شرطي) أو None
+        """
+        if not self.disk_cache:
+            return None
+        
+        entry = self.disk_cache.get(key)
+        if not entry:
+            return None
+        
+        if key not in self._cache:
+            try:
+                data = self._normalize_questions_data(json.loads(entry['body']))
+            except ValueError as e:
+                logger.warning(f"⚠️ محتوى Cache القرص غير صالح ({key}): {e}")
+                self.disk_cache.delete(key)
+                return None
+            
+            # الاحتفاظ بوقت الجلب الأصلي حتى تُحسب الصلاحية بشكل صحيح
+            self._save_to_cache(key, data, timestamp=entry['fetched_at'])
+            logger.info(f"💽 تحميل من Cache القرص: {key}")
+        
+        return entry
+    
+    def _save_to_disk_cache(self, key: str, body: str, headers):
+        """حفظ الرد الخام مع ETag و Last-Modified على القرص"""
+        if self.disk_cache:
+            self.disk_cache.set(
+                key, body,
+                etag=headers.get('ETag'),
+                last_modified=headers.get('Last-Modified'),
+                fetched_at=self._cache.timestamp(key)
+            )
+    
+    def _conditional_headers(self, entry) -> dict:
+        """headers الطلب الشرطي (If-None-Match / If-Modified-Since)"""
+        headers = {}
+        if entry:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+    
+    def _mark_revalidated(self, key: str, disk_entry: dict = None) -> dict:
+        """
+        الملف لم يتغير (304): تجديد الصلاحية بدون تحميل
+        إذا حُذفت النسخة من الذاكرة (LRU أو TTL) يُعاد بناؤها من نص القرص
+        """
+        now = datetime.now()
+        data = self._cache.peek(key)
+        
+        if data is None:
+            data = self._normalize_questions_data(json.loads(disk_entry['body']))
+            self._save_to_cache(key, data, timestamp=now)
+        else:
+            self._cache.touch(key, now)
+        
+        if self.disk_cache:
+            self.disk_cache.touch(key, fetched_at=now)
+        logger.info(f"♻️ الملف لم يتغير (304): {key}")
+        return data
+    
+    def _normalize_questions_data(self, data) -> dict:
+        """
+        توحيد صيغة ملف الأسئلة القادم من GitHub
+        
+        Returns:
+            dict: {'metadata': {...}, 'questions': (QuizQuestion, ...)}
+        """
+        # دعم الصيغتين: الجديدة (مع metadata) والقديمة (مصفوفة مباشرة)
+        if isinstance(data, dict) and 'questions' in data:
+            # صيغة جديدة مع metadata
+            logger.info(f"✅ تم تحميل {len(data['questions'])} سؤال مع metadata")
+            return self._build_chapter(data)
+        
+        if isinstance(data, list):
+            # صيغة قديمة (مصفوفة مباشرة)
+            logger.info(f"✅ تم تحميل {len(data)} سؤال (صيغة قديمة)")
+            return self._build_chapter({
+                'metadata': {
+                    'title': 'Unknown',
+                    'title_ar': 'غير معروف',
+                    'description': '',
+                    'difficulty': 'medium'
+                },
+                'questions': data
+            })
+        
+        raise ValueError("الملف يجب أن يكون مصفوفة أو object مع حقل 'questions'")
+    
+    def _build_chapter(self, data: dict) -> dict:
+        """
+        تحويل أسئلة الفصل إلى سجلات ثابتة (مرة واحدة عند التحميل)
+        الأسئلة التي لا يمكن إرسالها تُستبعد، والنصوص الطويلة تُقطع لحدود تيليجرام
+        
+        Returns:
+            dict: {'metadata': {...}, 'questions': (QuizQuestion, ...)}
+        """
+        records = []
+        for question in data['questions']:
+            if not isinstance(question, dict) or not self.validate_question(question):
+                continue
+            try:
+                records.append(QuizQuestion.from_dict(question))
+            except (TypeError, ValueError) as e:
+                logger.error(f"❌ سؤال غير صالح: {e}")
+        
+        skipped = len(data['questions']) - len(records)
+        if skipped:
+            logger.warning(f"⚠️ تم استبعاد {skipped} سؤال غير صالح")
+        
+        return {'metadata': data.get('metadata', {}), 'questions': tuple(records)}
+    
     def load_questions_from_github(self, filepath: str) -> dict:
         """
         تحميل الأسئلة من GitHub مع دعم metadata
@@ -79,37 +280,27 @@ class QuestionService:
         if cached:
             return cached
         
+        # Cache القرص (بعد إعادة التشغيل)
+        disk_entry = self._load_from_disk_cache(filepath)
+        if disk_entry and self._is_cache_valid(filepath):
+            return self._cache.peek(filepath)
+        
         url = f"{self.github_url}/{filepath}"
         
         try:
             logger.info(f"🌐 تحميل من GitHub: {url}")
-            response = requests.get(url, timeout=10)
-            response.raise_for_status()
+            response = requests.get(url, headers=self._conditional_headers(disk_entry), timeout=10)
             
-            data = response.json()
+            if response.status_code == 304 and (disk_entry or filepath in self._cache):
+                return self._mark_revalidated(filepath, disk_entry)
             
-            # دعم الصيغتين: الجديدة (مع metadata) والقديمة (مصفوفة مباشرة)
-            if isinstance(data, dict) and 'questions' in data:
-                # صيغة جديدة مع metadata
-                result = data
-                logger.info(f"✅ تم تحميل {len(result['questions'])} سؤال مع metadata")
-            elif isinstance(data, list):
-                # صيغة قديمة (مصفوفة مباشرة)
-                result = {
-                    'metadata': {
-                        'title': 'Unknown',
-                        'title_ar': 'غير معروف',
-                        'description': '',
-                        'difficulty': 'medium'
-                    },
-                    'questions': data
-                }
-                logger.info(f"✅ تم تحميل {len(data)} سؤال (صيغة قديمة)")
-            else:
-                raise ValueError("الملف يجب أن يكون مصفوفة أو object مع حقل 'questions'")
+            response.raise_for_status()
+            
+            result = self._normalize_questions_data(response.json())
             
-            # حفظ في الـ Cache
+            # حفظ في الـ Cache (الذاكرة + القرص)
             self._save_to_cache(filepath, result)
+            self._save_to_disk_cache(filepath, response.text, response.headers)
             
             return result
         
@@ -166,6 +357,37 @@ class QuestionService:
             logger.error(f"❌ خطأ في التحميل: {e}")
             raise
     
+    def _match_part_files(self, folder_name: str, files_data: list) -> list:
+        """
+        استخراج ملفات الأجزاء (_ptN.json) من رد GitHub API
+        
+        Returns:
+            قائمة (رقم الجزء, اسم الملف, المسار الكامل)
+        """
+        entries = []
+        for file_info in files_data:
+            filename = file_info['name']
+            
+            # استخراج رقم الجزء من اسم الملف (ملفات JSON فقط)
+            match = re.search(r'_pt(\d+)\.json$', filename)
+            if match:
+                entries.append((match.group(1), filename, f'{folder_name}/{filename}'))
+        return entries
+    
+    def _build_part(self, part_num: str, filename: str, filepath: str,
+                    part_data: dict = None) -> dict:
+        """بناء وصف الجزء مع عنوانه من metadata (أو عنوان افتراضي)"""
+        metadata = part_data.get('metadata', {}) if part_data else {}
+        return {
+            'part': f'pt{part_num}',
+            'file': filename,
+            'filepath': filepath,
+            'display': f'الجزء {part_num}',  # fallback
+            'title_ar': metadata.get('title_ar', f'الجزء {part_num}'),  # العنوان الحقيقي من metadata
+            'title_en': metadata.get('title', f'Part {part_num}'),
+            'part_num': int(part_num)
+        }
+    
     def get_available_parts_from_github(self, subject: str, folder_name: str) -> list:
         """
         اكتشاف جميع الملفات المتاحة في مجلد المادة على GitHub
@@ -180,46 +402,23 @@ class QuestionService:
         """
         try:
             # GitHub API للحصول على قائمة الملفات في المجلد
-            api_url = f"https://api.github.com/repos/AboALhasanx/json-files/contents/{folder_name}"
+            api_url = f"{self.github_api_url}/{folder_name}"
             
             logger.info(f"🔍 البحث عن الملفات في: {folder_name}")
             response = requests.get(api_url, timeout=10)
             response.raise_for_status()
             
-            files_data = response.json()
-            
-            # فلترة ملفات JSON فقط
             parts = []
-            for file_info in files_data:
-                if file_info['name'].endswith('.json'):
-                    filename = file_info['name']
-                    
-                    # استخراج رقم الجزء من اسم الملف
-                    match = re.search(r'_pt(\d+)\.json$', filename)
-                    if match:
-                        part_num = match.group(1)
-                        filepath = f'{folder_name}/{filename}'
-                        
-                        # محاولة تحميل metadata للحصول على العنوان
-                        try:
-                            part_data = self.load_questions_from_github(filepath)
-                            metadata = part_data.get('metadata', {})
-                            title_ar = metadata.get('title_ar', f'الجزء {part_num}')
-                            title_en = metadata.get('title', f'Part {part_num}')
-                        except Exception as e:
-                            logger.warning(f"⚠️ فشل تحميل metadata من {filename}: {e}")
-                            title_ar = f'الجزء {part_num}'
-                            title_en = f'Part {part_num}'
-                        
-                        parts.append({
-                            'part': f'pt{part_num}',
-                            'file': filename,
-                            'filepath': filepath,
-                            'display': f'الجزء {part_num}',  # fallback
-                            'title_ar': title_ar,  # العنوان الحقيقي من metadata
-                            'title_en': title_en,
-                            'part_num': int(part_num)
-                        })
+            for part_num, filename, filepath in self._match_part_files(folder_name, response.json()):
+                # محاولة تحميل metadata للحصول على العنوان (من البنك المُجمّع أولاً)
+                part_data = self._load_from_bank(subject, filepath)
+                if part_data is None:
+                    try:
+                        part_data = self.load_questions_from_github(filepath)
+                    except Exception as e:
+                        logger.warning(f"⚠️ فشل تحميل metadata من {filename}: {e}")
+                
+                parts.append(self._build_part(part_num, filename, filepath, part_data))
             
             # ترتيب حسب رقم الجزء
             parts.sort(key=lambda x: x['part_num'])
@@ -234,6 +433,47 @@ class QuestionService:
             logger.error(f"❌ خطأ في اكتشاف الملفات: {e}")
             return []
     
+    def _load_from_bank(self, subject: str, part_filepath: str):
+        """
+        قراءة الفصل من بنك الأسئلة المُجمّع (إن وُجد)
+        
+        Returns:
+            dict: {'metadata': {...}, 'questions': [...]} أو None
+        """
+        if not self.question_bank:
+            return None
+        
+        # مفتاح نسخة GitHub (ai_quizzes/ai_pt1.json) أو المجلد المحلي (ai/ai_pt1.json)
+        for key in (part_filepath, f"{subject}/{part_filepath.split('/')[-1]}"):
+            if key in self._bank_chapters:
+                return self._bank_chapters[key]
+            
+            if key in self.question_bank:
+                data = self._build_chapter(self.question_bank.get(key))
+                self._bank_chapters[key] = data
+                logger.info(f"📚 تحميل من بنك الأسئلة: {key}")
+                return data
+        
+        return None
+    
+    def _load_local_shared(self, filename: str) -> dict:
+        """
+        تحميل ملف محلي مرة واحدة ومشاركته بين كل الجلسات
+        يُعاد التحميل فقط إذا تغيّر الملف على القرص
+        """
+        try:
+            mtime = (self.questions_dir / filename).stat().st_mtime_ns
+        except OSError:
+            return self._build_chapter(self.load_questions_from_local(filename))
+        
+        entry = self._local_chapters.get(filename)
+        if entry and entry[0] == mtime:
+            return entry[1]
+        
+        data = self._build_chapter(self.load_questions_from_local(filename))
+        self._local_chapters[filename] = (mtime, data)
+        return data
+    
     def load_questions_for_part(self, subject: str, part_filepath: str) -> dict:
         """
         تحميل الأسئلة لجزء محدد من مادة
@@ -245,6 +485,10 @@ class QuestionService:
         Returns:
             dict: {'metadata': {...}, 'questions': [...]}
         """
+        bank_data = self._load_from_bank(subject, part_filepath)
+        if bank_data:
+            return bank_data
+        
         if self.use_online and self.github_url:
             # التحميل من GitHub
             try:
@@ -257,7 +501,223 @@ class QuestionService:
         else:
             # التحميل من الملفات المحلية
             local_path = f"{subject}/{part_filepath.split('/')[-1]}"
-            return self.load_questions_from_local(local_path)
+            return self._load_local_shared(local_path)
+    
+    # ===============================
+    # واجهة غير متزامنة (للـ handlers)
+    # ===============================
+    
+    async def load_questions_from_github_async(self, filepath: str) -> dict:
+        """
+        نسخة غير متزامنة من load_questions_from_github
+        تستخدم الـ connection pool المشترك بدلاً من requests
+        
+        Returns:
+            dict: {'metadata': {...}, 'questions': [...]}
+        """
+        # Stale-while-revalidate: النسخة المنتهية في الذاكرة تُقدّم قبل البحث عن نسخة صالحة
+        # (حتى لا تُحسب miss ثم تُقدّم)
+        if self._can_serve_stale(filepath):
+            return self._serve_stale(filepath)
+        
+        # التحقق من الـ Cache
+        cached = self._get_from_cache(filepath)
+        if cached:
+            return cached
+        
+        # Cache القرص (بعد إعادة التشغيل)
+        disk_entry = self._load_from_disk_cache(filepath)
+        if disk_entry and self._is_cache_valid(filepath):
+            return self._cache.peek(filepath)
+        
+        # نسخة القرص منتهية: تقديمها فوراً وتحديثها في الخلفية
+        if self._can_serve_stale(filepath):
+            return self._serve_stale(filepath)
+        
+        # طلبات متزامنة لنفس الملف تنتظر تحميلاً واحداً وتتشارك النتيجة
+        return await self._single_flight(
+            filepath,
+            lambda: self._fetch_from_github_async(filepath, disk_entry)
+        )
+    
+    async def _single_flight(self, key: str, factory):
+        """
+        دمج الطلبات المتزامنة لنفس المفتاح في عملية واحدة
+        
+        Args:
+            key: مفتاح العملية (مسار الملف أو المجلد)
+            factory: دالة تُرجع coroutine العملية الفعلية
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            logger.info(f"🔗 انتظار تحميل جارٍ: {key}")
+        
+        # shield: إلغاء أحد المنتظرين لا يلغي العملية المشتركة
+        return await asyncio.shield(task)
+    
+    async def _fetch_from_github_async(self, filepath: str, disk_entry: dict = None) -> dict:
+        """
+        تحميل ملف من GitHub (طلب شرطي إذا توفر مدخل على القرص)
+        وتحديث الـ Cache بالنتيجة
+        """
+        url = f"{self.github_url}/{filepath}"
+        
+        try:
+            logger.info(f"🌐 تحميل من GitHub: {url}")
+            response = await self.http_client.get(url, headers=self._conditional_headers(disk_entry))
+            
+            if response.status_code == 304 and (disk_entry or filepath in self._cache):
+                return self._mark_revalidated(filepath, disk_entry)
+            
+            response.raise_for_status()
+            
+            result = self._normalize_questions_data(response.json())
+            
+            # حفظ في الـ Cache (الذاكرة + القرص)
+            self._save_to_cache(filepath, result)
+            self._save_to_disk_cache(filepath, response.text, response.headers)
+            
+            return result
+        
+        except httpx.HTTPError as e:
+            logger.error(f"❌ فشل التحميل من GitHub: {e}")
+            raise ConnectionError(f"فشل الاتصال بـ GitHub: {str(e)}")
+        
+        except json.JSONDecodeError as e:
+            logger.error(f"❌ خطأ في JSON من GitHub: {e}")
+            raise ValueError(f"ملف JSON غير صالح: {str(e)}")
+    
+    def _get_due_refreshes(self) -> set:
+        """الملفات التي يجب تحديثها: المنتهية المطلوبة + النشطة القريبة من الانتهاء"""
+        now = datetime.now()
+        refresh_after = self.cache_duration - self.refresh_ahead
+        
+        due = set(self._refresh_pending)
+        for key, timestamp in self._cache.timestamps():
+            if self._cache_hits.get(key, 0) >= self.hot_threshold and now - timestamp >= refresh_after:
+                due.add(key)
+        return due
+    
+    async def refresh_stale_entries(self) -> int:
+        """
+        تحديث الـ Cache في الخلفية (يُستدعى دورياً من JobQueue)
+        
+        Returns:
+            int: عدد الملفات التي تم تحديثها بنجاح
+        """
+        due = self._get_due_refreshes()
+        self._refresh_pending.difference_update(due)
+        
+        if not due:
+            return 0
+        
+        semaphore = asyncio.Semaphore(self.discovery_concurrency)
+        
+        async def refresh(key: str) -> bool:
+            async with semaphore:
+                disk_entry = self.disk_cache.get(key) if self.disk_cache else None
+                try:
+                    await self._single_flight(
+                        key,
+                        lambda: self._fetch_from_github_async(key, disk_entry)
+                    )
+                except (ConnectionError, ValueError) as e:
+                    # نبقي النسخة القديمة ونحاول في الدورة التالية
+                    logger.warning(f"⚠️ فشل تحديث Cache في الخلفية ({key}): {e}")
+                    return False
+                self._cache_hits.pop(key, None)
+                return True
+        
+        results = await asyncio.gather(*(refresh(key) for key in due))
+        refreshed = sum(results)
+        stats = self._cache.stats()
+        logger.info(
+            f"🔄 تحديث Cache في الخلفية: {refreshed}/{len(due)} ملف "
+            f"(في الذاكرة: {stats['entries']} ملف، {stats['resident_bytes'] // 1024}KB، "
+            f"hit rate: {stats['hit_rate']}%، stale: {stats['stale_hits']}، evictions: {stats['evictions']})"
+        )
+        return refreshed
+    
+    async def get_available_parts_from_github_async(self, subject: str, folder_name: str) -> list:
+        """
+        نسخة غير متزامنة من get_available_parts_from_github
+        تُحمّل metadata الأجزاء بالتوازي، فيقترب الزمن الكلي من زمن أبطأ ملف
+        
+        Returns:
+            قائمة بالأجزاء مع عناوينها من metadata
+        """
+        # طلبات متزامنة لنفس المجلد تنتظر عملية اكتشاف واحدة
+        return await self._single_flight(
+            f"parts:{folder_name}",
+            lambda: self._discover_parts_async(subject, folder_name)
+        )
+    
+    async def _discover_parts_async(self, subject: str, folder_name: str) -> list:
+        """اكتشاف الأجزاء فعلياً (GitHub API + metadata كل جزء)"""
+        try:
+            api_url = f"{self.github_api_url}/{folder_name}"
+            
+            logger.info(f"🔍 البحث عن الملفات في: {folder_name}")
+            response = await self.http_client.get(api_url)
+            response.raise_for_status()
+            
+            entries = self._match_part_files(folder_name, response.json())
+            
+            # تحميل metadata لكل الأجزاء بالتوازي (بحد أقصى discovery_concurrency)
+            semaphore = asyncio.Semaphore(self.discovery_concurrency)
+            
+            async def fetch_part(part_num: str, filename: str, filepath: str) -> dict:
+                # البنك المُجمّع يحتوي metadata الجزء بدون أي طلب شبكة
+                part_data = self._load_from_bank(subject, filepath)
+                if part_data is None:
+                    async with semaphore:
+                        try:
+                            part_data = await self.load_questions_from_github_async(filepath)
+                        except Exception as e:
+                            # فشل جزء واحد لا يُفشل الاكتشاف - نستخدم العنوان الافتراضي
+                            logger.warning(f"⚠️ فشل تحميل metadata من {filename}: {e}")
+                return self._build_part(part_num, filename, filepath, part_data)
+            
+            parts = list(await asyncio.gather(*(fetch_part(*entry) for entry in entries)))
+            
+            parts.sort(key=lambda x: x['part_num'])
+            
+            logger.info(f"✅ تم العثور على {len(parts)} جزء في {folder_name}")
+            return parts
+        
+        except httpx.HTTPError as e:
+            logger.error(f"❌ فشل الاتصال بـ GitHub API: {e}")
+            return []
+        except Exception as e:
+            logger.error(f"❌ خطأ في اكتشاف الملفات: {e}")
+            return []
+    
+    async def load_questions_for_part_async(self, subject: str, part_filepath: str) -> dict:
+        """
+        نسخة غير متزامنة من load_questions_for_part
+        الملفات المحلية تُقرأ في thread منفصل حتى لا يتوقف الـ event loop
+        
+        Returns:
+            dict: {'metadata': {...}, 'questions': [...]}
+        """
+        bank_data = self._load_from_bank(subject, part_filepath)
+        if bank_data:
+            return bank_data
+        
+        if self.use_online and self.github_url:
+            try:
+                return await self.load_questions_from_github_async(part_filepath)
+            
+            except (ConnectionError, ValueError) as e:
+                logger.warning(f"⚠️ فشل التحميل من GitHub: {e}")
+                raise
+        
+        local_path = f"{subject}/{part_filepath.split('/')[-1]}"
+        return await asyncio.to_thread(self._load_local_shared, local_path)
     
     def get_random_questions(self, questions: list, count: int) -> list:
         """اختيار أسئلة عشوائية"""
@@ -268,6 +728,51 @@ class QuestionService:
         
         return random.sample(questions, actual_count)
     
+    def create_quiz_order(self, questions: list, count: int = None) -> list:
+        """
+        ترتيب أسئلة الاختبار كأرقام في قائمة الفصل (بدون نسخ الأسئلة)
+        
+        Args:
+            questions: أسئلة الفصل (مشتركة بين كل الجلسات)
+            count: عدد الأسئلة (None = كل الأسئلة)
+        
+        Returns:
+            list: أرقام الأسئلة بترتيب عشوائي
+        """
+        if count is None:
+            count = len(questions)
+        elif len(questions) < count:
+            logger.warning(f"⚠️ عدد الأسئلة المتاحة ({len(questions)}) أقل من المطلوب ({count})")
+        
+        return random.sample(range(len(questions)), min(len(questions), count))
+    
+    @staticmethod
+    def new_quiz_seed() -> int:
+        """بذرة خلط خيارات اختبار جديد"""
+        return random.getrandbits(32)
+    
+    @staticmethod
+    def option_permutation(seed: int, position: int, option_count: int) -> list:
+        """
+        ترتيب خيارات السؤال رقم position في الاختبار
+        نفس البذرة والموقع يعطيان نفس الترتيب دائماً (حتى بعد إعادة التشغيل)
+        """
+        order = list(range(option_count))
+        random.Random(f"{seed}:{position}").shuffle(order)
+        return order
+    
+    def get_quiz_question(self, questions: tuple, question_ids: list,
+                          seed: int, position: int) -> ShuffledQuestion:
+        """
+        السؤال رقم position في الاختبار مع ترتيب خياراته
+        
+        Returns:
+            ShuffledQuestion: مرجع للسؤال المشترك + ترتيب الخيارات
+        """
+        question = questions[question_ids[position]]
+        order = self.option_permutation(seed, position, len(question.options))
+        return ShuffledQuestion(question, tuple(order))
+    
     def validate_question(self, question: dict) -> bool:
         """التحقق من صحة بنية السؤال"""
         required_fields = ['question', 'options', 'correct_option_id']
@@ -277,10 +782,7 @@ class QuestionService:
                 logger.error(f"❌ حقل مفقود: {field}")
                 return False
         
-        # التحقق من طول السؤال
-        if len(question['question']) > 300:
-            logger.error(f"❌ السؤال طويل جداً ({len(question['question'])} حرف)")
-            return False
+        # السؤال الطويل لا يُرفض: يُقطع نص الاستطلاع لحد تيليجرام (QuizQuestion.from_dict)
         
         # التحقق من عدد الخيارات
         if len(question['options']) < 2 or len(question['options']) > 10:
@@ -300,33 +802,19 @@ class QuestionService:
         
         return True
     
-    def shuffle_question_options(self, question: dict) -> dict:
+    def shuffle_question_options(self, question: QuizQuestion) -> ShuffledQuestion:
         """
-        خلط خيارات السؤال بشكل عشوائي
-        مع تحديث correct_option_id ليشير للخيار الصحيح الجديد
+        خلط خيارات السؤال بشكل عشوائي (ترتيب أرقام فقط، بدون نسخ السؤال)
         
         Args:
             question: السؤال الأصلي
         
         Returns:
-            dict: السؤال مع خيارات مخلوطة
+            ShuffledQuestion: السؤال مع ترتيب خيارات عشوائي
         """
-        import copy
-        
-        # نسخ عميقة لتجنب تعديل الأصل
-        shuffled_q = copy.deepcopy(question)
-        
-        # الحصول على الإجابة الصحيحة الحالية
-        correct_option_text = shuffled_q['options'][shuffled_q['correct_option_id']]
-        
-        # خلط الخيارات
-        random.shuffle(shuffled_q['options'])
-        
-        # إيجاد الموقع الجديد للإجابة الصحيحة
-        new_correct_index = shuffled_q['options'].index(correct_option_text)
-        shuffled_q['correct_option_id'] = new_correct_index
-        
-        return shuffled_q
+        order = list(range(len(question.options)))
+        random.shuffle(order)
+        return ShuffledQuestion(question, tuple(order))
     
     def shuffle_all_questions(self, questions: list) -> list:
         """
@@ -339,18 +827,25 @@ class QuestionService:
             list: قائمة مخلوطة مع خيارات مخلوطة
         """
         # خلط ترتيب الأسئلة
-        shuffled_questions = random.sample(questions, len(questions))
-        
-        # خلط خيارات كل سؤال
-        for i in range(len(shuffled_questions)):
-            shuffled_questions[i] = self.shuffle_question_options(shuffled_questions[i])
+        shuffled_questions = [
+            self.shuffle_question_options(question)
+            for question in random.sample(questions, len(questions))
+        ]
         
         logger.info(f"🔀 تم خلط {len(shuffled_questions)} سؤال مع خياراتهم")
         return shuffled_questions
 
 
     def clear_cache(self):
-        """مسح الـ Cache"""
+        """مسح الـ Cache (الذاكرة + القرص)"""
         self._cache.clear()
-        self._cache_timestamps.clear()
+        self._cache_hits.clear()
+        self._refresh_pending.clear()
+        self._local_chapters.clear()
+        if self.disk_cache:
+            self.disk_cache.clear()
         logger.info("🗑️ تم مسح Cache")
+    
+    async def aclose(self):
+        """إغلاق اتصالات HTTP المشتركة (عند إيقاف البوت)"""
+        await self.http_client.aclose()
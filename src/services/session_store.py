@@ -0,0 +1,91 @@
+"""
+مخزن جلسات الاختبار النشطة
+طبقتان: الذاكرة (كل القراءات) + SQLite (تُكتب مع كل إجابة وتُستعاد عند التشغيل)
+حتى لا تضيع الاختبارات الجارية عند إعادة تشغيل البوت أو توقفه
+"""
+
+import json
+import logging
+
+from src.services.poll_index import PollIndex
+
+logger = logging.getLogger(__name__)
+
+class SessionStore:
+    """الجلسات النشطة لكل مستخدم (user_id -> session dict)"""
+
+    def __init__(self, repository):
+        """
+        Args:
+            repository: مستودع الجلسات النشطة غير المتزامن (AsyncActiveSessionRepository)
+        """
+        self._repository = repository
+        self._sessions = {}
+        # الاستطلاعات المُرسلة للجلسات النشطة (poll_id -> السؤال)
+        self.polls = PollIndex()
+
+    def __contains__(self, user_id: int) -> bool:
+        return user_id in self._sessions
+
+    def __getitem__(self, user_id: int) -> dict:
+        return self._sessions[user_id]
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def items(self):
+        """[(user_id, session)] لكل الجلسات في الذاكرة"""
+        return list(self._sessions.items())
+
+    def get(self, user_id: int, default=None):
+        """جلسة المستخدم من الذاكرة (بدون قاعدة البيانات)"""
+        return self._sessions.get(user_id, default)
+
+    async def put(self, user_id: int, session: dict):
+        """إضافة/استبدال جلسة المستخدم وحفظها"""
+        previous = self._sessions.get(user_id)
+        if previous is not None:
+            self.polls.discard_session(previous)
+        self._sessions[user_id] = session
+        await self.save(user_id)
+
+    async def save(self, user_id: int):
+        """حفظ الحالة الحالية للجلسة (بعد كل إجابة)"""
+        session = self._sessions.get(user_id)
+        if session is None:
+            return
+
+        # المفاتيح التي تبدأ بـ _ مراجع في الذاكرة فقط (مثل أسئلة الفصل المشتركة)
+        state = {key: value for key, value in session.items() if not key.startswith('_')}
+        payload = json.dumps(state, ensure_ascii=False, separators=(',', ':'))
+        await self._repository.save(user_id, session['session_id'], payload)
+
+    async def delete(self, user_id: int):
+        """حذف الجلسة من الذاكرة وقاعدة البيانات (مع استطلاعاتها)"""
+        session = self._sessions.pop(user_id, None)
+        if session is not None:
+            self.polls.discard_session(session)
+        await self._repository.delete(user_id)
+
+    async def load(self) -> int:
+        """
+        استعادة الجلسات المحفوظة (عند بدء البوت)
+
+        Returns:
+            int: عدد الجلسات المستعادة
+        """
+        rows = await self._repository.load_all()
+
+        for user_id, payload in rows:
+            try:
+                session = json.loads(payload)
+            except ValueError as e:
+                logger.warning(f"⚠️ تعذر استعادة جلسة المستخدم {user_id}: {e}")
+                continue
+
+            self._sessions[user_id] = session
+            self.polls.restore(user_id, session)
+
+        if self._sessions:
+            logger.info(f"♻️ تم استعادة {len(self._sessions)} اختبار جاري")
+        return len(self._sessions)
@@ -0,0 +1,78 @@
+"""
+عجلة المؤقتات (Hashed Timing Wheel)
+كل المهل (مهلة السؤال ومهلة الاختبار) لكل الجلسات في بنية واحدة
+تُدار بمهمة JobQueue واحدة متكررة بدلاً من مهمة أو job لكل جلسة
+الإضافة والإلغاء O(1)، وكل نبضة تفحص خانة واحدة فقط
+"""
+
+import math
+import time
+
+class TimerWheel:
+    """
+    مؤقتات بمفاتيح: مؤقت واحد لكل مفتاح (جدولة نفس المفتاح تستبدل السابق)
+    المهل الأطول من دورة العجلة تبقى في خانتها حتى تحين دورتها
+    """
+
+    def __init__(self, tick: float = 1.0, slots: int = 512, now: float = None):
+        """
+        Args:
+            tick: دقة المؤقتات بالثواني (مدة الخانة الواحدة)
+            slots: عدد الخانات (دورة العجلة = tick × slots)
+            now: الوقت الحالي (time.time() افتراضياً)
+        """
+        self.tick = tick
+        self._slots = [{} for _ in range(slots)]
+        self._where = {}   # key -> رقم الخانة
+        self._current = math.floor((time.time() if now is None else now) / tick)
+
+    def __len__(self) -> int:
+        return len(self._where)
+
+    def __contains__(self, key) -> bool:
+        return key in self._where
+
+    def schedule(self, key, deadline: float, payload=None):
+        """
+        جدولة مؤقت ينتهي عند deadline (بتوقيت time.time())
+        المهلة التي مضت تنتهي مع النبضة التالية
+        """
+        self.cancel(key)
+
+        tick_no = max(math.ceil(deadline / self.tick), self._current + 1)
+        index = tick_no % len(self._slots)
+        self._slots[index][key] = (tick_no, payload)
+        self._where[key] = index
+
+    def cancel(self, key) -> bool:
+        """إلغاء مؤقت (إن وُجد)"""
+        index = self._where.pop(key, None)
+        if index is None:
+            return False
+        del self._slots[index][key]
+        return True
+
+    def advance(self, now: float = None) -> list:
+        """
+        تحريك العجلة حتى الوقت الحالي
+
+        Returns:
+            list: [(key, payload)] للمؤقتات المنتهية
+        """
+        target = math.floor((time.time() if now is None else now) / self.tick)
+        if target <= self._current:
+            return []
+
+        expired = []
+        # بعد توقف طويل تكفي دورة واحدة على كل الخانات
+        steps = min(target - self._current, len(self._slots))
+        for tick_no in range(self._current + 1, self._current + 1 + steps):
+            slot = self._slots[tick_no % len(self._slots)]
+            due = [key for key, (key_tick, _) in slot.items() if key_tick <= target]
+            for key in due:
+                _, payload = slot.pop(key)
+                del self._where[key]
+                expired.append((key, payload))
+
+        self._current = target
+        return expired
@@ -0,0 +1,86 @@
+"""
+معالج التحديثات المتوازي مع ترتيب لكل مستخدم
+المستخدمون المختلفون يُعالجون بالتوازي، وتحديثات المستخدم الواحد واحداً تلو الآخر
+حتى لا تتسابق إجابتان على current_question و score في نفس الجلسة
+"""
+
+import logging
+from collections import deque
+
+from telegram.ext import BaseUpdateProcessor
+
+logger = logging.getLogger(__name__)
+
+def update_user_id(update: object):
+    """رقم المستخدم صاحب التحديث (أو None للتحديثات بدون مستخدم)"""
+    user = getattr(update, 'effective_user', None)
+    return user.id if user else None
+
+class PerUserUpdateProcessor(BaseUpdateProcessor):
+    """
+    مسار (lane) لكل مستخدم: أول تحديث يصبح مالك المسار وينفّذ ما يصل بعده بالترتيب
+    التحديثات المنتظرة في المسار لا تحجز مكاناً من max_concurrent_updates
+    """
+
+    __slots__ = ('_lanes',)
+
+    def __init__(self, max_concurrent_updates: int):
+        super().__init__(max_concurrent_updates)
+        # user_id -> التحديثات المنتظرة (coroutines) خلف التحديث الجاري
+        self._lanes = {}
+
+    @property
+    def active_lanes(self) -> int:
+        """عدد المستخدمين الذين لديهم تحديث قيد المعالجة"""
+        return len(self._lanes)
+
+    async def do_process_update(self, update: object, coroutine) -> None:
+        await self.run_for_user(update_user_id(update), coroutine)
+
+    async def run_for_user(self, user_id, coroutine) -> None:
+        """
+        تنفيذ coroutine في مسار المستخدم (للتحديثات وللمهام الخلفية مثل المؤقتات)
+        إذا كان للمستخدم تحديث جاري يُنفّذ بعده ويعود الاستدعاء فوراً
+        """
+        if user_id is None:
+            await coroutine
+            return
+
+        lane = self._lanes.get(user_id)
+        if lane is not None:
+            # المستخدم لديه تحديث جاري: مالك المسار سينفّذ هذا بعده
+            lane.append(coroutine)
+            return
+
+        lane = self._lanes[user_id] = deque()
+        try:
+            while coroutine is not None:
+                try:
+                    await coroutine
+                except Exception as e:
+                    # خطأ تحديث واحد لا يوقف بقية تحديثات المستخدم
+                    logger.error(f"❌ خطأ في معالجة تحديث المستخدم {user_id}: {e}")
+                coroutine = lane.popleft() if lane else None
+        finally:
+            del self._lanes[user_id]
+            # عند الإيقاف: إغلاق ما لم يُنفّذ بدلاً من تركه معلقاً
+            for pending in lane:
+                pending.close()
+
+    async def initialize(self) -> None:
+        """لا يوجد ما يُجهّز"""
+
+    async def shutdown(self) -> None:
+        """لا يوجد ما يُغلق (التحديثات الجارية تنتهي مع مهام التطبيق)"""
+
+async def run_in_user_lane(context, user_id: int, coroutine) -> None:
+    """
+    تنفيذ مهمة خلفية (مؤقت، سؤال مجدول) في مسار المستخدم
+    حتى لا تتسابق مع معالجة إجابته على نفس الجلسة
+    """
+    application = getattr(context, 'application', None)
+    processor = getattr(application, 'update_processor', None)
+    if isinstance(processor, PerUserUpdateProcessor):
+        await processor.run_for_user(user_id, coroutine)
+    else:
+        await coroutine
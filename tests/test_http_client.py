@@ -0,0 +1,112 @@
+"""
+اختبارات مسار التحميل غير المتزامن (HttpClient + QuestionService)
+single-flight، وحد التزامن لكل host، وإعادة استخدام الاتصالات (keep-alive)
+"""
+
+import asyncio
+import json
+from collections import Counter
+
+import httpx
+
+from src.services.http_client import HttpClient
+from src.services.question_service import QuestionService
+
+CHAPTER = {
+    'metadata': {'title': 'Part 1', 'title_ar': 'الجزء الأول', 'version': 1},
+    'questions': [
+        {'question': 'q1', 'options': ['a', 'b', 'c', 'd'], 'correct_option_id': 0, 'explanation': 'e'},
+    ],
+}
+
+class SlowUpstream:
+    """خادم وهمي (MockTransport handler): يرد بعد delay ويسجّل الطلبات والتزامن لكل host"""
+
+    def __init__(self, delay: float = 0.05):
+        self.delay = delay
+        self.requests = Counter()
+        self.in_flight = Counter()
+        self.peak = Counter()
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        host = request.url.host
+        self.requests[request.url.path] += 1
+        self.in_flight[host] += 1
+        self.peak[host] = max(self.peak[host], self.in_flight[host])
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.in_flight[host] -= 1
+        return httpx.Response(200, json=CHAPTER)
+
+def test_concurrent_loads_share_one_upstream_request(tmp_path):
+    upstream = SlowUpstream()
+
+    async def main():
+        client = HttpClient(transport=httpx.MockTransport(upstream))
+        service = QuestionService(
+            str(tmp_path), github_url='https://raw.example.com/quizzes',
+            use_online=True, http_client=client
+        )
+        try:
+            return await asyncio.gather(*(
+                service.load_questions_from_github_async('ai_quizzes/ai_pt1.json')
+                for _ in range(20)
+            ))
+        finally:
+            await client.aclose()
+
+    results = asyncio.run(main())
+
+    assert upstream.requests == {'/quizzes/ai_quizzes/ai_pt1.json': 1}
+    assert all(result is results[0] for result in results)
+    assert results[0]['metadata']['title_ar'] == 'الجزء الأول'
+
+def test_per_host_concurrency_is_capped():
+    upstream = SlowUpstream()
+
+    async def main():
+        client = HttpClient(max_connections_per_host=3, transport=httpx.MockTransport(upstream))
+        try:
+            await asyncio.gather(
+                *(client.get(f'https://a.example.com/{i}') for i in range(12)),
+                *(client.get(f'https://b.example.com/{i}') for i in range(12)),
+            )
+        finally:
+            await client.aclose()
+
+    asyncio.run(main())
+
+    assert sum(upstream.requests.values()) == 24
+    # كل host بحد 3، والـ hosts المختلفة لا تنتظر بعضها
+    assert upstream.peak == {'a.example.com': 3, 'b.example.com': 3}
+
+def test_sequential_requests_reuse_one_connection():
+    """خادم HTTP محلي حقيقي: الطلبات المتتالية تمر عبر اتصال keep-alive واحد"""
+    connections = []
+    body = json.dumps(CHAPTER).encode()
+
+    async def serve(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        connections.append(writer)
+        while await reader.readuntil(b'\r\n\r\n'):
+            writer.write(
+                b'HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n'
+                + f'Content-Length: {len(body)}\r\n\r\n'.encode() + body
+            )
+            await writer.drain()
+
+    async def main():
+        server = await asyncio.start_server(serve, '127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+        client = HttpClient()
+        try:
+            for i in range(5):
+                response = await client.get(f'http://127.0.0.1:{port}/ai_pt{i}.json')
+                assert response.json() == CHAPTER
+        finally:
+            await client.aclose()
+            server.close()
+
+    asyncio.run(main())
+
+    assert len(connections) == 1
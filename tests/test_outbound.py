@@ -0,0 +1,158 @@
+"""
+اختبارات OutboundScheduler عبر ExtBot حقيقي مع طبقة طلبات وهمية (بدون شبكة)
+الحد العام والحد لكل محادثة والترتيب داخل المحادثة و RetryAfter والأولوية
+"""
+
+import asyncio
+import json
+import time
+
+from telegram.ext import ExtBot
+from telegram.request import BaseRequest
+
+from src.services.outbound import OutboundScheduler, PRIORITY_QUIZ
+
+class FakeRequest(BaseRequest):
+    """
+    طبقة HTTP وهمية لـ Bot API: تُسجّل كل إرسال ناجح (الوقت، endpoint، chat_id، النص)
+    retry_after: {(chat_id, text): ثواني} لرد 429 مرة واحدة على هذا الطلب
+    """
+
+    def __init__(self, retry_after: dict = None):
+        self.sent = []
+        self.retry_after = dict(retry_after or {})
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    @property
+    def read_timeout(self):
+        return 1
+
+    async def do_request(self, url, method, request_data=None, **kwargs):
+        endpoint = url.rsplit('/', 1)[1]
+        params = request_data.parameters if request_data else {}
+
+        if endpoint == 'getMe':
+            return 200, self._ok({'id': 1, 'is_bot': True, 'first_name': 'bot', 'username': 'bot'})
+
+        chat_id = params['chat_id']
+        text = params.get('text') or params.get('question')
+        seconds = self.retry_after.pop((chat_id, text), None)
+        if seconds is not None:
+            return 429, json.dumps({
+                'ok': False, 'error_code': 429, 'description': 'Too Many Requests',
+                'parameters': {'retry_after': seconds}
+            }).encode()
+
+        self.sent.append((time.monotonic(), endpoint, chat_id, text))
+        message = {'message_id': len(self.sent), 'date': 0, 'text': text,
+                   'chat': {'id': chat_id, 'type': 'private'}}
+        return 200, self._ok(message)
+
+    @staticmethod
+    def _ok(result: dict) -> bytes:
+        return json.dumps({'ok': True, 'result': result}).encode()
+
+def run_with_bot(scheduler: OutboundScheduler, scenario, request: FakeRequest = None) -> FakeRequest:
+    """تشغيل scenario(bot) على ExtBot يمر عبر المجدول ثم إرجاع سجل الإرسال"""
+    request = request or FakeRequest()
+
+    async def main():
+        bot = ExtBot('1:token', request=request, get_updates_request=FakeRequest(),
+                     rate_limiter=scheduler)
+        await bot.initialize()
+        try:
+            await scenario(bot)
+        finally:
+            await bot.shutdown()
+
+    asyncio.run(main())
+    return request
+
+def max_in_window(times: list, window: float) -> int:
+    """أكبر عدد إرسالات في أي نافذة زمنية بطول window"""
+    return max(sum(1 for other in times if start <= other < start + window) for start in times)
+
+def test_global_rate():
+    scheduler = OutboundScheduler(global_rate=40, per_chat_rate=100, per_chat_burst=100)
+
+    async def scenario(bot):
+        await asyncio.gather(*(bot.send_message(chat_id, 'hi') for chat_id in range(1, 81)))
+
+    request = run_with_bot(scheduler, scenario)
+
+    times = [sent_at for sent_at, *_ in request.sent]
+    assert len(times) == 80
+    assert max_in_window(times, 0.5) <= 21
+    assert times[-1] - times[0] >= 1.8
+    assert scheduler.stats()['sent'] == 80
+
+def test_per_chat_rate_and_fifo_order():
+    scheduler = OutboundScheduler(global_rate=1000, per_chat_rate=10, per_chat_burst=2)
+    texts = [f'm{i}' for i in range(8)]
+
+    async def scenario(bot):
+        # كل الرسائل تصل معاً، وتُرسل بترتيب وصولها
+        await asyncio.gather(*(bot.send_message(7, text) for text in texts),
+                             bot.send_message(8, 'other'))
+
+    request = run_with_bot(scheduler, scenario)
+
+    chat7 = [(sent_at, text) for sent_at, _, chat_id, text in request.sent if chat_id == 7]
+    assert [text for _, text in chat7] == texts
+    # أول رسالتين دفعة واحدة ثم 10 رسائل/ثانية
+    assert chat7[-1][0] - chat7[0][0] >= (len(texts) - 2) / 10 * 0.9
+    # المحادثة الأخرى لا تنتظر خلف طابور المحادثة 7
+    other_at = next(sent_at for sent_at, _, chat_id, _ in request.sent if chat_id == 8)
+    assert other_at - chat7[0][0] < 0.1
+
+def test_retry_after_pauses_and_retries_in_order():
+    scheduler = OutboundScheduler(global_rate=1000, per_chat_rate=100, per_chat_burst=100)
+    request = FakeRequest(retry_after={(7, 'm1'): 1})
+
+    async def scenario(bot):
+        async def chat7():
+            await asyncio.gather(*(bot.send_message(7, f'm{i}') for i in range(3)))
+
+        async def chat8_later():
+            await asyncio.sleep(0.2)
+            await bot.send_message(8, 'during pause')
+
+        await asyncio.gather(chat7(), chat8_later())
+
+    start = time.monotonic()
+    run_with_bot(scheduler, scenario, request)
+
+    chat7 = [(sent_at, text) for sent_at, _, chat_id, text in request.sent if chat_id == 7]
+    assert [text for _, text in chat7] == ['m0', 'm1', 'm2']
+    # m1 أُعيد بعد مهلة 429 والإرسال كله توقف خلالها
+    assert chat7[1][0] - start >= 0.95
+    paused_at = next(sent_at for sent_at, _, chat_id, _ in request.sent if chat_id == 8)
+    assert paused_at - start >= 0.95
+    stats = scheduler.stats()
+    assert (stats['retries'], stats['failed'], stats['sent']) == (1, 0, 4)
+
+def test_priority_order():
+    scheduler = OutboundScheduler(global_rate=20, per_chat_rate=100, per_chat_burst=100)
+
+    async def scenario(bot):
+        # تعديل الرسائل (عرض الإحصائيات) أولوية منخفضة حسب endpoint
+        low = [asyncio.create_task(bot.edit_message_text('stats', chat_id=chat_id, message_id=1))
+               for chat_id in range(100, 110)]
+        await asyncio.sleep(0.12)
+        # أسئلة الاختبار تصل بعدها وتتقدم عليها
+        quiz = [bot.send_message(chat_id, 'question', rate_limit_args={'priority': PRIORITY_QUIZ})
+                for chat_id in range(200, 205)]
+        await asyncio.gather(*low, *quiz)
+
+    request = run_with_bot(scheduler, scenario)
+
+    endpoints = [endpoint for _, endpoint, _, _ in request.sent]
+    first_quiz = endpoints.index('sendMessage')
+    assert endpoints[first_quiz:first_quiz + 5] == ['sendMessage'] * 5
+    assert first_quiz <= 4
+    assert endpoints[first_quiz + 5:] and set(endpoints[first_quiz + 5:]) == {'editMessageText'}
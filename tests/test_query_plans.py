@@ -0,0 +1,58 @@
+"""
+خطط استعلامات الإحصائيات على قاعدة مبنية بالترحيلات
+كل استعلام يجب أن يستخدم فهرساً (SEARCH) وليس مسح الجدول كاملاً (SCAN)
+"""
+
+import sqlite3
+from types import SimpleNamespace
+
+import pytest
+
+from src.database.migrations import MIGRATIONS, get_schema_version, run_migrations
+from src.database.repositories import QuizRepository, StatsRepository, UserRepository
+
+@pytest.fixture
+def db(tmp_path):
+    conn = sqlite3.connect(tmp_path / "plans.db")
+    conn.row_factory = sqlite3.Row
+    run_migrations(conn)
+    assert get_schema_version(conn) == MIGRATIONS[-1][0]
+
+    # مستخدم واحد حتى تصل get_user_stats لاستعلام المواد
+    manager = SimpleNamespace(get_connection=lambda: conn)
+    UserRepository(manager).create_user(1, "user", "User")
+    yield manager
+    conn.close()
+
+def traced_selects(conn: sqlite3.Connection, calls) -> list:
+    """استعلامات SELECT التي نفّذتها الدوال (بقيمها) عبر trace callback"""
+    statements = []
+    conn.set_trace_callback(statements.append)
+    try:
+        for call in calls:
+            call()
+    finally:
+        conn.set_trace_callback(None)
+    return [sql for sql in statements if sql.lstrip().upper().startswith('SELECT')]
+
+def query_plan(conn: sqlite3.Connection, sql: str) -> list:
+    return [row[3] for row in conn.execute(f'EXPLAIN QUERY PLAN {sql}')]
+
+def test_stats_queries_use_indexes(db):
+    stats = StatsRepository(db)
+    quizzes = QuizRepository(db)
+
+    selects = traced_selects(db.get_connection(), [
+        lambda: stats.get_weekly_stats(1),
+        lambda: stats.get_user_stats(1),
+        lambda: stats.get_subject_progress(1),
+        lambda: stats.get_question_stats('ai'),
+        lambda: stats.get_question_stats('ai', 'ch1'),
+        lambda: quizzes.get_user_sessions(1),
+    ])
+
+    # weekly + user_stats (2) + progress + question_stats (2) + sessions
+    assert len(selects) == 7
+    for sql in selects:
+        plan = query_plan(db.get_connection(), sql)
+        assert not any(step.startswith('SCAN') for step in plan), (sql, plan)
@@ -0,0 +1,62 @@
+"""
+عدادات Cache الأسئلة مع stale-while-revalidate
+النسخة المنتهية التي تُقدّم أثناء تحديثها تُحسب stale hit وليست miss
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+
+import httpx
+
+from src.services.http_client import HttpClient
+from src.services.lru_cache import LRUCache
+from src.services.question_service import QuestionService
+
+CHAPTER = {'questions': [{'question': 'q1', 'options': ['a', 'b'], 'correct_option_id': 0}]}
+FILEPATH = 'ai_quizzes/ai_pt1.json'
+
+def test_stale_serves_are_not_misses(tmp_path):
+    requests = []
+
+    def upstream(request: httpx.Request) -> httpx.Response:
+        requests.append(request.url.path)
+        return httpx.Response(200, json=CHAPTER)
+
+    async def main():
+        client = HttpClient(transport=httpx.MockTransport(upstream))
+        service = QuestionService(
+            str(tmp_path), github_url='https://raw.example.com', use_online=True,
+            http_client=client, cache_duration=60, stale_while_revalidate=True, cache_max_stale=60
+        )
+        try:
+            await service.load_questions_from_github_async(FILEPATH)   # miss
+            await service.load_questions_from_github_async(FILEPATH)   # hit
+
+            # انتهاء الصلاحية (داخل فترة السماح)
+            service._cache.touch(FILEPATH, datetime.now() - timedelta(minutes=90))
+            stale = await service.load_questions_from_github_async(FILEPATH)
+            stats = service.cache_stats()
+
+            refreshed = await service.refresh_stale_entries()
+            await service.load_questions_from_github_async(FILEPATH)   # hit بعد التحديث
+            return stale, stats, refreshed, service.cache_stats()
+        finally:
+            await client.aclose()
+
+    stale, stats, refreshed, after = asyncio.run(main())
+
+    assert stale['questions'][0].text == 'q1'
+    assert (stats['hits'], stats['stale_hits'], stats['misses']) == (1, 1, 1)
+    assert refreshed == 1
+    assert (after['hits'], after['stale_hits'], after['misses']) == (2, 1, 1)
+    assert after['hit_rate'] == 50.0
+    assert len(requests) == 2
+
+def test_lru_get_stale_counts_separately():
+    cache = LRUCache(ttl=timedelta(minutes=10))
+    cache.set('a', 1, timestamp=datetime.now() - timedelta(minutes=5))
+
+    assert cache.get('a', max_age=timedelta(minutes=1)) is None
+    assert cache.get_stale('a') == 1
+    assert cache.get_stale('missing') is None
+    assert (cache.hits, cache.stale_hits, cache.misses) == (0, 1, 2)
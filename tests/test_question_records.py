@@ -0,0 +1,29 @@
+"""
+بناء سجلات الأسئلة: النصوص الطويلة تُقطع لحدود تيليجرام ولا تُستبعد
+"""
+
+from src.services.question_records import POLL_EXPLANATION_LIMIT, POLL_QUESTION_LIMIT
+from src.services.question_service import QuestionService
+
+def build(questions: list) -> tuple:
+    return QuestionService('unused')._build_chapter({'questions': questions})['questions']
+
+def test_long_question_is_truncated_not_dropped():
+    text = 'س' * 400
+    records = build([{
+        'question': text, 'options': ['a', 'b'], 'correct_option_id': 1, 'explanation': 'e' * 300
+    }])
+
+    assert len(records) == 1
+    assert records[0].text == text
+    assert records[0].poll_text == text[:POLL_QUESTION_LIMIT]
+    assert len(records[0].explanation) == POLL_EXPLANATION_LIMIT
+
+def test_unsendable_options_are_dropped():
+    records = build([
+        {'question': 'q1', 'options': ['a' * 101, 'b'], 'correct_option_id': 0},
+        {'question': 'q2', 'options': ['a'], 'correct_option_id': 0},
+        {'question': 'q3', 'options': ['a', 'b'], 'correct_option_id': 0},
+    ])
+
+    assert [record.text for record in records] == ['q3']
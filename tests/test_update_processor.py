@@ -0,0 +1,157 @@
+"""
+اختبارات PerUserUpdateProcessor
+إجابات متزامنة لنفس المستخدم تُعالج بالترتيب، والمستخدمون المختلفون بالتوازي
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+from telegram.ext import SimpleUpdateProcessor
+
+from src.utils.update_processor import PerUserUpdateProcessor, run_in_user_lane
+
+USERS = 100
+ANSWERS_PER_USER = 30
+
+class FakeBot:
+    """بوت وهمي: كل إرسال نقطة await (مثل طلب HTTP حقيقي) ويُسجّل الرسائل"""
+
+    def __init__(self):
+        self.messages = []
+
+    async def send_message(self, chat_id: int, text: str):
+        await asyncio.sleep(0)
+        self.messages.append((chat_id, text))
+
+def make_update(user_id, option: int = 0):
+    user = SimpleNamespace(id=user_id) if user_id is not None else None
+    return SimpleNamespace(effective_user=user, poll_answer=SimpleNamespace(option_ids=[option]))
+
+async def handle_answer(bot: FakeBot, sessions: dict, update):
+    """
+    نفس نمط handle_poll_answer: قراءة الجلسة، ثم await، ثم الكتابة
+    بدون ترتيب لكل مستخدم تقرأ الإجابتان نفس current_question
+    """
+    session = sessions[update.effective_user.id]
+    position = session['current_question']
+    is_correct = update.poll_answer.option_ids[0] == 0
+
+    await bot.send_message(chat_id=update.effective_user.id, text=f"answer {position}")
+
+    session['score'] += 1 if is_correct else 0
+    session['current_question'] = position + 1
+    session['positions'].append(position)
+
+async def hammer(processor) -> tuple:
+    """كل المستخدمين يرسلون كل إجاباتهم دفعة واحدة (كل ثالث إجابة خاطئة)"""
+    bot = FakeBot()
+    sessions = {
+        user_id: {'score': 0, 'current_question': 0, 'positions': []}
+        for user_id in range(1, USERS + 1)
+    }
+
+    tasks = []
+    for user_id in sessions:
+        for answer in range(ANSWERS_PER_USER):
+            update = make_update(user_id, 1 if answer % 3 == 0 else 0)
+            tasks.append(asyncio.create_task(
+                processor.process_update(update, handle_answer(bot, sessions, update))
+            ))
+    await asyncio.gather(*tasks)
+    return sessions, bot
+
+def test_per_user_answers_are_exact():
+    processor = PerUserUpdateProcessor(32)
+    sessions, bot = asyncio.run(hammer(processor))
+
+    expected_score = ANSWERS_PER_USER - len(range(0, ANSWERS_PER_USER, 3))
+    for session in sessions.values():
+        assert session['current_question'] == ANSWERS_PER_USER
+        assert session['score'] == expected_score
+        assert session['positions'] == list(range(ANSWERS_PER_USER))
+    assert len(bot.messages) == USERS * ANSWERS_PER_USER
+    assert processor.active_lanes == 0
+
+def test_simple_processor_loses_answers():
+    """التحقق من أن الاختبار يكشف السباق فعلاً (المعالج الافتراضي يفقد إجابات)"""
+    sessions, _ = asyncio.run(hammer(SimpleUpdateProcessor(32)))
+
+    assert any(session['current_question'] < ANSWERS_PER_USER for session in sessions.values())
+
+def test_users_run_in_parallel_but_each_user_in_order():
+    processor = PerUserUpdateProcessor(8)
+    running = {}
+    peak = {'total': 0, 'per_user': 0}
+
+    async def work(user_id: int):
+        running[user_id] = running.get(user_id, 0) + 1
+        peak['total'] = max(peak['total'], sum(running.values()))
+        peak['per_user'] = max(peak['per_user'], running[user_id])
+        await asyncio.sleep(0.01)
+        running[user_id] -= 1
+
+    async def main():
+        await asyncio.gather(*(
+            processor.process_update(make_update(user_id), work(user_id))
+            for user_id in range(4) for _ in range(5)
+        ))
+
+    asyncio.run(main())
+    assert peak['total'] == 4
+    assert peak['per_user'] == 1
+
+def test_failed_update_does_not_block_user():
+    processor = PerUserUpdateProcessor(4)
+    done = []
+
+    async def fail():
+        await asyncio.sleep(0)
+        raise RuntimeError("boom")
+
+    async def ok(n: int):
+        done.append(n)
+
+    async def main():
+        await asyncio.gather(
+            processor.process_update(make_update(1), ok(1)),
+            processor.process_update(make_update(1), fail()),
+            processor.process_update(make_update(1), ok(2)),
+        )
+
+    asyncio.run(main())
+    assert done == [1, 2]
+    assert processor.active_lanes == 0
+
+def test_updates_without_user_skip_lanes():
+    processor = PerUserUpdateProcessor(4)
+    done = []
+
+    async def ok():
+        done.append(processor.active_lanes)
+
+    asyncio.run(processor.process_update(make_update(None), ok()))
+    assert done == [0]
+
+def test_background_task_waits_for_user_update():
+    """مؤقت ينتهي أثناء معالجة إجابة المستخدم يُنفّذ بعدها وليس في منتصفها"""
+    processor = PerUserUpdateProcessor(4)
+    context = SimpleNamespace(application=SimpleNamespace(update_processor=processor))
+    events = []
+
+    async def answer():
+        events.append('answer start')
+        await asyncio.sleep(0.01)
+        events.append('answer end')
+
+    async def expire():
+        events.append('expire')
+
+    async def main():
+        update_task = asyncio.create_task(processor.process_update(make_update(1), answer()))
+        await asyncio.sleep(0)
+        await run_in_user_lane(context, 1, expire())
+        await update_task
+
+    asyncio.run(main())
+    assert events == ['answer start', 'answer end', 'expire']
+    assert processor.active_lanes == 0